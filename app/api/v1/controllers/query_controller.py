@@ -1,7 +1,18 @@
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from fastapi import Request
 from app.services.rag_service import RAGService
 from app.services.memory_service import MemoryService
 from app.api.v1.schemas.request.query_request import QueryRequest, ConversationRequest
-from app.api.v1.schemas.response.query_response import QueryResponse, ConversationResponse, Source, CompressionInfo
+from app.api.v1.schemas.response.query_response import QueryResponse, ConversationResponse, Source, CompressionInfo, ContextCompressionInfo, ContextPackingInfo
+from cross_cutting.observability.metrics import STREAM_TIME_TO_FIRST_BYTE, STREAM_TIME_TO_FIRST_TOKEN, STREAMS_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 class QueryController:
     def __init__(self, rag_service: RAGService, memory_service: MemoryService):
@@ -13,7 +24,16 @@ class QueryController:
         return QueryResponse(
             answer=result["answer"],
             sources=[Source(content=source, metadata={}) for source in result["sources"]],
-            query_compression=CompressionInfo(**result["query_compression"])
+            query_compression=CompressionInfo(**result["query_compression"]),
+            method=result["method"],
+            freshness=result["freshness"],
+            context_compression=(
+                ContextCompressionInfo(**result["context_compression"]) if "context_compression" in result else None
+            ),
+            context_packing=(
+                ContextPackingInfo(**result["context_packing"]) if "context_packing" in result else None
+            ),
+            latency_seconds=result["latency_seconds"]
         )
     
     async def process_query_with_agents(self, query: QueryRequest) -> QueryResponse:
@@ -22,7 +42,15 @@ class QueryController:
             answer=result["answer"],
             sources=[Source(content=source, metadata={}) for source in result.get("sources", [])],
             query_compression=CompressionInfo(**result["query_compression"]),
-            method=result["method"]
+            method=result["method"],
+            freshness=result["freshness"],
+            context_compression=(
+                ContextCompressionInfo(**result["context_compression"]) if "context_compression" in result else None
+            ),
+            context_packing=(
+                ContextPackingInfo(**result["context_packing"]) if "context_packing" in result else None
+            ),
+            latency_seconds=result["latency_seconds"]
         )
 
     async def process_conversation_with_agents(self, conversation: ConversationRequest) -> ConversationResponse:
@@ -31,7 +59,9 @@ class QueryController:
         
         result = await self.rag_service.process_query(conversation.message, context=context)
         
-        memory.save_context({"input": conversation.message}, {"output": result["answer"]})
+        # A degraded response has no answer to remember
+        if result["answer"]:
+            memory.save_context({"input": conversation.message}, {"output": result["answer"]})
         
         return ConversationResponse(
             response=result["answer"],
@@ -45,9 +75,76 @@ class QueryController:
         
         result = await self.rag_service.process_query(conversation.message, context=context)
         
-        memory.save_context({"input": conversation.message}, {"output": result["answer"]})
+        # A degraded response has no answer to remember
+        if result["answer"]:
+            memory.save_context({"input": conversation.message}, {"output": result["answer"]})
         
         return ConversationResponse(
             response=result["answer"],
-            conversation_id=conversation.conversation_id or "new_conversation_id"  # Generate a new ID if not provided
-        )
\ No newline at end of file
+            conversation_id=conversation.conversation_id or "new_conversation_id",  # Generate a new ID if not provided
+            method=result["method"]
+        )
+
+    async def stream_query(self, query: QueryRequest, request: Request) -> AsyncIterator[str]:
+        async for chunk in self._stream(self.rag_service.stream_query(query.query), request, "query"):
+            yield chunk
+
+    async def stream_conversation(self, conversation: ConversationRequest, request: Request) -> AsyncIterator[str]:
+        memory = self.memory_service.get_memory(conversation.conversation_id)
+        context = memory.load_memory_variables({})
+        conversation_id = conversation.conversation_id or "new_conversation_id"  # Generate a new ID if not provided
+        # Only a completed answer becomes part of the conversation
+        on_done = lambda answer: memory.save_context({"input": conversation.message}, {"output": answer})
+        async for chunk in self._stream(
+            self.rag_service.stream_query(conversation.message, context=context), request, "conversation",
+            on_done, conversation_id=conversation_id,
+        ):
+            yield chunk
+
+    async def _stream(
+        self,
+        events: AsyncIterator[Dict[str, Any]],
+        request: Request,
+        endpoint: str,
+        on_done: Optional[Callable[[str], None]] = None,
+        **done: Any,
+    ) -> AsyncIterator[str]:
+        """Render ``events`` as Server-Sent Events, timing them and stopping when the client goes away.
+
+        ``done`` is merged into the final event, and ``on_done`` gets the
+        full answer once the stream completes, unless nothing was generated
+        (a degraded stream that only carried sources).
+        """
+        start = time.perf_counter()
+        first_token = True
+        answer = []
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    STREAMS_CANCELLED.labels(endpoint=endpoint).inc()
+                    return
+                name = event.pop("event")
+                if name == "sources":
+                    STREAM_TIME_TO_FIRST_BYTE.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+                    event = {"sources": [Source(content=source, metadata={}).model_dump() for source in event["sources"]]}
+                elif name == "token":
+                    if first_token:
+                        STREAM_TIME_TO_FIRST_TOKEN.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+                        first_token = False
+                    answer.append(event["text"])
+                elif name == "done":
+                    event = {
+                        **event,
+                        "query_compression": CompressionInfo(**event["query_compression"]).model_dump(),
+                        **done,
+                    }
+                    if on_done is not None and answer:
+                        on_done("".join(answer))
+                yield _sse(name, event)
+        except Exception as e:
+            # Headers are already sent, so the failure can only be reported in the stream
+            logger.exception("Streaming %s failed", endpoint)
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            # Closes the upstream LLM request too, including when the server cancels us on disconnect
+            await events.aclose()
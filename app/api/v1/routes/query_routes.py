@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from app.core.dependencies import get_query_controller
 from app.api.v1.schemas.request.query_request import QueryRequest, ConversationRequest
 from app.api.v1.schemas.response.query_response import QueryResponse, ConversationResponse
@@ -18,4 +19,27 @@ async def process_conversation(
     conversation: ConversationRequest,
     controller: QueryController = Depends(get_query_controller)
 ):
-    return await controller.process_conversation(conversation)
\ No newline at end of file
+    return await controller.process_conversation(conversation)
+
+# Proxies must pass events through as they are written
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.post("/query/stream")
+async def stream_query(
+    query: QueryRequest,
+    request: Request,
+    controller: QueryController = Depends(get_query_controller)
+):
+    """Server-Sent Events: ``sources`` once retrieval finishes, a ``token`` per chunk of the answer, then ``done`` with compression and token stats."""
+    return StreamingResponse(controller.stream_query(query, request), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/conversation/stream")
+async def stream_conversation(
+    conversation: ConversationRequest,
+    request: Request,
+    controller: QueryController = Depends(get_query_controller)
+):
+    """Streaming variant of ``/conversation``, with the same events as ``/query/stream``."""
+    return StreamingResponse(
+        controller.stream_conversation(conversation, request), media_type="text/event-stream", headers=SSE_HEADERS
+    )
@@ -8,6 +8,8 @@ from .response import (
     ConversationResponse,
     Source,
     CompressionInfo,
+    ContextCompressionInfo,
+    ContextPackingInfo,
     UpdateKnowledgeBaseResponse,
     SystemStatsResponse
 )
\ No newline at end of file
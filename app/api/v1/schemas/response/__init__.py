@@ -1,2 +1,2 @@
 from .admin_response import UpdateKnowledgeBaseResponse, SystemStatsResponse
-from .query_response import QueryResponse, ConversationResponse, CompressionInfo, Source
\ No newline at end of file
+from .query_response import QueryResponse, ConversationResponse, CompressionInfo, ContextCompressionInfo, ContextPackingInfo, Source
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class Source(BaseModel):
     content: str
@@ -9,12 +9,27 @@ class CompressionInfo(BaseModel):
     original_tokens: int
     compressed_tokens: int
     compression_ratio: float
+    decision: str = Field("fixed", description="Compression chosen for the request: 'skip', 'light', 'aggressive' or 'fixed'")
+
+class ContextCompressionInfo(BaseModel):
+    original_tokens: int = Field(..., description="Tokens of the retrieved chunks the answer used, as stored")
+    compressed_tokens: int = Field(..., description="Tokens of those chunks as sent to the LLM")
+
+class ContextPackingInfo(BaseModel):
+    retrieved_tokens: int = Field(..., description="Tokens of every chunk the retriever returned")
+    packed_tokens: int = Field(..., description="Tokens of the chunks that fit the context budget and were sent to the LLM")
+    tokens_saved: int = Field(..., description="Prompt tokens left out by duplicate elimination and the budget")
+    duplicates_dropped: int = Field(..., description="Chunks dropped as near-duplicates of better-ranked ones")
 
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Source]
     query_compression: CompressionInfo
     method: str = Field(..., description="Method used to generate the answer: 'rag' or 'agent'") #support rag or agent
+    freshness: str = Field("fresh", description="'fresh', 'stale' (served past its TTL while refreshing) or 'degraded' (sources only, LLM unavailable)")
+    context_compression: Optional[ContextCompressionInfo] = None
+    context_packing: Optional[ContextPackingInfo] = None
+    latency_seconds: Optional[float] = Field(None, description="Time taken to produce the answer, end to end")
 
 class ConversationResponse(BaseModel):
     response: str
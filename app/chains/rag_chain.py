@@ -1,8 +1,9 @@
 from langchain.chains import RetrievalQA
 from langchain.llms import BaseLLM
+from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from langchain.prompts import PromptTemplate
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 
 class RAGChain:
     def __init__(
@@ -27,12 +28,36 @@ class RAGChain:
             chain_type_kwargs={"prompt": prompt} if prompt else {}
         )
 
-    async def run(self, query: str) -> Dict[str, Any]:
-        result = await self.chain({"query": query})
+    async def run(self, query: str, documents: Optional[List[Document]] = None) -> Dict[str, Any]:
+        if documents is not None:
+            # Answer over chunks already retrieved (and packed) by the caller
+            result = await self.chain.combine_documents_chain.ainvoke(
+                {"input_documents": documents, "question": query}
+            )
+            return {"answer": result["output_text"], "source_documents": documents}
+        result = await self.chain.ainvoke({"query": query})
         return {
             "answer": result["result"],
             "source_documents": result["source_documents"]
         }
 
+    async def aretrieve(self, query: str) -> List[Document]:
+        return await self.chain.retriever.ainvoke(query)
+
+    async def astream_answer(self, query: str, documents: List[Document]) -> AsyncIterator[str]:
+        """Stream the completion for ``query`` over ``documents`` as it is generated.
+
+        Fills the same stuff prompt ``run`` uses. Closing the iterator closes
+        the upstream request.
+        """
+        stuff_chain = self.chain.combine_documents_chain
+        inputs = stuff_chain._get_inputs(documents, question=query)
+        prompt = stuff_chain.llm_chain.prompt.format_prompt(**inputs)
+        async for chunk in stuff_chain.llm_chain.llm.astream(prompt):
+            # Chat models yield message chunks, completion models plain strings
+            text = getattr(chunk, "content", chunk)
+            if text:
+                yield text
+
     def update_retriever(self, new_retriever: BaseRetriever) -> None:
         self.chain.retriever = new_retriever
\ No newline at end of file
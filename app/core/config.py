@@ -1,8 +1,10 @@
 from pydantic_settings import BaseSettings
+from typing import List
 from pydantic import Field
 
 class Settings(BaseSettings):
     # MongoDB settings
+    DOCUMENT_STORE_PROVIDER: str = Field("mongodb", env="DOCUMENT_STORE_PROVIDER")
     MONGODB_URL: str = Field(..., env="MONGODB_URL")
     MONGODB_DB_NAME: str = Field("rag_db", env="MONGODB_DB_NAME")
     DOCUMENTS_COLLECTION: str = Field("documents", env="DOCUMENTS_COLLECTION")
@@ -12,9 +14,136 @@ class Settings(BaseSettings):
     OPENAI_LLM_MODEL_NAME: str = Field("gpt-3.5-turbo", env="LLM_MODEL_NAME")
     OPENAI_LLM_TEMPERATURE: float = Field(0.7, env="LLM_TEMPERATURE")
     OPENAI_LLM_MAX_TOKENS: int = Field(150, env="LLM_MAX_TOKENS")
+    LLM_PROVIDER: str = Field("openai", env="LLM_PROVIDER")
+
+    # Local (offline) chat model settings
+    LOCAL_LLM_LATENCY_MEAN: float = Field(0.3, env="LOCAL_LLM_LATENCY_MEAN")
+    LOCAL_LLM_LATENCY_STDDEV: float = Field(0.1, env="LOCAL_LLM_LATENCY_STDDEV")
+    LOCAL_LLM_TOKENS_PER_SECOND: float = Field(60.0, env="LOCAL_LLM_TOKENS_PER_SECOND")
+    LOCAL_LLM_ANSWER_TOKENS: int = Field(64, env="LOCAL_LLM_ANSWER_TOKENS")
+    LOCAL_LLM_TEMPLATE: str = Field("Based on the provided context: {excerpt}", env="LOCAL_LLM_TEMPLATE")
+    LOCAL_LLM_SEED: int = Field(0, env="LOCAL_LLM_SEED")
+
+    # Embedding settings
+    EMBEDDING_PROVIDER: str = Field("openai", env="EMBEDDING_PROVIDER")
+    EMBEDDING_MODEL_NAME: str = Field("text-embedding-ada-002", env="EMBEDDING_MODEL_NAME")
+    EMBEDDING_DIMENSION: int = Field(1536, env="EMBEDDING_DIMENSION")
+    EMBEDDING_BATCH_SIZE: int = Field(256, env="EMBEDDING_BATCH_SIZE")
+    EMBEDDING_BATCH_MAX_TOKENS: int = Field(100000, env="EMBEDDING_BATCH_MAX_TOKENS")
+    EMBEDDING_MAX_CONCURRENCY: int = Field(4, env="EMBEDDING_MAX_CONCURRENCY")
+    EMBEDDING_MAX_RETRIES: int = Field(3, env="EMBEDDING_MAX_RETRIES")
+    EMBEDDING_CACHE_SIZE: int = Field(100000, env="EMBEDDING_CACHE_SIZE")
+    EMBEDDING_CACHE_PATH: str = Field("vector_store/embeddings.bin", env="EMBEDDING_CACHE_PATH")
+    EMBEDDING_CACHE_MAX_FILE_BYTES: int = Field(1073741824, env="EMBEDDING_CACHE_MAX_FILE_BYTES")
 
     # Vector store settings
     VECTOR_STORE_PATH: str = Field("vector_store", env="VECTOR_STORE_PATH")
+    VECTOR_STORE_SNAPSHOT_BOOT: bool = Field(True, env="VECTOR_STORE_SNAPSHOT_BOOT")
+    VECTOR_STORE_MMAP: bool = Field(True, env="VECTOR_STORE_MMAP")
+    VECTOR_STORE_SNAPSHOTS_KEPT: int = Field(3, env="VECTOR_STORE_SNAPSHOTS_KEPT")
+    VECTOR_INDEX_TYPE: str = Field("flat", env="VECTOR_INDEX_TYPE")
+    VECTOR_INDEX_NLIST: int = Field(1024, env="VECTOR_INDEX_NLIST")
+    VECTOR_INDEX_NPROBE: int = Field(16, env="VECTOR_INDEX_NPROBE")
+    VECTOR_INDEX_HNSW_M: int = Field(32, env="VECTOR_INDEX_HNSW_M")
+    VECTOR_INDEX_EF_CONSTRUCTION: int = Field(200, env="VECTOR_INDEX_EF_CONSTRUCTION")
+    VECTOR_INDEX_EF_SEARCH: int = Field(64, env="VECTOR_INDEX_EF_SEARCH")
+    VECTOR_INDEX_PRECISION: str = Field("float32", env="VECTOR_INDEX_PRECISION")
+    VECTOR_INDEX_PQ_M: int = Field(64, env="VECTOR_INDEX_PQ_M")
+    VECTOR_INDEX_RERANK: bool = Field(True, env="VECTOR_INDEX_RERANK")
+    VECTOR_INDEX_RERANK_FACTOR: int = Field(4, env="VECTOR_INDEX_RERANK_FACTOR")
+    VECTOR_SEARCH_WINDOW_MS: float = Field(2.0, env="VECTOR_SEARCH_WINDOW_MS")
+    VECTOR_SEARCH_MAX_BATCH: int = Field(32, env="VECTOR_SEARCH_MAX_BATCH")
+    VECTOR_STORE_SHARDS: int = Field(1, env="VECTOR_STORE_SHARDS")
+    VECTOR_STORE_SHARD_DEADLINE_MS: float = Field(250.0, env="VECTOR_STORE_SHARD_DEADLINE_MS")
+    VECTOR_STORE_SHARD_PARTIAL_RESULTS: bool = Field(True, env="VECTOR_STORE_SHARD_PARTIAL_RESULTS")
+    VECTOR_STORE_COMPACTION_THRESHOLD: float = Field(0.2, env="VECTOR_STORE_COMPACTION_THRESHOLD")
+
+    # Retrieval settings
+    RETRIEVAL_HYBRID: bool = Field(True, env="RETRIEVAL_HYBRID")
+    RETRIEVAL_TOP_K: int = Field(4, env="RETRIEVAL_TOP_K")
+    RETRIEVAL_PER_SOURCE_K: int = Field(20, env="RETRIEVAL_PER_SOURCE_K")
+    RETRIEVAL_RRF_K: int = Field(60, env="RETRIEVAL_RRF_K")
+
+    # Redis settings
+    # "memory" keeps caches in each worker process; "redis" shares them across workers and needs a server
+    CACHE_PROVIDER: str = Field("memory", env="CACHE_PROVIDER")
+    REDIS_HOST: str = Field("localhost", env="REDIS_HOST")
+    REDIS_PORT: int = Field(6379, env="REDIS_PORT")
+    REDIS_DB: int = Field(0, env="REDIS_DB")
+
+    # Exact-match query cache settings
+    QUERY_CACHE_ENABLED: bool = Field(True, env="QUERY_CACHE_ENABLED")
+    QUERY_CACHE_TTL: int = Field(300, env="QUERY_CACHE_TTL")
+    QUERY_CACHE_LOCK_TIMEOUT: float = Field(30.0, env="QUERY_CACHE_LOCK_TIMEOUT")
+    QUERY_CACHE_STALE_TTL: int = Field(3600, env="QUERY_CACHE_STALE_TTL")
+    CACHE_L1_MAX_ENTRIES: int = Field(10000, env="CACHE_L1_MAX_ENTRIES")
+    CACHE_L1_MAX_BYTES: int = Field(64 * 1024 * 1024, env="CACHE_L1_MAX_BYTES")
+    CACHE_L1_TTL: int = Field(30, env="CACHE_L1_TTL")
+    CACHE_COMPRESSION: str = Field("zstd", env="CACHE_COMPRESSION")
+    CACHE_COMPRESSION_THRESHOLD: int = Field(1024, env="CACHE_COMPRESSION_THRESHOLD")
+    KB_VERSION_REFRESH_SECONDS: float = Field(1.0, env="KB_VERSION_REFRESH_SECONDS")
+
+    # Prompt compression settings
+    # Starts a process pool that loads COMPRESSION_MODEL with llmlingua at startup
+    COMPRESSION_ENABLED: bool = Field(False, env="COMPRESSION_ENABLED")
+    COMPRESSION_MODEL: str = Field("openai-community/gpt2", env="COMPRESSION_MODEL")
+    COMPRESSION_DEVICE: str = Field("cpu", env="COMPRESSION_DEVICE")
+    COMPRESSION_WORKERS: int = Field(2, env="COMPRESSION_WORKERS")
+    COMPRESSION_MAX_BATCH: int = Field(8, env="COMPRESSION_MAX_BATCH")
+    COMPRESSION_BATCH_WINDOW_MS: float = Field(5.0, env="COMPRESSION_BATCH_WINDOW_MS")
+    COMPRESSION_MAX_QUEUE: int = Field(256, env="COMPRESSION_MAX_QUEUE")
+    COMPRESSION_MIN_TOKENS: int = Field(64, env="COMPRESSION_MIN_TOKENS")
+    COMPRESSION_LIGHT_RATIO: float = Field(0.3, env="COMPRESSION_LIGHT_RATIO")
+    COMPRESSION_AGGRESSIVE_RATIO: float = Field(0.6, env="COMPRESSION_AGGRESSIVE_RATIO")
+    COMPRESSION_TOKEN_VALUE_MS: float = Field(0.5, env="COMPRESSION_TOKEN_VALUE_MS")
+    COMPRESSION_RESERVED_TOKENS: int = Field(4096, env="COMPRESSION_RESERVED_TOKENS")
+    LLM_CONTEXT_WINDOW: int = Field(16385, env="LLM_CONTEXT_WINDOW")
+    COMPRESSION_CACHE_SIZE: int = Field(10000, env="COMPRESSION_CACHE_SIZE")
+    COMPRESSION_CACHE_PERSISTENT: bool = Field(True, env="COMPRESSION_CACHE_PERSISTENT")
+    COMPRESSION_CACHE_TTL: int = Field(7 * 24 * 3600, env="COMPRESSION_CACHE_TTL")
+    COMPRESSION_PRECOMPRESS_RATIOS: List[float] = Field([0.5], env="COMPRESSION_PRECOMPRESS_RATIOS")
+    # Chunks a sync may have on the compression queue at once; the rest of the queue is left to queries
+    COMPRESSION_PRECOMPRESS_CONCURRENCY: int = Field(4, env="COMPRESSION_PRECOMPRESS_CONCURRENCY")
+
+    # Retrieved context compression settings
+    # Only applies while COMPRESSION_ENABLED is on
+    CONTEXT_COMPRESSION_ENABLED: bool = Field(False, env="CONTEXT_COMPRESSION_ENABLED")
+    CONTEXT_COMPRESSION_RATIO: float = Field(0.5, env="CONTEXT_COMPRESSION_RATIO")
+    # Ignored while context packing is enabled: the packer applies its own budget after dropping duplicates
+    CONTEXT_TOKEN_BUDGET: int = Field(2000, env="CONTEXT_TOKEN_BUDGET")
+    CONTEXT_COMPRESSION_MIN_TOKENS: int = Field(32, env="CONTEXT_COMPRESSION_MIN_TOKENS")
+    CONTEXT_COMPRESSION_CONCURRENCY: int = Field(4, env="CONTEXT_COMPRESSION_CONCURRENCY")
+    CONTEXT_COMPRESSION_CACHE_SIZE: int = Field(10000, env="CONTEXT_COMPRESSION_CACHE_SIZE")
+
+    # Retrieved context packing settings
+    CONTEXT_PACKING_ENABLED: bool = Field(True, env="CONTEXT_PACKING_ENABLED")
+    CONTEXT_PACKING_RESERVED_TOKENS: int = Field(1024, env="CONTEXT_PACKING_RESERVED_TOKENS")
+    CONTEXT_PACKING_DUPLICATE_THRESHOLD: float = Field(0.95, env="CONTEXT_PACKING_DUPLICATE_THRESHOLD")
+    CONTEXT_PACKING_MMR_LAMBDA: float = Field(0.7, env="CONTEXT_PACKING_MMR_LAMBDA")
+
+    # Outbound HTTP connection pools (OpenAI chat and embeddings)
+    HTTP2_ENABLED: bool = Field(True, env="HTTP2_ENABLED")
+    HTTP_MAX_CONNECTIONS: int = Field(100, env="HTTP_MAX_CONNECTIONS")
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, env="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    HTTP_KEEPALIVE_EXPIRY: float = Field(30.0, env="HTTP_KEEPALIVE_EXPIRY")
+    HTTP_TIMEOUT: float = Field(60.0, env="HTTP_TIMEOUT")
+
+    # In-flight query coalescing settings
+    QUERY_COALESCING_ENABLED: bool = Field(True, env="QUERY_COALESCING_ENABLED")
+    # Needs CACHE_PROVIDER=redis to reach other workers
+    QUERY_COALESCING_CROSS_WORKER: bool = Field(False, env="QUERY_COALESCING_CROSS_WORKER")
+    QUERY_COALESCING_LEASE_TIMEOUT: float = Field(30.0, env="QUERY_COALESCING_LEASE_TIMEOUT")
+
+    # LLM circuit breaker settings
+    LLM_BREAKER_FAILURE_THRESHOLD: int = Field(5, env="LLM_BREAKER_FAILURE_THRESHOLD")
+    LLM_BREAKER_RECOVERY_TIMEOUT: int = Field(30, env="LLM_BREAKER_RECOVERY_TIMEOUT")
+
+    # Semantic answer cache settings
+    SEMANTIC_CACHE_ENABLED: bool = Field(True, env="SEMANTIC_CACHE_ENABLED")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.95, env="SEMANTIC_CACHE_THRESHOLD")
+    SEMANTIC_CACHE_NEAR_MISS_MARGIN: float = Field(0.05, env="SEMANTIC_CACHE_NEAR_MISS_MARGIN")
+    SEMANTIC_CACHE_MAX_ENTRIES: int = Field(10000, env="SEMANTIC_CACHE_MAX_ENTRIES")
+    SEMANTIC_CACHE_TTL: int = Field(3600, env="SEMANTIC_CACHE_TTL")
 
     # API settings
     API_V1_STR: str = "/api/v1"
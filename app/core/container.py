@@ -0,0 +1,267 @@
+import logging
+from functools import partial
+from typing import Any, Optional, Tuple, Union
+
+import httpx
+
+from app.core.config import Settings
+from app.db.index_spec import IndexSpec
+from app.db.memory_mongodb import InMemoryMongoDB
+from app.db.mongodb import MongoDB
+from app.db.search_executor import SearchExecutorConfig
+from app.db.sharding import ShardingConfig
+from app.db.vector_store import StartupReport, VectorStore
+from app.embeddings.batch_embedder import BatchEmbedderConfig
+from app.embeddings.cache import EmbeddingCache
+from app.embeddings.providers import get_embedding_provider
+from app.services.context_compression import ContextCompressionConfig, ContextCompressor
+from app.services.context_packing import ContextPacker, ContextPackingConfig
+from app.services.data_sync_service import DataSyncService
+from app.services.kb_version import KnowledgeBaseVersion
+from app.services.llm_service import LLMService
+from app.services.memory_service import MemoryService
+from app.services.rag_service import RAGService
+from app.services.retrieval_service import RetrievalService
+from app.services.semantic_cache import SemanticCache, SemanticCacheConfig
+from app.utils.tokenization import count_tokens
+from cross_cutting.caching.coalescing import CoalescerConfig, RequestCoalescer
+from cross_cutting.caching.memory_redis import InMemoryRedis
+from cross_cutting.caching.redis_cache import CacheConfig, L1Config, RedisCache, TieredCache
+from cross_cutting.compression import (
+    CompressionCache, CompressionCacheConfig, CompressionEngineConfig, CompressionPolicy, CompressionPolicyConfig,
+    LLMCompressor, get_compression_engine
+)
+from cross_cutting.resilience.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+def build_http_clients(settings: Settings) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Keep-alive connection pools shared by the OpenAI chat and embedding clients.
+
+    HTTP/2 multiplexes concurrent requests over one connection per host; it
+    needs the ``h2`` package (``httpx[http2]``) and falls back to HTTP/1.1
+    keep-alive without it.
+    """
+    http2 = settings.HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("h2 is not installed; OpenAI clients will use HTTP/1.1 keep-alive connections")
+            http2 = False
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(settings.HTTP_TIMEOUT)
+    return (
+        httpx.Client(http2=http2, limits=limits, timeout=timeout),
+        httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout),
+    )
+
+
+class ServiceContainer:
+    """Every long-lived service of one worker, built once and shared by all requests.
+
+    The app's lifespan creates the container, ``start``s it before serving
+    and ``close``s it on shutdown; the ``get_*`` dependencies only hand out
+    its instances. Services that need the vector store to be loaded (the
+    retrieval and RAG services) exist once ``start`` has returned.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.http_client, self.http_async_client = build_http_clients(settings)
+        self.embeddings = get_embedding_provider(settings, self.http_client, self.http_async_client)
+
+        self.mongodb = self._build_document_store(settings)
+        # One in-process Redis stand-in shared by every cache, or None to connect to REDIS_HOST
+        self.redis_client = self._build_redis_client(settings)
+        self.vector_store = VectorStore(
+            BatchEmbedderConfig.from_settings(settings),
+            EmbeddingCache.from_settings(settings),
+            IndexSpec.from_settings(settings),
+            SearchExecutorConfig.from_settings(settings),
+            ShardingConfig.from_settings(settings),
+            compaction_threshold=settings.VECTOR_STORE_COMPACTION_THRESHOLD,
+        )
+        self.llm_service = LLMService()
+        self.memory_service = MemoryService()
+        self.data_sync_service = DataSyncService()
+
+        semantic_cache_config = SemanticCacheConfig.from_settings(settings)
+        self.semantic_cache = SemanticCache(semantic_cache_config) if semantic_cache_config.enabled else None
+        self.query_cache = self._build_query_cache(settings) if settings.QUERY_CACHE_ENABLED else None
+        # Versions live next to the entries they namespace; without the query cache there is nothing to retire
+        self.kb_version = (
+            KnowledgeBaseVersion(
+                self.query_cache,
+                refresh_interval=settings.KB_VERSION_REFRESH_SECONDS,
+                # Apply the syncing worker's changes before answering under its version
+                on_change=lambda version: self.vector_store.catch_up(),
+            )
+            if self.query_cache is not None else None
+        )
+        # The breaker's failure count must be shared across requests to ever open
+        self.llm_breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.LLM_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.compressor = self._build_compressor(settings) if settings.COMPRESSION_ENABLED else None
+        self.context_compressor = (
+            ContextCompressor(self.compressor, ContextCompressionConfig.from_settings(settings))
+            if self.compressor is not None and settings.CONTEXT_COMPRESSION_ENABLED else None
+        )
+        context_packing_config = ContextPackingConfig.from_settings(settings)
+        self.context_packer = (
+            ContextPacker(
+                self.vector_store,
+                partial(count_tokens, model_name=settings.OPENAI_LLM_MODEL_NAME),
+                context_packing_config,
+            )
+            if context_packing_config.enabled else None
+        )
+        self.coalescer = self._build_coalescer(settings) if settings.QUERY_COALESCING_ENABLED else None
+
+        self.retrieval_service: Optional[RetrievalService] = None
+        self.rag_service: Optional[RAGService] = None
+        self.startup_report: Optional[StartupReport] = None
+
+    @staticmethod
+    def _build_document_store(settings: Settings) -> Union[MongoDB, InMemoryMongoDB]:
+        if settings.DOCUMENT_STORE_PROVIDER == "mongodb":
+            return MongoDB(url=settings.MONGODB_URL)
+        if settings.DOCUMENT_STORE_PROVIDER == "memory":
+            return InMemoryMongoDB()
+        raise ValueError(f"Unknown document store provider: {settings.DOCUMENT_STORE_PROVIDER}")
+
+    @staticmethod
+    def _build_redis_client(settings: Settings) -> Optional[Any]:
+        if settings.CACHE_PROVIDER == "redis":
+            return None
+        if settings.CACHE_PROVIDER == "memory":
+            return InMemoryRedis()
+        raise ValueError(f"Unknown cache provider: {settings.CACHE_PROVIDER}")
+
+    def _build_query_cache(self, settings: Settings) -> TieredCache:
+        return TieredCache(
+            CacheConfig(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                ttl=settings.QUERY_CACHE_TTL,
+                lock_timeout=settings.QUERY_CACHE_LOCK_TIMEOUT,
+                stale_ttl=settings.QUERY_CACHE_STALE_TTL,
+                compression=settings.CACHE_COMPRESSION,
+                compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+            ),
+            L1Config(
+                max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                max_bytes=settings.CACHE_L1_MAX_BYTES,
+                ttl=settings.CACHE_L1_TTL,
+            ),
+            client=self.redis_client,
+        )
+
+    def _build_coalescer(self, settings: Settings) -> RequestCoalescer:
+        store = None
+        if settings.QUERY_COALESCING_CROSS_WORKER:
+            store = RedisCache(CacheConfig(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                compression=settings.CACHE_COMPRESSION,
+                compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+            ), client=self.redis_client)
+        return RequestCoalescer(store, CoalescerConfig(lease_timeout=settings.QUERY_COALESCING_LEASE_TIMEOUT))
+
+    def _build_compressor(self, settings: Settings) -> LLMCompressor:
+        # The engine and its worker processes are shared by every compressor in the process
+        engine = get_compression_engine(CompressionEngineConfig(
+            model_name=settings.COMPRESSION_MODEL,
+            device=settings.COMPRESSION_DEVICE,
+            workers=settings.COMPRESSION_WORKERS,
+            max_batch_size=settings.COMPRESSION_MAX_BATCH,
+            batch_window_ms=settings.COMPRESSION_BATCH_WINDOW_MS,
+            max_queue=settings.COMPRESSION_MAX_QUEUE,
+        ))
+        policy = CompressionPolicy(CompressionPolicyConfig(
+            min_tokens=settings.COMPRESSION_MIN_TOKENS,
+            light_ratio=settings.COMPRESSION_LIGHT_RATIO,
+            aggressive_ratio=settings.COMPRESSION_AGGRESSIVE_RATIO,
+            context_window=settings.LLM_CONTEXT_WINDOW,
+            # Room for the retrieved context plus the completion
+            reserved_tokens=settings.COMPRESSION_RESERVED_TOKENS + settings.OPENAI_LLM_MAX_TOKENS,
+            token_value_ms=settings.COMPRESSION_TOKEN_VALUE_MS,
+        ))
+        store = None
+        if settings.COMPRESSION_CACHE_PERSISTENT:
+            store = RedisCache(CacheConfig(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                compression=settings.CACHE_COMPRESSION,
+                compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+            ), client=self.redis_client)
+        cache = CompressionCache(
+            CompressionCacheConfig(max_entries=settings.COMPRESSION_CACHE_SIZE, ttl=settings.COMPRESSION_CACHE_TTL),
+            store,
+        )
+        return LLMCompressor(engine, policy, partial(count_tokens, model_name=settings.OPENAI_LLM_MODEL_NAME), cache)
+
+    def cache_context(self) -> dict:
+        # Everything besides the query text that changes the answer
+        settings = self.settings
+        return {
+            "model": settings.OPENAI_LLM_MODEL_NAME,
+            "temperature": settings.OPENAI_LLM_TEMPERATURE,
+            "max_tokens": settings.OPENAI_LLM_MAX_TOKENS,
+            "hybrid": settings.RETRIEVAL_HYBRID,
+            "top_k": settings.RETRIEVAL_TOP_K,
+            "per_source_k": settings.RETRIEVAL_PER_SOURCE_K,
+            "rrf_k": settings.RETRIEVAL_RRF_K,
+        }
+
+    async def start(self):
+        settings = self.settings
+        await self.mongodb.connect(settings.MONGODB_DB_NAME)
+        await self.llm_service.initialize(settings, self.http_client, self.http_async_client)
+        await self.data_sync_service.initialize(
+            self.mongodb, self.llm_service, self.vector_store, self.kb_version,
+            self.compressor, settings.COMPRESSION_PRECOMPRESS_RATIOS, settings.COMPRESSION_PRECOMPRESS_CONCURRENCY,
+            settings.DOCUMENTS_COLLECTION,
+        )
+
+        # Bring the vector store up from its snapshot, embedding only what is newer
+        self.startup_report = await self.data_sync_service.bootstrap_vector_store(settings, self.embeddings)
+
+        self.retrieval_service = RetrievalService(
+            self.vector_store,
+            hybrid=settings.RETRIEVAL_HYBRID,
+            k=settings.RETRIEVAL_TOP_K,
+            per_source_k=settings.RETRIEVAL_PER_SOURCE_K,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+        )
+        self.rag_service = RAGService(
+            self.llm_service, self.retrieval_service, self.semantic_cache, self.query_cache, self.cache_context(),
+            self.kb_version, self.llm_breaker, self.compressor, self.context_compressor, self.coalescer,
+            self.context_packer,
+        )
+
+        # Spawn the compression workers and load their models before the first query
+        if self.compressor is not None:
+            await self.compressor.engine.start()
+
+    async def close(self):
+        await self.mongodb.close()
+        # Stop vector store shard workers
+        self.vector_store.close()
+        # Stop compression workers
+        if self.compressor is not None:
+            await self.compressor.engine.close()
+        if self.query_cache is not None:
+            await self.query_cache.close()
+        self.http_client.close()
+        await self.http_async_client.aclose()
@@ -1,9 +1,17 @@
-from fastapi import Depends
+from functools import lru_cache
+from fastapi import Depends, Request
 from app.core.config import Settings
+from app.core.container import ServiceContainer
 from app.db.mongodb import MongoDB
 from app.db.vector_store import VectorStore
 from app.services.llm_service import LLMService
 from app.services.rag_service import RAGService
+from app.services.kb_version import KnowledgeBaseVersion
+from app.services.context_compression import ContextCompressor
+from app.services.semantic_cache import SemanticCache
+from cross_cutting.caching.redis_cache import RedisCache
+from cross_cutting.compression import LLMCompressor
+from cross_cutting.resilience.circuit_breaker import CircuitBreaker
 from app.services.retrieval_service import RetrievalService
 from app.services.memory_service import MemoryService
 from app.services.data_sync_service import DataSyncService
@@ -12,40 +20,55 @@ from app.agents.react_agent import ReActAgent
 from app.agents.tools.search_tool import SearchTool
 from app.agents.tools.calculator_tool import CalculatorTool
 
+# Services are built once per worker by the ServiceContainer the app's lifespan
+# starts; these dependencies only hand out its shared instances.
+
+@lru_cache
 def get_settings():
+    # Read .env once per process rather than on every request
     return Settings()
 
-def get_mongodb(settings: Settings = Depends(get_settings))-> MongoDB:
-    mongodb = MongoDB(url=settings.MONGODB_URL)
-    return mongodb
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+def get_mongodb(container: ServiceContainer = Depends(get_container)) -> MongoDB:
+    return container.mongodb
+
+def get_vector_store(container: ServiceContainer = Depends(get_container)) -> VectorStore:
+    return container.vector_store
+
+def get_llm_service(container: ServiceContainer = Depends(get_container)) -> LLMService:
+    return container.llm_service
+
+def get_retrieval_service(container: ServiceContainer = Depends(get_container)) -> RetrievalService:
+    return container.retrieval_service
+
+def get_memory_service(container: ServiceContainer = Depends(get_container)) -> MemoryService:
+    return container.memory_service
+
+def get_semantic_cache(container: ServiceContainer = Depends(get_container)) -> SemanticCache:
+    return container.semantic_cache
 
-def get_vector_store():
-    return VectorStore()
+def get_query_cache(container: ServiceContainer = Depends(get_container)) -> RedisCache:
+    return container.query_cache
 
-def get_llm_service():
-    return LLMService()
+def get_kb_version(container: ServiceContainer = Depends(get_container)) -> KnowledgeBaseVersion:
+    return container.kb_version
 
-def get_retrieval_service(vector_store: VectorStore = Depends(get_vector_store)):
-    return RetrievalService(vector_store)
+def get_llm_breaker(container: ServiceContainer = Depends(get_container)) -> CircuitBreaker:
+    return container.llm_breaker
 
-def get_memory_service():
-    return MemoryService()
+def get_compressor(container: ServiceContainer = Depends(get_container)) -> LLMCompressor:
+    return container.compressor
 
-def get_rag_service( llm_service: LLMService = Depends(get_llm_service),
-    retrieval_service: RetrievalService = Depends(get_retrieval_service)):
-    return RAGService(llm_service, retrieval_service)
+def get_context_compressor(container: ServiceContainer = Depends(get_container)) -> ContextCompressor:
+    return container.context_compressor
 
-# def get_data_sync_service(
-#     mongodb: MongoDB = Depends(get_mongodb),
-#     llm_service: LLMService = Depends(get_llm_service),
-#     vector_store: VectorStore = Depends(get_vector_store)
-# ):
-#     # return DataSyncService(mongodb, llm_service, vector_store)
-#     return DataSyncService()
+def get_rag_service(container: ServiceContainer = Depends(get_container)) -> RAGService:
+    return container.rag_service
 
-def get_data_sync_service():
-    # return DataSyncService(mongodb, llm_service, vector_store)
-    return DataSyncService()
+def get_data_sync_service(container: ServiceContainer = Depends(get_container)) -> DataSyncService:
+    return container.data_sync_service
 
 def get_summary_service(llm_service: LLMService = Depends(get_llm_service)):
     return SummaryService(llm_service)
@@ -74,4 +97,4 @@ def get_admin_controller(
     data_sync_service: DataSyncService = Depends(get_data_sync_service)
 ):
     from app.api.v1.controllers.admin_controller import AdminController
-    return AdminController(data_sync_service)
\ No newline at end of file
+    return AdminController(data_sync_service)
@@ -1,2 +1,5 @@
 from .mongodb import MongoDB
-from .vector_store import VectorStore
\ No newline at end of file
+from .memory_mongodb import InMemoryMongoDB
+from .vector_store import VectorStore
+from .index_spec import IndexSpec
+from .keyword_index import InvertedIndex
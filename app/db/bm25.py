@@ -0,0 +1,148 @@
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from app.db.keyword_index import InvertedIndex, tokenize
+from app.db.rwlock import ReadWriteLock
+
+logger = logging.getLogger(__name__)
+
+
+class _Matrix(NamedTuple):
+    """One immutable build of the BM25 matrix; searches read whichever build is current."""
+
+    version: int
+    doc_ids: List[str]
+    row_of: Dict[str, int]
+    term_ids: Dict[str, int]
+    indptr: np.ndarray
+    rows: np.ndarray
+    tfs: np.ndarray
+    doc_lengths: np.ndarray
+    idf: np.ndarray
+
+
+class BM25Index:
+    """Okapi BM25 over the posting lists of an :class:`InvertedIndex`.
+
+    The postings are materialized as a term-major sparse matrix (CSR:
+    ``indptr`` per term, document ``rows`` and term frequencies ``tfs``), so
+    scoring a query is a handful of NumPy gathers and one ``bincount``
+    instead of a Python loop per posting.
+
+    After the keyword index changes the matrix is rebuilt in a background
+    thread and swapped in whole, so searches never wait for a rebuild and
+    see the previous build until then; results may briefly miss the newest
+    documents (callers already skip IDs deleted since). Postings are copied
+    holding ``lock`` for reading (writers to the keyword index hold it
+    exclusively), and the arrays are built after releasing it.
+    """
+
+    def __init__(
+        self,
+        keyword_index: InvertedIndex,
+        k1: float = 1.5,
+        b: float = 0.75,
+        lock: Optional[ReadWriteLock] = None,
+    ):
+        self.keyword_index = keyword_index
+        self.k1 = k1
+        self.b = b
+        self._lock = lock or ReadWriteLock()
+        self._matrix: Optional[_Matrix] = None
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+
+    def _build(self) -> _Matrix:
+        index = self.keyword_index
+        with self._lock.read():
+            version = index.version
+            doc_lengths = dict(index.doc_lengths)
+            postings = {term: dict(posting) for term, posting in index.postings.items()}
+
+        doc_ids = list(doc_lengths)
+        row_of = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        terms = list(postings)
+        lengths = np.fromiter((len(postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        rows = np.empty(indptr[-1], dtype=np.int64)
+        tfs = np.empty(indptr[-1], dtype=np.float32)
+        for term_id, term in enumerate(terms):
+            posting = postings[term]
+            start, end = indptr[term_id], indptr[term_id + 1]
+            rows[start:end] = [row_of[doc_id] for doc_id in posting]
+            tfs[start:end] = list(posting.values())
+
+        document_count = len(doc_ids)
+        return _Matrix(
+            version=version,
+            doc_ids=doc_ids,
+            row_of=row_of,
+            term_ids={term: term_id for term_id, term in enumerate(terms)},
+            indptr=indptr,
+            rows=rows,
+            tfs=tfs,
+            doc_lengths=np.fromiter((doc_lengths[doc_id] for doc_id in doc_ids), dtype=np.float32, count=document_count),
+            idf=np.log1p((document_count - lengths + 0.5) / (lengths + 0.5)).astype(np.float32),
+        )
+
+    def refresh(self):
+        """Rebuild now, in the calling thread."""
+        self._matrix = self._build()
+
+    def _current(self) -> _Matrix:
+        matrix = self._matrix
+        if matrix is None:
+            # Nothing to serve yet, so the first build is waited for
+            with self._rebuild_lock:
+                if self._matrix is None:
+                    self._matrix = self._build()
+                return self._matrix
+        if matrix.version != self.keyword_index.version:
+            self._schedule_rebuild()
+        return matrix
+
+    def _schedule_rebuild(self):
+        with self._rebuild_lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="bm25-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self._matrix = self._build()
+        except Exception:
+            logger.exception("BM25 rebuild failed; serving the previous build")
+        finally:
+            with self._rebuild_lock:
+                self._rebuilding = False
+
+    def search(self, query: str, k: int, allowed_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Return up to ``k`` ``(doc_id, score)`` pairs, best first."""
+        matrix = self._current()
+        term_ids = sorted({matrix.term_ids[token] for token in tokenize(query) if token in matrix.term_ids})
+        if not term_ids or not matrix.doc_ids:
+            return []
+
+        slices = [np.arange(matrix.indptr[term_id], matrix.indptr[term_id + 1]) for term_id in term_ids]
+        positions = np.concatenate(slices)
+        idf = np.repeat(matrix.idf[term_ids], [len(piece) for piece in slices])
+        rows = matrix.rows[positions]
+        tf = matrix.tfs[positions]
+        norm = self.k1 * (1 - self.b + self.b * matrix.doc_lengths[rows] / max(matrix.doc_lengths.mean(), 1.0))
+        scores = np.bincount(rows, weights=idf * tf * (self.k1 + 1) / (tf + norm), minlength=len(matrix.doc_ids))
+
+        if allowed_ids is not None:
+            allowed_rows = [matrix.row_of[doc_id] for doc_id in allowed_ids if doc_id in matrix.row_of]
+            mask = np.zeros(len(matrix.doc_ids), dtype=bool)
+            mask[allowed_rows] = True
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(matrix.doc_ids[row], float(scores[row])) for row in candidates]
@@ -0,0 +1,155 @@
+from typing import Literal, Optional
+
+import faiss
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings
+
+# faiss asks for at least this many training points per IVF centroid (and PQ code)
+MIN_POINTS_PER_CENTROID = 39
+
+# How each storage precision encodes vectors in a faiss factory string
+PRECISION_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+# Fewest bits per PQ code worth training; smaller samples are stored as int8 instead
+MIN_PQ_NBITS = 4
+
+
+class IndexSpec(BaseModel):
+    """Which FAISS index a segment is built with, and its default search-time knobs.
+
+    ``flat`` is exact. ``ivf`` trades recall for latency through ``nprobe``
+    (inverted lists visited per query, out of ``nlist``); ``hnsw`` does the
+    same through ``ef_search`` (candidate list size), with ``m`` neighbours
+    per graph node.
+
+    ``precision`` sets how vectors are stored: ``float16`` halves memory and
+    ``int8`` scalar quantization quarters it, both with little recall loss;
+    ``pq`` product quantization keeps ``pq_m`` bytes per vector (at 8 bits
+    per code); a flat PQ index is a single-list IVF-PQ, since a bare
+    ``IndexPQ`` accepts no search parameters and so no ID selectors. With ``rerank`` a compressed index over-fetches
+    ``rerank_factor * k`` candidates and orders them by exact distance
+    against full-precision vectors kept on disk.
+    """
+
+    kind: Literal["flat", "ivf", "hnsw"] = "flat"
+    nlist: int = 1024
+    nprobe: int = 16
+    m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    precision: Literal["float32", "float16", "int8", "pq"] = "float32"
+    pq_m: int = 64
+    pq_nbits: int = 8
+    rerank: bool = True
+    rerank_factor: int = 4
+    train_sample_size: int = 50_000
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "IndexSpec":
+        return cls(
+            kind=settings.VECTOR_INDEX_TYPE,
+            nlist=settings.VECTOR_INDEX_NLIST,
+            nprobe=settings.VECTOR_INDEX_NPROBE,
+            m=settings.VECTOR_INDEX_HNSW_M,
+            ef_construction=settings.VECTOR_INDEX_EF_CONSTRUCTION,
+            ef_search=settings.VECTOR_INDEX_EF_SEARCH,
+            precision=settings.VECTOR_INDEX_PRECISION,
+            pq_m=settings.VECTOR_INDEX_PQ_M,
+            rerank=settings.VECTOR_INDEX_RERANK,
+            rerank_factor=settings.VECTOR_INDEX_RERANK_FACTOR,
+        )
+
+    @property
+    def keeps_full_precision(self) -> bool:
+        """Whether segments keep float32 copies of their vectors for re-ranking."""
+        return self.rerank and self.rerank_factor > 1 and self.precision != "float32"
+
+    def encoding(self, pq_nbits: Optional[int] = None) -> str:
+        if self.precision == "pq":
+            return f"PQ{self.pq_m}x{pq_nbits or self.pq_nbits}"
+        return PRECISION_CODES[self.precision]
+
+    def factory_string(
+        self, nlist: Optional[int] = None, pq_nbits: Optional[int] = None, encoding: Optional[str] = None
+    ) -> str:
+        encoding = encoding or self.encoding(pq_nbits)
+        if self.kind == "ivf":
+            return f"IVF{nlist or self.nlist},{encoding}"
+        if self.kind == "hnsw":
+            return f"HNSW{self.m},Flat" if encoding == "Flat" else f"HNSW{self.m}_{encoding}"
+        if encoding.startswith("PQ"):
+            # One inverted list is still an exhaustive scan, and IVF takes ID selectors
+            return f"IVF1,{encoding}"
+        return encoding
+
+    def pq_nbits_for(self, sample_size: int) -> Optional[int]:
+        """Bits per PQ code a training sample of ``sample_size`` supports, or None if too few to train PQ."""
+        supported = int(np.log2(max(1, sample_size // MIN_POINTS_PER_CENTROID)))
+        nbits = min(self.pq_nbits, supported)
+        return nbits if nbits >= MIN_PQ_NBITS else None
+
+    def build(self, dimension: int, training_vectors: np.ndarray) -> faiss.Index:
+        """
+        Create an empty index, training it on a sample of ``training_vectors`` if the type needs it.
+
+        IVF clamps ``nlist`` and PQ the bits per code to what the sample can
+        support, so a small first batch still yields a usable (if coarse)
+        index until it is compacted. A sample too small to train PQ codebooks
+        (even a single vector) gets an int8 index instead; compaction later
+        rebuilds it as PQ once enough vectors exist.
+        """
+        if self.precision == "pq" and dimension % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dimension}")
+        nlist = pq_nbits = encoding = None
+        if self.kind == "ivf":
+            nlist = max(1, min(self.nlist, len(training_vectors) // MIN_POINTS_PER_CENTROID))
+        if self.precision == "pq":
+            pq_nbits = self.pq_nbits_for(len(training_vectors))
+            if pq_nbits is None:
+                encoding = PRECISION_CODES["int8"]
+        index = faiss.index_factory(dimension, self.factory_string(nlist, pq_nbits, encoding))
+        if self.kind == "hnsw":
+            index.hnsw.efConstruction = self.ef_construction
+        if not index.is_trained:
+            index.train(self.training_sample(training_vectors))
+        self.apply_defaults(index)
+        return index
+
+    def training_sample(self, vectors: np.ndarray) -> np.ndarray:
+        if len(vectors) <= self.train_sample_size:
+            return vectors
+        rows = np.random.default_rng(0).choice(len(vectors), self.train_sample_size, replace=False)
+        return vectors[np.sort(rows)]
+
+    def apply_defaults(self, index: faiss.Index):
+        """Set the default search-time parameters on a freshly built or loaded index."""
+        if self.kind == "ivf":
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        elif self.kind == "hnsw":
+            index.hnsw.efSearch = self.ef_search
+
+    def search_parameters(
+        self,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        selector: Optional[faiss.IDSelector] = None,
+    ) -> Optional[faiss.SearchParameters]:
+        """
+        Per-query overrides; ``None`` keeps the index defaults.
+
+        ``selector`` restricts the search to the selected rows. faiss parameter
+        objects carry their own defaults, so the spec's defaults are filled in
+        whenever a parameter object has to be built for the selector alone.
+        """
+        if self.kind == "ivf" and (nprobe is not None or selector is not None):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or self.nprobe)
+        if self.kind == "flat" and self.precision == "pq" and selector is not None:
+            # Single-list IVF-PQ; the int8 stand-ins built from small samples accept these parameters too
+            return faiss.SearchParametersIVF(sel=selector, nprobe=1)
+        if self.kind == "hnsw" and (ef_search is not None or selector is not None):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or self.ef_search)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
@@ -0,0 +1,119 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """Token- and metadata-level posting lists over the documents in the vector store.
+
+    ``postings`` maps a token to ``{doc_id: term frequency}`` and
+    ``metadata_postings`` maps a ``(field, value)`` pair to the IDs carrying it,
+    so keyword and metadata predicates are answered by intersecting posting
+    lists instead of scanning document text. ``version`` increases on every
+    change so derived structures (e.g. the BM25 matrix) know when to rebuild.
+    """
+
+    version = 0
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.metadata_postings: Dict[Tuple[str, str], Set[str]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._doc_fields: Dict[str, List[Tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id: str, content: str, metadata: Optional[Mapping[str, Any]] = None):
+        if doc_id in self:
+            self.remove(doc_id)
+        tokens = tokenize(content)
+        frequencies = Counter(tokens)
+        for token, frequency in frequencies.items():
+            self.postings.setdefault(token, {})[doc_id] = frequency
+        fields = [(field, str(value)) for field, value in (metadata or {}).items()]
+        for field in fields:
+            self.metadata_postings.setdefault(field, set()).add(doc_id)
+        self.doc_lengths[doc_id] = len(tokens)
+        self._doc_terms[doc_id] = list(frequencies)
+        self._doc_fields[doc_id] = fields
+        self.version += 1
+
+    def remove(self, doc_id: str):
+        for token in self._doc_terms.pop(doc_id, []):
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+        for field in self._doc_fields.pop(doc_id, []):
+            posting = self.metadata_postings.get(field)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.metadata_postings[field]
+        self.doc_lengths.pop(doc_id, None)
+        self.version += 1
+
+    def _keyword_ids(self, keyword: str) -> Set[str]:
+        """Documents containing every token of ``keyword``."""
+        postings = [self.postings.get(token, {}) for token in tokenize(keyword)]
+        if not postings:
+            return set()
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+            if not matches:
+                break
+        return matches
+
+    def _field_ids(self, field: str, value: Any) -> Set[str]:
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        matches: Set[str] = set()
+        for candidate in values:
+            matches |= self.metadata_postings.get((field, str(candidate)), set())
+        return matches
+
+    def match(
+        self,
+        keywords: Optional[Iterable[str]] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+        require_all_keywords: bool = False,
+    ) -> Set[str]:
+        """
+        Return the IDs of documents matching the keyword and metadata predicates.
+
+        Keywords are OR-ed unless ``require_all_keywords``; a multi-word keyword
+        needs all of its tokens. Metadata filters are AND-ed across fields, and
+        a list value matches any of its entries.
+        """
+        clauses: List[Set[str]] = []
+        if keywords:
+            keyword_sets = [self._keyword_ids(keyword) for keyword in keywords]
+            if require_all_keywords:
+                clauses.extend(keyword_sets)
+            else:
+                clauses.append(set().union(*keyword_sets))
+        for field, value in (filters or {}).items():
+            clauses.append(self._field_ids(field, value))
+        if not clauses:
+            return set(self.doc_lengths)
+
+        clauses.sort(key=len)
+        matches = set(clauses[0])
+        for clause in clauses[1:]:
+            matches.intersection_update(clause)
+            if not matches:
+                break
+        return matches
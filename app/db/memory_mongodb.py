@@ -0,0 +1,81 @@
+import copy
+import uuid
+from typing import Any, Dict, List, Optional
+
+_OPERATORS = {
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+}
+
+
+def _matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator, operand in condition.items():
+                if operator not in _OPERATORS:
+                    raise ValueError(f"Unsupported query operator: {operator}")
+                try:
+                    if not _OPERATORS[operator](value, operand):
+                        return False
+                except TypeError:
+                    # Like MongoDB, values of another type (or missing ones) never compare
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class InMemoryMongoDB:
+    """A single-process stand-in for :class:`~app.db.mongodb.MongoDB`.
+
+    Keeps each collection as a list of documents and supports equality and
+    simple comparison queries, enough to run the service offline (load
+    tests, profiling, air-gapped hosts). Nothing is persisted.
+    """
+
+    def __init__(self):
+        self.collections: Dict[str, List[Dict[str, Any]]] = {}
+        self.db: Optional[str] = None
+
+    async def connect(self, db_name: str):
+        self.db = db_name
+
+    async def close(self):
+        pass
+
+    async def insert_document(self, collection: str, document: Dict[str, Any]) -> str:
+        document = copy.deepcopy(document)
+        document.setdefault("_id", uuid.uuid4().hex)
+        self.collections.setdefault(collection, []).append(document)
+        return str(document["_id"])
+
+    async def find_document(self, collection: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        documents = await self.find_documents(collection, query)
+        return documents[0] if documents else None
+
+    async def find_documents(self, collection: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [copy.deepcopy(document) for document in self.collections.get(collection, []) if _matches(document, query)]
+
+    async def update_document(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> int:
+        for document in self.collections.get(collection, []):
+            if _matches(document, query):
+                document.update(copy.deepcopy(update))
+                return 1
+        return 0
+
+    async def delete_document(self, collection: str, query: Dict[str, Any]) -> int:
+        documents = self.collections.get(collection, [])
+        for i, document in enumerate(documents):
+            if _matches(document, query):
+                del documents[i]
+                return 1
+        return 0
+
+    async def get_new_documents(self, collection: str, last_sync_time: Any) -> List[Dict[str, Any]]:
+        query = {"created_at": {"$gt": last_sync_time}}
+        return await self.find_documents(collection, query)
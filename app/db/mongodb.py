@@ -32,6 +32,7 @@ class MongoDB:
         result = await self.db[collection].delete_one(query)
         return result.deleted_count
 
-    async def get_new_documents(self, collection: str, last_sync_time: float) -> List[Dict[str, Any]]:
-        query = {"created_at": {"$gt": last_sync_time}}
+    async def get_new_documents(self, collection: str, last_sync_time: Any) -> List[Dict[str, Any]]:
+        # Inclusive: a later insert can share the newest timestamp already synced
+        query = {"created_at": {"$gte": last_sync_time}}
         return await self.find_documents(collection, query)
\ No newline at end of file
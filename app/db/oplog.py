@@ -0,0 +1,122 @@
+import base64
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def encode_vector(vector) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(encoded: str) -> List[float]:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32).tolist()
+
+
+class OperationLog:
+    """Append-only JSON-lines log of the changes applied since the last snapshot.
+
+    Every record carries a sequence number. A snapshot stores the last
+    sequence it contains, so after a crash the store restores the snapshot
+    and replays only the newer records; records are idempotent (adds skip
+    known IDs, upserts replace, deletes of missing IDs are no-ops), so
+    replaying one the snapshot already has is harmless. Each append is
+    fsynced before the change is acknowledged. A torn last line from a crash
+    mid-write is skipped.
+
+    Worker processes share the log. Appends and truncation hold an exclusive
+    ``flock`` on ``<path>.lock``, which also stores the last sequence handed
+    out, so numbers are unique and ordered across processes.
+    """
+
+    def __init__(self, path: str, seq: int = 0):
+        # ``seq`` is the snapshot's last sequence, so numbering continues past it even after truncation
+        self.path = path
+        self.lock_path = path + ".lock"
+        with self._locked() as lock_fd:
+            last = max(seq, self._read_seq(lock_fd), *(record["seq"] for record in self._read(after=0)))
+            self._write_seq(lock_fd, last)
+        # The last sequence this process appended or read
+        self.seq = last
+
+    @contextmanager
+    def _locked(self, operation: int = fcntl.LOCK_EX) -> Iterator[int]:
+        lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, operation)
+            yield lock_fd
+        finally:
+            os.close(lock_fd)
+
+    @staticmethod
+    def _read_seq(lock_fd: int) -> int:
+        raw = os.pread(lock_fd, 32, 0).strip()
+        return int(raw) if raw else 0
+
+    @staticmethod
+    def _write_seq(lock_fd: int, seq: int):
+        os.pwrite(lock_fd, f"{seq:<20d}\n".encode("ascii"), 0)
+
+    def append(self, op: str, **payload: Any) -> int:
+        """Write one record and fsync it; blocking, so async callers run it in an executor."""
+        with self._locked() as lock_fd:
+            seq = self._read_seq(lock_fd) + 1
+            line = json.dumps({"seq": seq, "op": op, **payload}, default=str)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (line + "\n").encode("utf-8"))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._write_seq(lock_fd, seq)
+        self.seq = max(self.seq, seq)
+        return seq
+
+    def records(self, after: int = 0) -> List[Dict[str, Any]]:
+        """The records newer than ``after``, in sequence order."""
+        with self._locked(fcntl.LOCK_SH):
+            records = self._read(after)
+        if records:
+            self.seq = max(self.seq, records[-1]["seq"])
+        return records
+
+    def records_and_last_seq(self, after: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """The records newer than ``after`` and the last sequence handed out, read together."""
+        with self._locked(fcntl.LOCK_SH) as lock_fd:
+            return self._read(after), self._read_seq(lock_fd)
+
+    def _read(self, after: int) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping unreadable operation log record in %s", self.path)
+                    continue
+                if record["seq"] > after:
+                    records.append(record)
+        return records
+
+    def truncate(self, through: int):
+        """Drop the records up to ``through`` (now covered by a snapshot), keeping later ones.
+
+        Records other processes append meanwhile wait for the lock, so none are lost.
+        """
+        with self._locked():
+            records = self._read(after=through)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
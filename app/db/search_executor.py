@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from cross_cutting.observability.metrics import SEARCH_BATCH_FILL_RATIO, SEARCH_QUEUE_DELAY_SECONDS
+
+
+class SearchExecutorConfig(BaseModel):
+    window_ms: float = 2.0
+    max_batch_size: int = 32
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SearchExecutorConfig":
+        return cls(window_ms=settings.VECTOR_SEARCH_WINDOW_MS, max_batch_size=settings.VECTOR_SEARCH_MAX_BATCH)
+
+
+class _PendingSearch:
+    __slots__ = ("query", "k", "future", "enqueued_at")
+
+    def __init__(self, query: str, k: int, future: asyncio.Future):
+        self.query = query
+        self.k = k
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class SearchExecutor:
+    """Coalesces concurrent similarity searches into batched work off the event loop.
+
+    Queries are collected for up to ``window_ms`` or until ``max_batch_size``
+    are waiting, embedded with one provider call, searched with one
+    multi-query FAISS call in a worker thread, and the results are fanned
+    back out to the waiting coroutines. Queries with different search-time
+    parameters are batched separately.
+    """
+
+    def __init__(self, store: Any, config: SearchExecutorConfig = SearchExecutorConfig()):
+        self.store = store
+        self.config = config
+        self._pending: Dict[Tuple, List[_PendingSearch]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    async def search(self, query: str, k: int, **search_kwargs) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        group = tuple(sorted(search_kwargs.items()))
+        pending = _PendingSearch(query, k, loop.create_future())
+        batch = self._pending.setdefault(group, [])
+        batch.append(pending)
+
+        if len(batch) >= self.config.max_batch_size:
+            self._flush(group)
+        elif len(batch) == 1:
+            self._timers[group] = loop.call_later(self.config.window_ms / 1000, self._flush, group)
+        return await pending.future
+
+    def _flush(self, group: Tuple):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, [])
+        if batch:
+            task = asyncio.ensure_future(self._run(batch, dict(group)))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[_PendingSearch], search_kwargs: Dict[str, Any]):
+        started = time.perf_counter()
+        SEARCH_BATCH_FILL_RATIO.observe(len(batch) / self.config.max_batch_size)
+        for pending in batch:
+            SEARCH_QUEUE_DELAY_SECONDS.observe(started - pending.enqueued_at)
+
+        try:
+            vectors = await self.store.embeddings.aembed_documents([pending.query for pending in batch])
+            queries = np.asarray(vectors, dtype=np.float32)
+            k = max(pending.k for pending in batch)
+            results = await self.store._search_async(queries, k, **search_kwargs)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        for pending, hits in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result([doc for doc, _ in hits[:pending.k]])
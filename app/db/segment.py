@@ -0,0 +1,274 @@
+import os
+import tempfile
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.exceptions import RAGVectorStoreException
+from app.db.index_spec import IndexSpec
+
+# Read flat codes in place from the page cache so forked workers share them.
+# Older faiss builds only know IO_FLAG_MMAP.
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+class VectorFile:
+    """Full-precision float32 copies of a segment's vectors, kept on disk and read through mmap.
+
+    Compressed indexes only hold codes; these rows are what candidates are
+    re-ranked against. A writable file grows in an unlinked temporary file
+    and is written out as ``.npy`` on save; a loaded one is a read-only
+    ``np.load(mmap_mode="r")`` view, so the page cache holds only the rows
+    that re-ranking actually touches.
+    """
+
+    def __init__(self, dimension: int, array: Optional[np.ndarray] = None):
+        self.dimension = dimension
+        self._array = array
+        self._file = None
+        self._count = 0 if array is None else len(array)
+        if array is None:
+            self._file = tempfile.TemporaryFile()
+
+    @classmethod
+    def open(cls, path: str) -> "VectorFile":
+        array = np.load(path, mmap_mode="r")
+        return cls(array.shape[1], array)
+
+    @property
+    def read_only(self) -> bool:
+        return self._file is None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, vectors: np.ndarray):
+        if self.read_only:
+            raise RAGVectorStoreException("Cannot append to a read-only vector file")
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._file.flush()
+        self._count += len(vectors)
+        self._array = None
+
+    def _view(self) -> np.ndarray:
+        if self._array is None:
+            self._array = np.memmap(self._file, dtype=np.float32, mode="r", shape=(self._count, self.dimension))
+        return self._array
+
+    def rows(self, positions: np.ndarray) -> np.ndarray:
+        return np.asarray(self._view()[positions])
+
+    def save(self, path: str):
+        np.save(path, self._view() if self._count else np.zeros((0, self.dimension), dtype=np.float32))
+
+
+def rerank(queries: np.ndarray, positions: np.ndarray, vectors: VectorFile, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-score candidate ``positions`` by exact L2 against ``vectors`` and keep the best ``k`` per query."""
+    valid = positions != -1
+    candidates = vectors.rows(np.where(valid, positions, 0).ravel()).reshape(*positions.shape, -1)
+    distances = ((candidates - queries[:, None, :]) ** 2).sum(axis=-1)
+    distances[~valid] = np.inf
+    order = np.argsort(distances, axis=1)[:, :k]
+    distances = np.take_along_axis(distances, order, axis=1)
+    positions = np.where(np.isinf(distances), -1, np.take_along_axis(positions, order, axis=1))
+    return distances.astype(np.float32), positions
+
+
+class Segment:
+    """A FAISS index plus the document IDs of its rows.
+
+    Segments loaded from a snapshot are memory-mapped and read-only; new
+    documents always go to an owned, writable segment. ``vectors`` holds the
+    full-precision rows when the index is compressed and re-ranking is on.
+
+    Rows are never removed from the index in place. Deleting (or replacing)
+    a document sets its bit in ``tombstones`` and searches pass the live
+    rows to FAISS as a bitmap selector; ``merge`` later rebuilds without them.
+    """
+
+    def __init__(
+        self,
+        index: faiss.Index,
+        ids: Optional[List[str]] = None,
+        read_only: bool = False,
+        vectors: Optional[VectorFile] = None,
+    ):
+        self.index = index
+        self.ids = ids or []
+        self.read_only = read_only
+        self.vectors = vectors
+        self.tombstones = np.zeros(len(self.ids), dtype=bool)
+        self.dead = 0
+        self._positions: Optional[Dict[str, int]] = None
+        self._live_selector: Optional[faiss.IDSelector] = None
+
+    @classmethod
+    def build(cls, spec: IndexSpec, dimension: int, training_vectors: np.ndarray) -> "Segment":
+        vectors = VectorFile(dimension) if spec.keeps_full_precision else None
+        return cls(spec.build(dimension, training_vectors), vectors=vectors)
+
+    @classmethod
+    def load(cls, path: str, ids: List[str], spec: IndexSpec, mmap: bool = True) -> "Segment":
+        index = faiss.read_index(path, MMAP_FLAG if mmap else 0)
+        spec.apply_defaults(index)
+        vectors_path = os.path.splitext(path)[0] + ".npy"
+        vectors = VectorFile.open(vectors_path) if os.path.exists(vectors_path) else None
+        if vectors is not None and not mmap:
+            # An owned segment keeps accepting rows, so its full-precision copy must be writable too
+            owned = VectorFile(vectors.dimension)
+            owned.append(vectors.rows(np.arange(len(vectors))))
+            vectors = owned
+        segment = cls(index, ids, read_only=mmap, vectors=vectors)
+        tombstones_path = os.path.splitext(path)[0] + ".tombstones.npy"
+        if os.path.exists(tombstones_path):
+            segment.tombstones = np.load(tombstones_path)
+            segment.dead = int(segment.tombstones.sum())
+        return segment
+
+    @classmethod
+    def merge(
+        cls, spec: IndexSpec, dimension: int, segments: List["Segment"], lock=None
+    ) -> Tuple[Optional["Segment"], List[Tuple["Segment", np.ndarray]]]:
+        """
+        Build one segment from the live rows of ``segments``.
+
+        Also returns the ``(segment, positions)`` each merged row came from,
+        so rows deleted while the merge ran can be tombstoned afterwards.
+        ``lock`` is held while the rows are read, not while the new index is built.
+        """
+        with lock or nullcontext():
+            for segment in segments:
+                segment.prepare_lookups()
+            sources = [(segment, segment.live_positions()) for segment in segments]
+            sources = [(segment, positions) for segment, positions in sources if len(positions)]
+            if not sources:
+                return None, []
+            ids = [segment.ids[position] for segment, positions in sources for position in positions]
+            vectors = np.concatenate([segment.live_vectors(positions) for segment, positions in sources])
+        merged = cls.build(spec, dimension, vectors)
+        merged.add(ids, vectors)
+        return merged, sources
+
+    def save(self, path: str):
+        faiss.write_index(self.index, path)
+        if self.vectors is not None:
+            self.vectors.save(os.path.splitext(path)[0] + ".npy")
+        if self.dead:
+            np.save(os.path.splitext(path)[0] + ".tombstones.npy", self.tombstones)
+
+    @property
+    def live_count(self) -> int:
+        return len(self.ids) - self.dead
+
+    def _position_map(self) -> Dict[str, int]:
+        if self._positions is None:
+            self._positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+        return self._positions
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Append rows; an ID already held here is replaced (its old row is tombstoned)."""
+        if self.read_only:
+            raise RAGVectorStoreException("Cannot add vectors to a read-only segment")
+        self.delete(ids)
+        self.index.add(vectors)
+        if self.vectors is not None:
+            self.vectors.append(vectors)
+        self._position_map().update((doc_id, len(self.ids) + offset) for offset, doc_id in enumerate(ids))
+        self.ids.extend(ids)
+        self.tombstones = np.concatenate([self.tombstones, np.zeros(len(ids), dtype=bool)])
+        self._live_selector = None
+
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone the live rows of ``ids``; returns how many there were. Works on read-only segments too."""
+        positions = self._position_map()
+        deleted = 0
+        for doc_id in ids:
+            position = positions.get(doc_id)
+            if position is not None and not self.tombstones[position]:
+                self.tombstones[position] = True
+                deleted += 1
+        if deleted:
+            self.dead += deleted
+            self._live_selector = None
+        return deleted
+
+    def live_positions(self) -> np.ndarray:
+        return np.flatnonzero(~self.tombstones)
+
+    @property
+    def needs_lookups(self) -> bool:
+        """Whether ``prepare_lookups`` must run before ``live_vectors`` can decode rows."""
+        if self.vectors is not None:
+            return False
+        ivf = faiss.try_extract_index_ivf(self.index)
+        return ivf is not None and ivf.direct_map.no()
+
+    def prepare_lookups(self):
+        """Build the id -> list map an IVF index needs to decode rows. Mutates the index, so searches must be locked out."""
+        if self.needs_lookups:
+            # Later adds keep the map up to date
+            faiss.extract_index_ivf(self.index).make_direct_map()
+
+    def live_vectors(self, positions: np.ndarray) -> np.ndarray:
+        """Vectors of ``positions``, exact when full-precision copies are kept, else decoded from the index."""
+        if self.vectors is not None:
+            return self.vectors.rows(positions)
+        return self.index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+
+    def vectors_of(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Vectors of the live rows of ``ids`` held here."""
+        position_map = self._position_map()
+        live = [
+            (doc_id, position_map[doc_id]) for doc_id in ids
+            if doc_id in position_map and not self.tombstones[position_map[doc_id]]
+        ]
+        if not live:
+            return {}
+        vectors = self.live_vectors(np.asarray([position for _, position in live], dtype=np.int64))
+        return {doc_id: vector for (doc_id, _), vector in zip(live, vectors)}
+
+    def selector(self, allowed_ids: Set[str]) -> Optional[faiss.IDSelector]:
+        """An ID selector for the live rows of ``allowed_ids`` held here, or None if there are none."""
+        position_map = self._position_map()
+        positions = [
+            position_map[doc_id] for doc_id in allowed_ids
+            if doc_id in position_map and not self.tombstones[position_map[doc_id]]
+        ]
+        if not positions:
+            return None
+        return faiss.IDSelectorBatch(np.asarray(positions, dtype=np.int64))
+
+    def live_selector(self) -> Optional[faiss.IDSelector]:
+        """A bitmap selector masking tombstoned rows, or None when nothing is deleted."""
+        if not self.dead:
+            return None
+        selector = self._live_selector
+        if selector is None:
+            # Concurrent searches may each build one; the selector keeps its own bitmap alive
+            bits = np.packbits(~self.tombstones, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(self.tombstones), faiss.swig_ptr(bits))
+            selector.referenced_objects = [bits]
+            self._live_selector = selector
+        return selector
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        params: Optional[faiss.SearchParameters] = None,
+        rerank_factor: int = 1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-``k`` ``(distances, positions)`` per query.
+
+        With full-precision vectors and ``rerank_factor > 1`` the compressed
+        index over-fetches ``k * rerank_factor`` candidates, which are then
+        ordered by their exact distance.
+        """
+        if self.vectors is None or rerank_factor <= 1:
+            return self.index.search(queries, min(k, self.index.ntotal), params=params)
+        _, positions = self.index.search(queries, min(k * rerank_factor, self.index.ntotal), params=params)
+        return rerank(queries, positions, self.vectors, k)
@@ -0,0 +1,293 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import heapq
+import logging
+import multiprocessing
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from app.core.exceptions import RAGVectorStoreException
+from app.db.index_spec import IndexSpec
+from app.db.segment import Segment
+from cross_cutting.observability.metrics import SHARD_SEARCH_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# (distance, doc_id) pairs per query, best first
+Hits = List[List[Tuple[float, str]]]
+
+
+def shard_for(doc_id: str, num_shards: int) -> int:
+    """Stable shard assignment; unlike ``hash()`` it is identical in every process."""
+    digest = hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+# --- Worker process side -----------------------------------------------------
+
+_spec: Optional[IndexSpec] = None
+_segment: Optional[Segment] = None
+
+
+def _init_shard(spec_json: str, index_path: Optional[str], ids: List[str]):
+    global _spec, _segment
+    _spec = IndexSpec.model_validate_json(spec_json)
+    # The worker owns its copy outright, so it is loaded writable rather than mmap'd
+    _segment = Segment.load(index_path, list(ids), _spec, mmap=False) if index_path else None
+
+
+def _shard_stats() -> Tuple[int, int]:
+    """(live, tombstoned) rows held by this shard."""
+    return (0, 0) if _segment is None else (_segment.live_count, _segment.dead)
+
+
+def _shard_add(ids: List[str], vectors: np.ndarray) -> Tuple[int, int]:
+    global _segment
+    if _segment is None:
+        _segment = Segment.build(_spec, vectors.shape[1], vectors)
+    _segment.add(ids, vectors)
+    return _shard_stats()
+
+
+def _shard_delete(ids: List[str]) -> Tuple[int, int]:
+    if _segment is not None:
+        _segment.delete(ids)
+    return _shard_stats()
+
+
+def _shard_compact() -> Tuple[int, int]:
+    global _segment
+    if _segment is not None and _segment.dead:
+        _segment, _ = Segment.merge(_spec, _segment.index.d, [_segment])
+    return _shard_stats()
+
+
+def _shard_search(queries: np.ndarray, k: int, search_kwargs: Dict[str, Any]) -> Hits:
+    results: Hits = [[] for _ in range(len(queries))]
+    if _segment is None or _segment.index.ntotal == 0:
+        return results
+    allowed_ids = search_kwargs.pop("allowed_ids", None)
+    if allowed_ids is not None:
+        selector = _segment.selector(allowed_ids)
+        if selector is None:
+            return results
+    else:
+        selector = _segment.live_selector()
+    params = _spec.search_parameters(selector=selector, **search_kwargs)
+    distances, positions = _segment.search(queries, k, params, _spec.rerank_factor)
+    for row, (row_distances, row_positions) in enumerate(zip(distances, positions)):
+        results[row] = [
+            (float(distance), _segment.ids[position])
+            for distance, position in zip(row_distances, row_positions)
+            if position != -1
+        ]
+    return results
+
+
+def _shard_save(index_path: str) -> List[str]:
+    if _segment is None:
+        return []
+    _segment.save(index_path)
+    return list(_segment.ids)
+
+
+# --- Coordinator side --------------------------------------------------------
+
+class ShardingConfig(BaseModel):
+    num_shards: int = 1
+    deadline_ms: float = 250.0
+    allow_partial: bool = True
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ShardingConfig":
+        return cls(
+            num_shards=settings.VECTOR_STORE_SHARDS,
+            deadline_ms=settings.VECTOR_STORE_SHARD_DEADLINE_MS,
+            allow_partial=settings.VECTOR_STORE_SHARD_PARTIAL_RESULTS,
+        )
+
+    def create_index(self, spec: IndexSpec) -> "ShardedIndex":
+        return ShardedIndex.create(
+            self.num_shards, spec, deadline=self.deadline_ms / 1000.0, allow_partial=self.allow_partial
+        )
+
+    def load_index(self, spec: IndexSpec, index_paths: List[str], shard_ids: List[List[str]]) -> "ShardedIndex":
+        return ShardedIndex.load(
+            spec, index_paths, shard_ids, deadline=self.deadline_ms / 1000.0, allow_partial=self.allow_partial
+        )
+
+
+class ProcessShardBackend:
+    """One shard held by a dedicated worker process.
+
+    The worker owns its index, so add and search calls on a shard are
+    serialized by the single-worker pool and never race each other. A
+    search that has started cannot be cancelled, so one that overran its
+    deadline is remembered as overdue and the shard is skipped by new
+    searches until it finishes, rather than queueing them behind it.
+    """
+
+    def __init__(self, spec: IndexSpec, index_path: Optional[str] = None, ids: Sequence[str] = ()):
+        # spawn, not fork: forking a process that has started faiss/OpenMP threads can deadlock
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_shard,
+            initargs=(spec.model_dump_json(), index_path, list(ids)),
+        )
+        self.live, self.dead = len(ids), 0
+        self._overdue: Optional[concurrent.futures.Future] = None
+        # Start the worker now so a snapshot shard is loaded before its files can be pruned
+        self.submit(_shard_stats)
+
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        future = self.pool.submit(fn, *args)
+        if fn is not _shard_search and fn is not _shard_save:
+            future.add_done_callback(self._record_stats)
+        return future
+
+    @property
+    def lagging(self) -> bool:
+        """Whether a search that missed its deadline is still occupying the worker."""
+        return self._overdue is not None and not self._overdue.done()
+
+    def abandon(self, future: concurrent.futures.Future):
+        """Give up on a search past its deadline, cancelling it if it has not started yet."""
+        if not future.cancel():
+            self._overdue = future
+
+    def _record_stats(self, future: concurrent.futures.Future):
+        if not future.cancelled() and future.exception() is None:
+            self.live, self.dead = future.result()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ShardedIndex:
+    """Scatter-gather search over N shards partitioned by document-ID hash.
+
+    Every shard returns its own top-k and the coordinator merges them by
+    distance, which is exact for flat indexes. Shards that miss the
+    ``deadline``, or are still busy with a search that missed an earlier
+    one, are dropped when ``allow_partial`` is set; otherwise the search
+    fails.
+    """
+
+    def __init__(self, backends: List[ProcessShardBackend], deadline: float = 0.25, allow_partial: bool = True):
+        self.backends = backends
+        self.deadline = deadline
+        self.allow_partial = allow_partial
+
+    @classmethod
+    def create(cls, num_shards: int, spec: IndexSpec, **kwargs) -> "ShardedIndex":
+        return cls([ProcessShardBackend(spec) for _ in range(num_shards)], **kwargs)
+
+    @classmethod
+    def load(cls, spec: IndexSpec, index_paths: List[str], shard_ids: List[List[str]], **kwargs) -> "ShardedIndex":
+        backends = [
+            ProcessShardBackend(spec, path if os.path.exists(path) else None, ids)
+            for path, ids in zip(index_paths, shard_ids)
+        ]
+        return cls(backends, **kwargs)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.backends)
+
+    def __len__(self) -> int:
+        return sum(backend.live for backend in self.backends)
+
+    @property
+    def tombstone_ratio(self) -> float:
+        rows = sum(backend.live + backend.dead for backend in self.backends)
+        return sum(backend.dead for backend in self.backends) / rows if rows else 0.0
+
+    def _partition(self, ids: List[str]) -> Dict[int, List[int]]:
+        partitions: Dict[int, List[int]] = {}
+        for row, doc_id in enumerate(ids):
+            partitions.setdefault(shard_for(doc_id, self.num_shards), []).append(row)
+        return partitions
+
+    async def add(self, ids: List[str], vectors: np.ndarray):
+        """Add rows to their shards; a shard replaces IDs it already holds."""
+        await asyncio.gather(*(
+            asyncio.wrap_future(self.backends[shard].submit(_shard_add, [ids[row] for row in rows], vectors[rows]))
+            for shard, rows in self._partition(ids).items()
+        ))
+
+    async def delete(self, ids: List[str]):
+        await asyncio.gather(*(
+            asyncio.wrap_future(self.backends[shard].submit(_shard_delete, [ids[row] for row in rows]))
+            for shard, rows in self._partition(ids).items()
+        ))
+
+    async def compact(self, threshold: float) -> int:
+        """Rebuild every shard whose tombstone ratio exceeds ``threshold``; returns the rows dropped."""
+        targets = [
+            backend for backend in self.backends
+            if backend.dead and backend.dead / (backend.live + backend.dead) > threshold
+        ]
+        dropped = sum(backend.dead for backend in targets)
+        await asyncio.gather(*(asyncio.wrap_future(backend.submit(_shard_compact)) for backend in targets))
+        return dropped
+
+    def _scatter(
+        self, queries: np.ndarray, k: int, search_kwargs: Dict[str, Any]
+    ) -> List[Optional[concurrent.futures.Future]]:
+        """Submit the search to every shard; ``None`` for a shard still stuck on an overdue search."""
+        kwargs = dict(search_kwargs)
+        if kwargs.get("allowed_ids") is not None:
+            kwargs["allowed_ids"] = list(kwargs["allowed_ids"])
+        return [
+            None if backend.lagging else backend.submit(_shard_search, queries, k, kwargs)
+            for backend in self.backends
+        ]
+
+    def _gather(self, futures: List[Optional[concurrent.futures.Future]], queries: int, k: int) -> Hits:
+        merged: Hits = [[] for _ in range(queries)]
+        missed = [shard for shard, future in enumerate(futures) if future is None or not future.done()]
+        for shard in missed:
+            if futures[shard] is not None:
+                self.backends[shard].abandon(futures[shard])
+            SHARD_SEARCH_TIMEOUTS.labels(shard=str(shard)).inc()
+        if missed and not self.allow_partial:
+            raise RAGVectorStoreException(f"Shards {missed} missed the {self.deadline:.3f}s search deadline")
+        if missed:
+            logger.warning("Returning partial results: shards %s missed the search deadline", missed)
+
+        per_shard = [
+            future.result() for future in futures if future is not None and future.done() and not future.cancelled()
+        ]
+        for row in range(queries):
+            merged[row] = heapq.nsmallest(k, (hit for hits in per_shard for hit in hits[row]))
+        return merged
+
+    def search_sync(self, queries: np.ndarray, k: int, **search_kwargs) -> Hits:
+        futures = self._scatter(queries, k, search_kwargs)
+        concurrent.futures.wait([future for future in futures if future is not None], timeout=self.deadline)
+        return self._gather(futures, len(queries), k)
+
+    async def search(self, queries: np.ndarray, k: int, **search_kwargs) -> Hits:
+        futures = self._scatter(queries, k, search_kwargs)
+        dispatched = [asyncio.wrap_future(future) for future in futures if future is not None]
+        if dispatched:
+            await asyncio.wait(dispatched, timeout=self.deadline)
+        return self._gather(futures, len(queries), k)
+
+    async def save(self, directory: str) -> Tuple[List[str], List[List[str]]]:
+        files = [f"shard_{shard:03d}.faiss" for shard in range(self.num_shards)]
+        shard_ids = await asyncio.gather(*(
+            asyncio.wrap_future(backend.submit(_shard_save, os.path.join(directory, name)))
+            for backend, name in zip(self.backends, files)
+        ))
+        return files, list(shard_ids)
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
@@ -1,45 +1,793 @@
-from typing import List, Dict, Any
-from langchain_community.vectorstores import FAISS
+import asyncio
+import fcntl
+import logging
+import os
+import pickle
+import shutil
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from functools import partial
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
 from langchain_openai import OpenAIEmbeddings
+from pydantic import BaseModel
+
+from app.core.exceptions import RAGVectorStoreException
+from app.db.bm25 import BM25Index
+from app.db.index_spec import IndexSpec
+from app.db.keyword_index import InvertedIndex
+from app.db.oplog import OperationLog, decode_vector, encode_vector
+from app.db.rwlock import ReadWriteLock
+from app.db.search_executor import SearchExecutor, SearchExecutorConfig
+from app.db.segment import Segment
+from app.db.sharding import ShardedIndex, ShardingConfig
+from app.embeddings.batch_embedder import BatchEmbedder, BatchEmbedderConfig
+from app.embeddings.cache import EmbeddingCache
+from cross_cutting.observability.metrics import VECTOR_STORE_COMPACTIONS, VECTOR_STORE_TOMBSTONE_RATIO
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+DOCSTORE_FILE = "docstore.pkl"
+KEYWORD_INDEX_FILE = "keywords.pkl"
+OPLOG_FILE = "oplog.jsonl"
+SNAPSHOT_LOCK_FILE = "snapshot.lock"
+
+
+class SnapshotManifest(BaseModel):
+    format_version: int = SNAPSHOT_FORMAT_VERSION
+    version: int
+    created_at: float
+    dimension: int
+    document_count: int
+    segments: List[str]
+    num_shards: int = 1
+    index_spec: IndexSpec = IndexSpec()
+    high_water_mark: Optional[Any] = None
+    high_water_mark_type: Optional[str] = None
+    build_seconds: float = 0.0
+    oplog_seq: int = 0
+
+
+class StartupReport(BaseModel):
+    mode: str
+    snapshot_version: Optional[int] = None
+    documents_loaded: int = 0
+    documents_embedded: int = 0
+    load_seconds: float = 0.0
+    estimated_rebuild_seconds: float = 0.0
+    seconds_saved: float = 0.0
+
 
 class VectorStore:
-    def __init__(self):
-        self.vector_store = None
-        self.embeddings = None
+    def __init__(
+        self,
+        embedder_config: BatchEmbedderConfig = BatchEmbedderConfig(),
+        embedding_cache: Optional[EmbeddingCache] = None,
+        index_spec: IndexSpec = IndexSpec(),
+        search_config: SearchExecutorConfig = SearchExecutorConfig(),
+        sharding_config: ShardingConfig = ShardingConfig(),
+        compaction_threshold: float = 0.2,
+    ):
+        self.index_spec = index_spec
+        self.sharding_config = sharding_config
+        # With more than one shard the vectors live in worker processes instead of local segments
+        self.shards: Optional[ShardedIndex] = None
+        # Searches run in worker threads and share the indexes; adds must not mutate one mid-search
+        self._index_lock = ReadWriteLock()
+        self.search_executor = SearchExecutor(self, search_config)
+        self.embedder_config = embedder_config
+        self.embedding_cache = embedding_cache
+        self.embeddings: Optional[Embeddings] = None
+        self.embedder: Optional[BatchEmbedder] = None
+        self.segments: List[Segment] = []
+        self.docstore: Dict[str, Document] = {}
+        self.keyword_index = InvertedIndex()
+        self.bm25 = BM25Index(self.keyword_index, lock=self._index_lock)
+        self.dimension: Optional[int] = None
+        self.high_water_mark: Optional[Any] = None
+        self.snapshot_version = 0
+        # Bumped on every change to the contents, so answers derived from them can be invalidated
+        self.content_version = 0
+        # Seconds spent embedding and indexing the current contents, i.e. the
+        # cost of rebuilding from scratch. Persisted with each snapshot.
+        self.build_seconds = 0.0
+        # Changes since the last snapshot; attached once the store has a snapshot directory
+        self.oplog: Optional[OperationLog] = None
+        self.snapshot_path: Optional[str] = None
+        self.mmap = True
+        # Every log record up to this sequence has been applied here. Records this
+        # process appended past it are in ``_own_seqs``; other workers' are replayed by ``catch_up``.
+        self.applied_seq = 0
+        self._own_seqs: Set[int] = set()
+        # Orders logging and applying a change against catching up on other workers' changes
+        self._write_lock = asyncio.Lock()
+        # Rebuild without deleted rows once this fraction of indexed rows is tombstoned
+        self.compaction_threshold = compaction_threshold
+        self._compaction: Optional[asyncio.Task] = None
 
-    async def initialize(self, documents: List[Dict[str, Any]], openai_api_key: str):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        docs = [Document(page_content=doc['content'], metadata=doc['metadata']) for doc in documents]
+    @property
+    def is_initialized(self) -> bool:
+        return self.embeddings is not None and self.dimension is not None
 
-        if docs:
-            self.vector_store = FAISS.from_documents(docs, self.embeddings)
+    def _use_embeddings(self, embeddings: Optional[Embeddings], openai_api_key: str):
+        self.embeddings = embeddings or OpenAIEmbeddings(openai_api_key=openai_api_key)
+        self.embedder = BatchEmbedder(self.embeddings, self.embedder_config, cache=self.embedding_cache)
+
+    async def initialize(
+        self, documents: List[Dict[str, Any]], openai_api_key: str, embeddings: Optional[Embeddings] = None
+    ):
+        self._use_embeddings(embeddings, openai_api_key)
+        if documents:
+            await self._add(documents)
 
     async def add_documents(self, documents: List[Dict[str, Any]]):
-        if not self.vector_store:
+        """Add documents whose IDs are not in the store yet; known IDs are skipped."""
+        if not self.is_initialized:
             raise ValueError("VectorStore not initialized. Call initialize() first.")
-        docs = [Document(page_content=doc['content'], metadata=doc['metadata']) for doc in documents]
-        self.vector_store.add_documents(docs)
+        await self._add(documents)
 
-    async def similarity_search(self, query: str, k: int = 5) -> List[Document]:
-        if not self.vector_store:
+    async def upsert_documents(self, documents: List[Dict[str, Any]]):
+        """Add documents, replacing the content and vector of any ID already in the store."""
+        if not self.is_initialized:
             raise ValueError("VectorStore not initialized. Call initialize() first.")
-        docs = self.vector_store.similarity_search(query, k=k)
-        return docs
+        await self._add(documents, replace=True)
+
+    async def delete_documents(self, ids: List[str]) -> int:
+        """
+        Remove documents by ID and return how many were present.
 
-    def as_retriever(self):
-        if not self.vector_store:
+        Their vectors are tombstoned, which hides them from the very next
+        search; the index space is reclaimed by a later compaction.
+        """
+        if not self.is_initialized:
             raise ValueError("VectorStore not initialized. Call initialize() first.")
-        return self.vector_store.as_retriever()
+        return await self._delete([str(doc_id) for doc_id in ids])
+
+    async def _delete(self, ids: List[str], log: bool = True) -> int:
+        ids = [doc_id for doc_id in ids if doc_id in self.docstore]
+        if not ids:
+            return 0
+        async with self._write_lock if log else nullcontext():
+            if log and self.oplog is not None:
+                await self._log("delete", ids=ids)
+            if self.shards is not None:
+                await self.shards.delete(ids)
+            # Waiting out in-flight searches must not block the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._unindex_rows, ids)
+            # Documents last, so a concurrent search never sees an ID it cannot resolve
+            for doc_id in ids:
+                self.docstore.pop(doc_id, None)
+        self.content_version += 1
+        self._after_delete()
+        return len(ids)
+
+    async def _add(self, documents: List[Dict[str, Any]], replace: bool = False, log: bool = True):
+        if replace:
+            # The last version of an ID within one batch wins
+            documents = list({self._document_id(doc): doc for doc in documents}.values())
+        else:
+            documents = [doc for doc in documents if self._document_id(doc) not in self.docstore]
+        if not documents:
+            return
+        start = time.perf_counter()
+        vectors = np.asarray(await self._embed_documents(documents), dtype=np.float32)
+
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        ids = [self._document_id(doc) for doc in documents]
+        async with self._write_lock if log else nullcontext():
+            if not replace:
+                # Catching up on another worker's log may have added some of them meanwhile
+                keep = [position for position, doc_id in enumerate(ids) if doc_id not in self.docstore]
+                if not keep:
+                    return
+                documents = [documents[position] for position in keep]
+                ids = [ids[position] for position in keep]
+                vectors = vectors[keep]
+            replaced = [doc_id for doc_id in ids if doc_id in self.docstore]
+            if log and self.oplog is not None:
+                await self._log(
+                    "upsert" if replace else "add",
+                    documents=[
+                        {
+                            "id": doc_id,
+                            "content": doc['content'],
+                            "metadata": doc.get('metadata', {}),
+                            "embedding": encode_vector(vector),
+                        }
+                        for doc_id, doc, vector in zip(ids, documents, vectors)
+                    ],
+                    high_water_mark=_encode_high_water_mark(self._newest_created_at(documents)),
+                )
+            # Documents first, so a concurrent search never sees an ID it cannot resolve
+            for doc_id, doc in zip(ids, documents):
+                self.docstore[doc_id] = Document(id=doc_id, page_content=doc['content'], metadata=doc.get('metadata', {}))
+            if self.sharding_config.num_shards > 1:
+                if self.shards is None:
+                    self.shards = self.sharding_config.create_index(self.index_spec)
+                # A shard replaces IDs it already holds, and an ID always hashes to the same shard
+                await self.shards.add(ids, vectors)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._index_rows, ids, vectors, documents, replaced
+            )
+        self._advance_high_water_mark(documents)
+        self.build_seconds += time.perf_counter() - start
+        self.content_version += 1
+        if replaced:
+            self._after_delete()
+
+    async def _log(self, op: str, **payload: Any):
+        # The append fsyncs, so it runs off the event loop
+        seq = await asyncio.get_running_loop().run_in_executor(None, partial(self.oplog.append, op, **payload))
+        self._own_seqs.add(seq)
+
+    async def catch_up(self) -> int:
+        """
+        Apply the changes other worker processes logged since this store last looked.
+
+        Records are replayed in sequence order. This process's own records are
+        skipped while nothing from another worker precedes them; after that
+        they are replayed too, so the result matches the log's order. If
+        records this store never applied have already been truncated, it
+        reloads the current snapshot instead. Returns the number of records
+        replayed.
+        """
+        if self.oplog is None:
+            return 0
+        async with self._write_lock:
+            loop = asyncio.get_running_loop()
+            records, last_seq = await loop.run_in_executor(None, self.oplog.records_and_last_seq, self.applied_seq)
+            # Sequences are contiguous, so a gap means the next record needed is gone
+            first_seq = records[0]["seq"] if records else last_seq + 1
+            if first_seq > self.applied_seq + 1 and self.snapshot_exists(self.snapshot_path):
+                logger.info("Vector store is behind the operation log; reloading the current snapshot")
+                await self.restore(self.snapshot_path, "", mmap=self.mmap, embeddings=self.embeddings)
+                return 0
+            replayed = 0
+            interleaved = False
+            for record in records:
+                if interleaved or record["seq"] not in self._own_seqs:
+                    interleaved = True
+                    await self._replay(record)
+                    replayed += 1
+                self.applied_seq = record["seq"]
+            self._own_seqs = {seq for seq in self._own_seqs if seq > self.applied_seq}
+        return replayed
+
+    async def _embed_documents(self, documents: List[Dict[str, Any]]) -> List[List[float]]:
+        """Embed documents in batches, reusing vectors callers already computed."""
+        missing = [position for position, doc in enumerate(documents) if doc.get('embedding') is None]
+        fresh = await self.embedder.embed([documents[position]['content'] for position in missing])
+        vectors = [doc.get('embedding') for doc in documents]
+        for position, vector in zip(missing, fresh):
+            vectors[position] = vector
+        return vectors
+
+    def _index_rows(self, ids: List[str], vectors: np.ndarray, documents: List[Dict[str, Any]], replaced: List[str]):
+        """Add rows to the segments and keyword index; runs in a worker thread."""
+        fresh = None
+        if self.shards is None and (not self.segments or self.segments[-1].read_only):
+            # Training and filling a new segment can take seconds; searches keep running meanwhile
+            fresh = Segment.build(self.index_spec, self.dimension, vectors)
+            fresh.add(ids, vectors)
+        with self._index_lock.write():
+            if self.shards is None:
+                # Old rows are tombstoned in the same critical section the new ones are added in
+                for segment in self.segments:
+                    segment.delete(replaced)
+                if fresh is not None:
+                    self.segments.append(fresh)
+                else:
+                    self._writable_segment(vectors).add(ids, vectors)
+            for doc_id, doc in zip(ids, documents):
+                self.keyword_index.add(doc_id, doc['content'], doc.get('metadata'))
+
+    def _unindex_rows(self, ids: List[str]):
+        with self._index_lock.write():
+            for segment in self.segments:
+                segment.delete(ids)
+            for doc_id in ids:
+                self.keyword_index.remove(doc_id)
+
+    def _writable_segment(self, vectors: np.ndarray) -> Segment:
+        """Return the segment new vectors go to, building one from ``vectors`` if needed."""
+        if not self.segments or self.segments[-1].read_only:
+            self.segments.append(Segment.build(self.index_spec, self.dimension, vectors))
+        return self.segments[-1]
+
+    @staticmethod
+    def _document_id(doc: Dict[str, Any]) -> str:
+        if '_id' in doc:
+            return str(doc['_id'])
+        if 'id' in doc:
+            return str(doc['id'])
+        # Documents without an identity can never be deduplicated; give them a fresh one.
+        doc['id'] = str(uuid.uuid4())
+        return doc['id']
 
-    async def save(self, file_path: str):
-        if not self.vector_store:
+    @staticmethod
+    def _newest_created_at(documents: List[Dict[str, Any]]) -> Optional[Any]:
+        marks = [doc['created_at'] for doc in documents if doc.get('created_at') is not None]
+        return max(marks) if marks else None
+
+    def _advance_high_water_mark(self, documents: List[Dict[str, Any]]):
+        self._advance_high_water_mark_to(self._newest_created_at(documents))
+
+    def _advance_high_water_mark_to(self, newest: Optional[Any]):
+        if newest is None:
+            return
+        if self.high_water_mark is None or newest > self.high_water_mark:
+            self.high_water_mark = newest
+
+    @property
+    def tombstone_ratio(self) -> float:
+        """Fraction of indexed rows that belong to deleted or replaced documents."""
+        if self.shards is not None:
+            return self.shards.tombstone_ratio
+        rows = sum(len(segment.ids) for segment in self.segments)
+        return sum(segment.dead for segment in self.segments) / rows if rows else 0.0
+
+    def _after_delete(self):
+        ratio = self.tombstone_ratio
+        VECTOR_STORE_TOMBSTONE_RATIO.set(ratio)
+        if ratio > self.compaction_threshold and (self._compaction is None or self._compaction.done()):
+            self._compaction = asyncio.get_running_loop().create_task(self.compact())
+            self._compaction.add_done_callback(_log_compaction_failure)
+
+    async def compact(self) -> int:
+        """
+        Rebuild the index from live rows only and return how many tombstoned rows were dropped.
+
+        Runs off the event loop while searches, adds and deletes continue:
+        the current segments are sealed (new rows go to a fresh segment),
+        merged in a worker thread, and swapped in after re-applying deletes
+        that happened during the merge. Sharded stores compact each shard
+        that is over the threshold inside its worker.
+        """
+        start = time.perf_counter()
+        if self.shards is not None:
+            dropped = await self.shards.compact(self.compaction_threshold)
+        else:
+            loop = asyncio.get_running_loop()
+            sealed = await loop.run_in_executor(None, self._seal_segments)
+            dropped = sum(segment.dead for segment in sealed)
+            # Reading rows may build a direct map on an IVF index, which searches must not see mid-change
+            merged, sources = await loop.run_in_executor(
+                None, partial(Segment.merge, self.index_spec, self.dimension, sealed, lock=self._index_lock.write())
+            )
+            await loop.run_in_executor(None, self._swap_merged, sealed, merged, sources)
+        VECTOR_STORE_COMPACTIONS.inc()
+        VECTOR_STORE_TOMBSTONE_RATIO.set(self.tombstone_ratio)
+        logger.info("Compacted vector store: dropped %d tombstoned rows in %.2fs", dropped, time.perf_counter() - start)
+        return dropped
+
+    def _seal_segments(self) -> List[Segment]:
+        with self._index_lock.write():
+            sealed = list(self.segments)
+            for segment in sealed:
+                segment.read_only = True
+        return sealed
+
+    def _swap_merged(self, sealed: List[Segment], merged: Optional[Segment], sources: List[Tuple[Segment, np.ndarray]]):
+        with self._index_lock.write():
+            if merged is not None:
+                deleted_meanwhile = [
+                    segment.ids[position]
+                    for segment, positions in sources
+                    for position in positions[segment.tombstones[positions]]
+                ]
+                merged.delete(deleted_meanwhile)
+            self.segments = ([merged] if merged is not None else []) + self.segments[len(sealed):]
+
+    def _search(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        allowed_ids: Optional[Set[str]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search every segment (or shard) and merge the per-segment top-k by L2 distance.
+
+        ``allowed_ids`` is pushed down into FAISS as an ID selector, so only
+        those documents are scored instead of filtering after retrieval.
+        """
+        if self.shards is not None:
+            hits = self.shards.search_sync(
+                query_vectors, k, nprobe=nprobe, ef_search=ef_search, allowed_ids=allowed_ids
+            )
+            return self._resolve(hits, k)
+
+        candidates: List[List[Tuple[float, str]]] = [[] for _ in range(len(query_vectors))]
+        for segment in self.segments:
+            if segment.index.ntotal == 0:
+                continue
+            with self._index_lock.read():
+                if allowed_ids is not None:
+                    selector = segment.selector(allowed_ids)
+                    if selector is None:
+                        continue
+                else:
+                    if segment.live_count == 0:
+                        continue
+                    selector = segment.live_selector()
+                params = self.index_spec.search_parameters(nprobe=nprobe, ef_search=ef_search, selector=selector)
+                distances, positions = segment.search(query_vectors, k, params, self.index_spec.rerank_factor)
+            for row, (row_distances, row_positions) in enumerate(zip(distances, positions)):
+                for distance, position in zip(row_distances, row_positions):
+                    if position != -1:
+                        candidates[row].append((float(distance), segment.ids[position]))
+        for row in candidates:
+            row.sort(key=lambda candidate: candidate[0])
+        return self._resolve(candidates, k)
+
+    async def _search_async(self, query_vectors: np.ndarray, k: int, **search_kwargs) -> List[List[Tuple[Document, float]]]:
+        """Like ``_search`` but never blocks the event loop: shards are awaited, segments run in a thread."""
+        if self.shards is not None:
+            hits = await self.shards.search(query_vectors, k, **search_kwargs)
+            return self._resolve(hits, k)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self._search(query_vectors, k, **search_kwargs))
+
+    def _resolve(self, hits: List[List[Tuple[float, str]]], k: int) -> List[List[Tuple[Document, float]]]:
+        # A document deleted after its row was searched is dropped rather than failing the query
+        return [
+            [(self.docstore[doc_id], distance) for distance, doc_id in row[:k] if doc_id in self.docstore]
+            for row in hits
+        ]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        allowed_ids: Optional[Set[str]] = None,
+    ) -> List[Document]:
+        query = np.asarray([embedding], dtype=np.float32)
+        hits = self._search(query, k, nprobe=nprobe, ef_search=ef_search, allowed_ids=allowed_ids)
+        return [doc for doc, _ in hits[0]]
+
+    async def similarity_search(
+        self,
+        query: str,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        allowed_ids: Optional[Set[str]] = None,
+    ) -> List[Document]:
+        """
+        Return the ``k`` nearest documents to ``query``.
+
+        ``nprobe`` (IVF) and ``ef_search`` (HNSW) override the index defaults for
+        this query only: higher values raise recall at the cost of latency.
+        Concurrent calls are micro-batched by the search executor and the
+        FAISS work runs in a worker thread, off the event loop. ``allowed_ids``
+        restricts the search to those documents (see ``InvertedIndex.match``).
+        """
+        if not self.is_initialized:
             raise ValueError("VectorStore not initialized. Call initialize() first.")
-        self.vector_store.save_local(file_path)
+        if allowed_ids is not None and not allowed_ids:
+            return []
+        search_kwargs = {
+            name: value for name, value in (("nprobe", nprobe), ("ef_search", ef_search)) if value is not None
+        }
+        if allowed_ids is not None:
+            search_kwargs["allowed_ids"] = frozenset(allowed_ids)
+        return await self.search_executor.search(query, k, **search_kwargs)
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        The indexed vectors of ``ids`` held in local segments; sharded or unknown IDs are left out.
+
+        May wait for an add to finish, so async callers run it in an executor.
+        """
+        found: Dict[str, np.ndarray] = {}
+        if any(segment.needs_lookups for segment in self.segments):
+            with self._index_lock.write():
+                for segment in self.segments:
+                    segment.prepare_lookups()
+        with self._index_lock.read():
+            for segment in self.segments:
+                found.update(segment.vectors_of(ids))
+        return found
+
+    def as_retriever(self, k: int = 4, **search_kwargs) -> BaseRetriever:
+        if not self.is_initialized:
+            raise ValueError("VectorStore not initialized. Call initialize() first.")
+        return VectorStoreRetriever(store=self, k=k, search_kwargs=search_kwargs)
+
+    async def save(self, file_path: str, keep: int = 3) -> SnapshotManifest:
+        """Write a new versioned snapshot and point ``CURRENT`` at it.
+
+        The snapshot is written to a temporary directory first and renamed into
+        place, so a crash mid-save never leaves a half-written version behind.
+        Afterwards the operation log in ``file_path`` only keeps the changes
+        the snapshot may not contain.
+
+        Worker processes sharing ``file_path`` take turns through a file lock.
+        Each first applies the changes the others logged, so the snapshot
+        covers every record up to its ``oplog_seq``. The log is truncated
+        only through the previous snapshot's sequence, so a worker that is
+        one checkpoint behind can still catch up from it instead of
+        reloading the whole snapshot.
+        """
+        if not self.is_initialized:
+            raise ValueError("VectorStore not initialized. Call initialize() first.")
+        os.makedirs(file_path, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        lock_fd = os.open(os.path.join(file_path, SNAPSHOT_LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await loop.run_in_executor(None, fcntl.flock, lock_fd, fcntl.LOCK_EX)
+            return await self._save(file_path, keep)
+        finally:
+            os.close(lock_fd)
+
+    async def _save(self, file_path: str, keep: int) -> SnapshotManifest:
+        oplog_path = os.path.join(file_path, OPLOG_FILE)
+        if self.oplog is None or self.oplog.path != oplog_path:
+            # Whatever is already logged there is replayed before the snapshot claims to cover it
+            self.oplog = OperationLog(oplog_path)
+            self.snapshot_path = file_path
+            self.applied_seq = 0
+            self._own_seqs = set()
+        await self.catch_up()
+        oplog_seq = self.applied_seq
+        previous = _read_current_manifest(file_path)
+        loop = asyncio.get_running_loop()
+        version = max(self.snapshot_version, _read_current_version(file_path) or 0) + 1
+        name = _snapshot_name(version)
+        tmp_dir = os.path.join(file_path, f".{name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        if self.shards is not None:
+            # Each shard worker writes its own file; shard files take the place of segments
+            segment_files, segment_ids = await self.shards.save(tmp_dir)
+        else:
+            segment_files, segment_ids = [], []
+            for position, segment in enumerate(self.segments):
+                segment_file = f"segment_{position:03d}.faiss"
+                segment.save(os.path.join(tmp_dir, segment_file))
+                segment_files.append(segment_file)
+                segment_ids.append(segment.ids)
+        with open(os.path.join(tmp_dir, DOCSTORE_FILE), "wb") as f:
+            pickle.dump((self.docstore, segment_ids), f)
+        with open(os.path.join(tmp_dir, KEYWORD_INDEX_FILE), "wb") as f:
+            pickle.dump(self.keyword_index, f)
+
+        hwm, hwm_type = _encode_high_water_mark(self.high_water_mark)
+        manifest = SnapshotManifest(
+            version=version,
+            created_at=time.time(),
+            dimension=self.dimension,
+            document_count=len(self.docstore),
+            segments=segment_files,
+            num_shards=self.shards.num_shards if self.shards is not None else 1,
+            index_spec=self.index_spec,
+            high_water_mark=hwm,
+            high_water_mark_type=hwm_type,
+            build_seconds=self.build_seconds,
+            oplog_seq=oplog_seq,
+        )
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            f.write(manifest.model_dump_json())
+
+        os.replace(tmp_dir, os.path.join(file_path, name))
+        _write_current_version(file_path, name)
+        self.snapshot_version = version
+        self.snapshot_path = file_path
+        _prune_snapshots(file_path, keep)
+
+        if previous is not None:
+            await loop.run_in_executor(None, self.oplog.truncate, min(previous.oplog_seq, oplog_seq))
+        return manifest
+
+    async def checkpoint(self) -> Optional[SnapshotManifest]:
+        """Snapshot into the directory the store was restored from or last saved to, if any.
+
+        Keeps the operation log short: it only has to hold the changes since.
+        """
+        if self.snapshot_path is None:
+            return None
+        return await self.save(self.snapshot_path)
+
+    async def restore(
+        self, file_path: str, openai_api_key: str, mmap: bool = True, embeddings: Optional[Embeddings] = None
+    ) -> SnapshotManifest:
+        """Replace the contents of this store with the snapshot ``CURRENT`` points at.
+
+        With ``mmap`` the segment indexes are mapped read-only instead of being
+        copied onto the heap; documents added afterwards go to a new segment.
+        Changes logged after the snapshot was taken are then replayed, so a
+        crash between snapshots loses nothing that was acknowledged.
+        """
+        manifest = _read_current_manifest(file_path)
+        if manifest is None:
+            raise RAGVectorStoreException(f"No vector store snapshot found at {file_path}")
+        snapshot_dir = os.path.join(file_path, _snapshot_name(manifest.version))
+        if manifest.format_version > SNAPSHOT_FORMAT_VERSION:
+            raise RAGVectorStoreException(
+                f"Snapshot format {manifest.format_version} is newer than supported ({SNAPSHOT_FORMAT_VERSION})"
+            )
+        with open(os.path.join(snapshot_dir, DOCSTORE_FILE), "rb") as f:
+            docstore, segment_ids = pickle.load(f)
+        keyword_index_path = os.path.join(snapshot_dir, KEYWORD_INDEX_FILE)
+        if os.path.exists(keyword_index_path):
+            with open(keyword_index_path, "rb") as f:
+                keyword_index = pickle.load(f)
+        else:
+            keyword_index = InvertedIndex()
+            for doc_id, doc in docstore.items():
+                keyword_index.add(doc_id, doc.page_content, doc.metadata)
+
+        if manifest.num_shards > 1 and manifest.num_shards != self.sharding_config.num_shards:
+            raise RAGVectorStoreException(
+                f"Snapshot has {manifest.num_shards} shards but the store is configured for "
+                f"{self.sharding_config.num_shards}; rebuild the index to reshard"
+            )
+        shards = None
+        if manifest.num_shards > 1:
+            shards = self.sharding_config.load_index(
+                manifest.index_spec,
+                [os.path.join(snapshot_dir, segment_file) for segment_file in manifest.segments],
+                segment_ids,
+            )
+
+        segments = [
+            Segment.load(os.path.join(snapshot_dir, segment_file), ids, manifest.index_spec, mmap=mmap)
+            for segment_file, ids in zip(manifest.segments if shards is None else [], segment_ids)
+        ]
+
+        self._use_embeddings(embeddings, openai_api_key)
+        self.index_spec = manifest.index_spec
+        self.close()
+        self.shards = shards
+        self.segments = segments
+        self.docstore = docstore
+        self.keyword_index = keyword_index
+        self.bm25 = BM25Index(keyword_index, lock=self._index_lock)
+        self.dimension = manifest.dimension
+        self.high_water_mark = _decode_high_water_mark(manifest.high_water_mark, manifest.high_water_mark_type)
+        self.snapshot_version = manifest.version
+        self.build_seconds = manifest.build_seconds
+        self.content_version += 1
+
+        self.snapshot_path = file_path
+        self.mmap = mmap
+        self.oplog = OperationLog(os.path.join(file_path, OPLOG_FILE), seq=manifest.oplog_seq)
+        self.applied_seq = manifest.oplog_seq
+        self._own_seqs = set()
+        replayed = 0
+        for record in self.oplog.records(after=manifest.oplog_seq):
+            await self._replay(record)
+            self.applied_seq = record["seq"]
+            replayed += 1
+        if replayed:
+            logger.info("Replayed %d operation log records on top of snapshot v%s", replayed, manifest.version)
+        return manifest
+
+    async def _replay(self, record: Dict[str, Any]):
+        if record["op"] == "delete":
+            await self._delete(record["ids"], log=False)
+            return
+        documents = [
+            {
+                "_id": doc["id"],
+                "content": doc["content"],
+                "metadata": doc.get("metadata", {}),
+                "embedding": decode_vector(doc["embedding"]),
+            }
+            for doc in record["documents"]
+        ]
+        await self._add(documents, replace=record["op"] == "upsert", log=False)
+        self._advance_high_water_mark_to(_decode_high_water_mark(*record["high_water_mark"]))
+
+    def close(self):
+        """Stop the shard worker processes, if any."""
+        if self.shards is not None:
+            self.shards.close()
+            self.shards = None
 
     @classmethod
-    async def load(cls, file_path: str, openai_api_key: str):
+    async def load(
+        cls, file_path: str, openai_api_key: str, mmap: bool = True, embeddings: Optional[Embeddings] = None
+    ):
         instance = cls()
-        instance.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        instance.vector_store = FAISS.load_local(file_path, instance.embeddings)
-        return instance
\ No newline at end of file
+        await instance.restore(file_path, openai_api_key, mmap=mmap, embeddings=embeddings)
+        return instance
+
+    @staticmethod
+    def snapshot_exists(file_path: str) -> bool:
+        return _read_current_name(file_path) is not None
+
+
+class VectorStoreRetriever(BaseRetriever):
+    """LangChain retriever over :class:`VectorStore`, usable wherever a ``BaseRetriever`` is expected."""
+
+    store: Any
+    k: int = 4
+    search_kwargs: Dict[str, Any] = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.store.embeddings.embed_query(query)
+        return self.store.similarity_search_by_vector(embedding, k=self.k, **self.search_kwargs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.store.similarity_search(query, k=self.k, **self.search_kwargs)
+
+
+def _read_current_name(file_path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(file_path, CURRENT_POINTER)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name if name and os.path.isdir(os.path.join(file_path, name)) else None
+
+
+def _snapshot_name(version: int) -> str:
+    return f"v{version:06d}"
+
+
+def _read_current_manifest(file_path: str) -> Optional[SnapshotManifest]:
+    current = _read_current_name(file_path)
+    if current is None:
+        return None
+    with open(os.path.join(file_path, current, MANIFEST_FILE)) as f:
+        return SnapshotManifest.model_validate_json(f.read())
+
+
+def _read_current_version(file_path: str) -> Optional[int]:
+    name = _read_current_name(file_path)
+    return int(name[1:]) if name else None
+
+
+def _write_current_version(file_path: str, name: str):
+    tmp_pointer = os.path.join(file_path, f".{CURRENT_POINTER}.tmp")
+    with open(tmp_pointer, "w") as f:
+        f.write(name)
+    os.replace(tmp_pointer, os.path.join(file_path, CURRENT_POINTER))
+
+
+def _prune_snapshots(file_path: str, keep: int):
+    versions = sorted(
+        entry for entry in os.listdir(file_path)
+        if entry.startswith("v") and os.path.isdir(os.path.join(file_path, entry))
+    )
+    for stale in versions[:-keep]:
+        shutil.rmtree(os.path.join(file_path, stale), ignore_errors=True)
+
+
+def _encode_high_water_mark(value: Any) -> Tuple[Any, Optional[str]]:
+    if value is None:
+        return None, None
+    if isinstance(value, datetime):
+        return value.isoformat(), "datetime"
+    return value, type(value).__name__
+
+
+def _decode_high_water_mark(value: Any, value_type: Optional[str]) -> Any:
+    if value is None:
+        return None
+    if value_type == "datetime":
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _log_compaction_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Vector store compaction failed", exc_info=task.exception())
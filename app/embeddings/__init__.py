@@ -0,0 +1,3 @@
+from .providers import HashEmbeddings, get_embedding_provider
+from .batch_embedder import BatchEmbedder, BatchEmbedderConfig
+from .cache import EmbeddingCache, EmbeddingFileStore, EmbeddingCacheMetrics
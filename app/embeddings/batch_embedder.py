@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from app.core.exceptions import RAGLLMException
+from app.embeddings.cache import EmbeddingCache
+from app.utils.tokenization import count_tokens
+from cross_cutting.observability.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Client errors that retrying the same request cannot fix; the rest of 4xx is final too
+_RETRYABLE_STATUSES = {408, 409, 429}
+_REQUEST_TOO_LARGE_STATUS = 413
+_TOO_LARGE_MARKERS = ("too many tokens", "too long", "too large", "maximum context length", "token limit", "batch size")
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_too_large(error: Exception) -> bool:
+    """Whether the provider rejected the request for its size, so a smaller batch can succeed."""
+    if _status_code(error) == _REQUEST_TOO_LARGE_STATUS:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _TOO_LARGE_MARKERS)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether the same request may succeed later: rate limits, timeouts, server and network errors."""
+    status = _status_code(error)
+    if status is None:
+        return True
+    return status in _RETRYABLE_STATUSES or status >= 500
+
+
+async def _gather_or_cancel(*awaitables: Awaitable) -> None:
+    """Run ``awaitables`` concurrently; on the first failure cancel the rest and raise it."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    for task in tasks:
+        if task in done and task.exception() is not None:
+            raise task.exception()
+
+
+class BatchEmbedderConfig(BaseModel):
+    max_batch_items: int = 256
+    max_batch_tokens: int = 100_000
+    max_concurrency: int = 4
+    max_retries: int = 3
+    retry_backoff: float = 0.5  # seconds, doubled on every retry
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "BatchEmbedderConfig":
+        return cls(
+            max_batch_items=settings.EMBEDDING_BATCH_SIZE,
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+        )
+
+
+class BatchEmbedder:
+    """Embeds many texts with as few provider round trips as possible.
+
+    Texts are packed into batches bounded by item count and token count, at
+    most ``max_concurrency`` batches are in flight at once, and results come
+    back in input order. Transient failures (rate limits, timeouts, server
+    errors) are retried with backoff; a batch rejected for its size is split
+    in half; any other client error fails the job at once. The first batch
+    to fail for good cancels the others still in flight. With a cache, only
+    distinct texts that miss it reach the provider.
+    """
+
+    def __init__(
+        self,
+        provider: Embeddings,
+        config: BatchEmbedderConfig = BatchEmbedderConfig(),
+        token_counter: Callable[[str], int] = count_tokens,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.provider = provider
+        self.config = config
+        self.token_counter = token_counter
+        self.cache = cache
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def plan_batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Greedily pack consecutive text positions into batches."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for position, text in enumerate(texts):
+            tokens = self.token_counter(text)
+            if current and (
+                len(current) >= self.config.max_batch_items
+                or current_tokens + tokens > self.config.max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(position)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+
+        results: List[Optional[List[float]]] = await self.cache.get_many(texts) if self.cache else [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for position, (text, vector) in enumerate(zip(texts, results)):
+            if vector is None:
+                pending.setdefault(text, []).append(position)
+        if not pending:
+            return results
+
+        unique_texts = list(pending)
+        fresh: List[Optional[List[float]]] = [None] * len(unique_texts)
+        await _gather_or_cancel(
+            *(self._embed_batch(unique_texts, batch, fresh) for batch in self.plan_batches(unique_texts))
+        )
+        if self.cache:
+            await self.cache.put_many(unique_texts, fresh)
+        for text, vector in zip(unique_texts, fresh):
+            for position in pending[text]:
+                results[position] = vector
+        return results
+
+    async def _embed_batch(self, texts: Sequence[str], batch: List[int], results: List[Optional[List[float]]]):
+        for attempt in range(self.config.max_retries + 1):
+            if attempt:
+                EMBEDDING_BATCH_RETRIES.inc()
+                await asyncio.sleep(self.config.retry_backoff * 2 ** (attempt - 1))
+            try:
+                async with self._semaphore:
+                    vectors = await self.provider.aembed_documents([texts[position] for position in batch])
+            except Exception as e:
+                if _is_too_large(e) and len(batch) > 1:
+                    logger.warning("Embedding batch of %d is too large, splitting it: %s", len(batch), e)
+                    break
+                if _is_too_large(e) or not _is_retryable(e):
+                    raise RAGLLMException(f"Embedding failed: {e}") from e
+                if attempt == self.config.max_retries:
+                    raise RAGLLMException(f"Embedding failed after {attempt + 1} attempts: {e}") from e
+                logger.warning("Embedding batch of %d failed (attempt %d): %s", len(batch), attempt + 1, e)
+                continue
+            EMBEDDING_BATCH_SIZE.observe(len(batch))
+            for position, vector in zip(batch, vectors):
+                results[position] = vector
+            return
+
+        middle = len(batch) // 2
+        await _gather_or_cancel(
+            self._embed_batch(texts, batch[:middle], results),
+            self._embed_batch(texts, batch[middle:], results),
+        )
@@ -0,0 +1,290 @@
+import asyncio
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from cross_cutting.observability.metrics import EMBEDDING_CACHE_LOOKUPS
+
+FILE_MAGIC = b"EMBC"
+FILE_FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI")  # magic, format version, dimension
+KEY_SIZE = 32
+
+
+class EmbeddingCacheMetrics(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so that trivially different copies share one cache entry.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embedding_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class EmbeddingFileStore:
+    """Append-only binary file of ``(sha256 key, float32 vector)`` records, shared by every process using it.
+
+    Only the key -> offset map lives in memory; vectors are read back with
+    ``pread`` on demand and checked against their stored key. Appends go
+    through ``O_APPEND`` under an exclusive ``flock``, so several workers
+    (or a bootstrap running beside a server) can share one file, and
+    records appended by other processes are indexed on the next miss. Once
+    the file outgrows ``max_bytes`` it is rewritten with its newest half;
+    processes still holding the old file reopen it. Every call does blocking
+    disk I/O, so async callers run them in a thread (see ``EmbeddingCache``).
+    """
+
+    def __init__(self, path: str, dimension: int, max_bytes: int = 1 << 30):
+        self.path = path
+        self.dimension = dimension
+        self.record_size = KEY_SIZE + dimension * 4
+        self.max_bytes = max_bytes
+        self._offsets: Dict[bytes, int] = {}
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        # File offset up to which records are in ``_offsets``
+        self._indexed = HEADER.size
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino == self._inode:
+                    return
+            except FileNotFoundError:
+                pass
+            # Rewritten (or removed) by another process: start over on the current file
+            os.close(self._fd)
+            self._fd = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, HEADER.pack(FILE_MAGIC, FILE_FORMAT_VERSION, self.dimension))
+            else:
+                magic, version, dimension = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+                if magic != FILE_MAGIC or version != FILE_FORMAT_VERSION or dimension != self.dimension:
+                    raise ValueError(f"{self.path} is not a compatible embedding cache file")
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._inode = os.fstat(fd).st_ino
+        self._offsets = {}
+        self._indexed = HEADER.size
+        self._catch_up()
+
+    def _complete_end(self) -> int:
+        # A torn final record (crash mid-append) is not part of the file; the next append cuts it off
+        size = os.fstat(self._fd).st_size
+        return HEADER.size + (size - HEADER.size) // self.record_size * self.record_size
+
+    def _catch_up(self):
+        """Index the records other processes appended since the last look."""
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            self._index_through(self._complete_end())
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _index_through(self, end: int):
+        # Callers hold the file lock, so no record in range is half written
+        count = (end - self._indexed) // self.record_size
+        if count <= 0:
+            return
+        layout = np.dtype([("key", f"V{KEY_SIZE}"), ("vector", "<f4", (self.dimension,))])
+        with mmap.mmap(self._fd, end, access=mmap.ACCESS_READ) as view:
+            keys = np.ndarray((count,), dtype=layout, buffer=view, offset=self._indexed)["key"].copy()
+        self._offsets.update((bytes(key), self._indexed + position * self.record_size) for position, key in enumerate(keys))
+        self._indexed = end
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        with self._lock:
+            self._open()
+            if any(key not in self._offsets for key in keys):
+                self._catch_up()
+            vectors: List[Optional[List[float]]] = []
+            for key in keys:
+                offset = self._offsets.get(key)
+                raw = os.pread(self._fd, self.record_size, offset) if offset is not None else b""
+                if len(raw) != self.record_size or raw[:KEY_SIZE] != key:
+                    # Never hand out a vector stored under another key
+                    self._offsets.pop(key, None)
+                    vectors.append(None)
+                    continue
+                vectors.append(np.frombuffer(raw, dtype="<f4", offset=KEY_SIZE).tolist())
+        return vectors
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        return self.get_many([key])[0]
+
+    def put_many(self, items: Dict[bytes, Sequence[float]]):
+        # A record of the wrong size would misalign every record after it, for every process
+        _check_dimension(items.values(), self.dimension)
+        with self._lock:
+            while True:
+                self._open()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                if os.stat(self.path).st_ino == self._inode:
+                    break
+                # Rewritten while we waited for the lock
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            try:
+                end = self._complete_end()
+                if os.fstat(self._fd).st_size != end:
+                    os.ftruncate(self._fd, end)
+                self._index_through(end)
+                fresh = {key: vector for key, vector in items.items() if key not in self._offsets}
+                if not fresh:
+                    return
+                payload = memoryview(
+                    b"".join(key + np.asarray(vector, dtype="<f4").tobytes() for key, vector in fresh.items())
+                )
+                while payload:
+                    payload = payload[os.write(self._fd, payload):]
+                for position, key in enumerate(fresh):
+                    self._offsets[key] = end + position * self.record_size
+                self._indexed = end + len(fresh) * self.record_size
+                if self._indexed > self.max_bytes:
+                    self._rewrite()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _rewrite(self):
+        """Replace the file with its newest half of records; the caller holds the exclusive lock."""
+        records = (self._indexed - HEADER.size) // self.record_size
+        start = HEADER.size + (records - records // 2) * self.record_size
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(FILE_MAGIC, FILE_FORMAT_VERSION, self.dimension))
+            offset = start
+            while offset < self._indexed:
+                chunk = os.pread(self._fd, min(1 << 24, self._indexed - offset), offset)
+                f.write(chunk)
+                offset += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Reopened, and re-indexed, on the next call
+        self._inode = None
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            self._catch_up()
+            return len(self._offsets)
+
+
+def _check_dimension(vectors: Iterable[Sequence[float]], dimension: int):
+    for vector in vectors:
+        if len(vector) != dimension:
+            raise ValueError(
+                f"Embedding has {len(vector)} dimensions but the cache holds {dimension}; "
+                "set EMBEDDING_DIMENSION to match EMBEDDING_MODEL_NAME"
+            )
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model name, normalized text hash).
+
+    Lookups go to an in-process LRU first, then to the optional persistent
+    file store; entries found on disk are promoted into the LRU. File reads
+    and writes run in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 100_000,
+        store: Optional[EmbeddingFileStore] = None,
+        dimension: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.store = store
+        # Length every cached vector must have; None accepts any (the file store still checks its own)
+        self.dimension = dimension if dimension is not None else (store.dimension if store is not None else None)
+        self.metrics = EmbeddingCacheMetrics()
+        self._memory: "OrderedDict[bytes, List[float]]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "EmbeddingCache":
+        store = None
+        if settings.EMBEDDING_CACHE_PATH:
+            store = EmbeddingFileStore(
+                settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_DIMENSION, max_bytes=settings.EMBEDDING_CACHE_MAX_FILE_BYTES
+            )
+        return cls(
+            settings.EMBEDDING_MODEL_NAME,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            store=store,
+            dimension=settings.EMBEDDING_DIMENSION,
+        )
+
+    async def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        results = [self._memory_get(key) for key in keys]
+        missing = [position for position, vector in enumerate(results) if vector is None]
+        if missing and self.store is not None:
+            stored = await asyncio.to_thread(self.store.get_many, [keys[position] for position in missing])
+            for position, vector in zip(missing, stored):
+                if vector is not None:
+                    self._remember(keys[position], vector)
+                    self.metrics.disk_hits += 1
+                    EMBEDDING_CACHE_LOOKUPS.labels(result="disk_hit").inc()
+                    results[position] = vector
+        misses = sum(vector is None for vector in results)
+        self.metrics.misses += misses
+        EMBEDDING_CACHE_LOOKUPS.labels(result="miss").inc(misses)
+        return results
+
+    async def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        items = {embedding_key(self.model_name, text): list(vector) for text, vector in zip(texts, vectors)}
+        if self.dimension is not None:
+            _check_dimension(items.values(), self.dimension)
+        for key, vector in items.items():
+            self._remember(key, vector)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put_many, items)
+
+    def _memory_get(self, key: bytes) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.metrics.memory_hits += 1
+            EMBEDDING_CACHE_LOOKUPS.labels(result="memory_hit").inc()
+        return vector
+
+    def _remember(self, key: bytes, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_metrics(self) -> EmbeddingCacheMetrics:
+        return self.metrics
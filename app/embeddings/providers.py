@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import time
+from typing import List, Optional
+
+import httpx
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from app.core.config import Settings
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic, offline embedding provider.
+
+    Each text is hashed to seed a Gaussian vector, so the same text always
+    maps to the same unit vector and no network or model download is needed.
+    ``latency`` simulates a per-call round trip for throughput benchmarks.
+    """
+
+    def __init__(self, dimension: int = 1536, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def get_embedding_provider(
+    settings: Settings,
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+) -> Embeddings:
+    """
+    Build the embedding provider selected by ``EMBEDDING_PROVIDER``.
+
+    Remote providers send their requests through the given connection pools when provided.
+    """
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL_NAME,
+            openai_api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+    if settings.EMBEDDING_PROVIDER == "local":
+        return HashEmbeddings(dimension=settings.EMBEDDING_DIMENSION)
+    raise ValueError(f"Unknown embedding provider: {settings.EMBEDDING_PROVIDER}")
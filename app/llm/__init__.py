@@ -0,0 +1 @@
+from .providers import LocalChatModel, get_chat_model
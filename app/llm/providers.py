@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from app.core.config import Settings
+
+
+class LocalChatModel(BaseChatModel):
+    """Deterministic, offline chat model.
+
+    The answer fills ``template`` with an excerpt of the prompt chosen by a
+    hash of the prompt, so the same prompt always gets the same answer.
+    Each call waits for a first-token latency drawn from a log-normal
+    distribution with the given mean and standard deviation (also seeded by
+    the prompt), then emits words at ``tokens_per_second``, streamed or not.
+    """
+
+    model_name: str = "local"
+    max_tokens: Optional[int] = None
+    answer_tokens: int = 64
+    template: str = "Based on the provided context: {excerpt}"
+    latency_mean: float = 0.3
+    latency_stddev: float = 0.1
+    tokens_per_second: float = 60.0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-chat-model"
+
+    def _plan(self, messages: List[BaseMessage]) -> Tuple[float, List[str]]:
+        """First-token latency and answer words for ``messages``."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest(), "little")
+        rng = np.random.default_rng([self.seed, digest])
+
+        latency = 0.0
+        if self.latency_mean > 0:
+            # Log-normal with the configured mean and standard deviation
+            sigma = math.sqrt(math.log(1 + (self.latency_stddev / self.latency_mean) ** 2))
+            latency = float(rng.lognormal(math.log(self.latency_mean) - sigma ** 2 / 2, sigma))
+
+        words = prompt.split() or ["..."]
+        length = min(self.answer_tokens, self.max_tokens or self.answer_tokens)
+        start = int(rng.integers(0, max(len(words) - length, 0) + 1))
+        excerpt = " ".join(words[start:start + length])
+        return latency, self.template.format(excerpt=excerpt).split()
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, words: List[str]) -> ChatResult:
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=" ".join(words)))],
+            llm_output={"model_name": self.model_name, "token_usage": {"completion_tokens": len(words)}},
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, words = self._plan(messages)
+        time.sleep(latency + len(words) * self._token_delay())
+        return self._result(words)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency, words = self._plan(messages)
+        await asyncio.sleep(latency + len(words) * self._token_delay())
+        return self._result(words)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        latency, words = self._plan(messages)
+        time.sleep(latency)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        latency, words = self._plan(messages)
+        await asyncio.sleep(latency)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+
+
+def get_chat_model(
+    settings: Settings,
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+) -> BaseChatModel:
+    """
+    Build the chat model selected by ``LLM_PROVIDER``.
+
+    Remote providers send their requests through the given connection pools when provided.
+    """
+    if settings.LLM_PROVIDER == "openai":
+        return ChatOpenAI(
+            temperature=settings.OPENAI_LLM_TEMPERATURE,
+            model_name=settings.OPENAI_LLM_MODEL_NAME,
+            max_tokens=settings.OPENAI_LLM_MAX_TOKENS,
+            openai_api_key=settings.OPENAI_API_KEY,
+            # Shared pools keep connections to the API warm across requests
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+    if settings.LLM_PROVIDER == "local":
+        return LocalChatModel(
+            # Named after the configured model so token counts and cache keys match the real deployment
+            model_name=settings.OPENAI_LLM_MODEL_NAME,
+            max_tokens=settings.OPENAI_LLM_MAX_TOKENS,
+            answer_tokens=settings.LOCAL_LLM_ANSWER_TOKENS,
+            template=settings.LOCAL_LLM_TEMPLATE,
+            latency_mean=settings.LOCAL_LLM_LATENCY_MEAN,
+            latency_stddev=settings.LOCAL_LLM_LATENCY_STDDEV,
+            tokens_per_second=settings.LOCAL_LLM_TOKENS_PER_SECOND,
+            seed=settings.LOCAL_LLM_SEED,
+        )
+    raise ValueError(f"Unknown LLM provider: {settings.LLM_PROVIDER}")
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from app.db.keyword_index import tokenize
+from cross_cutting.compression import LLMCompressor
+from cross_cutting.observability.metrics import CONTEXT_COMPRESSION_SECONDS, CONTEXT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change what a question asks for
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "our the this to was we what when where which who why will with you your".split()
+)
+
+
+def question_class(question: str) -> str:
+    """Digest of the question's distinct content words, so rephrasings that ask the same thing share entries."""
+    terms = sorted({token for token in tokenize(question) if token not in STOPWORDS})
+    return hashlib.sha1(" ".join(terms).encode("utf-8")).hexdigest()[:16]
+
+
+class ContextCompressionConfig(BaseModel):
+    enabled: bool = True
+    ratio: float = 0.5
+    # Total tokens of retrieved context sent to the LLM; lowest-ranked chunks are dropped past it
+    token_budget: int = 2000
+    # Chunks shorter than this are passed through untouched
+    min_tokens: int = 32
+    max_concurrency: int = 4
+    cache_size: int = 10_000
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ContextCompressionConfig":
+        return cls(
+            enabled=settings.CONTEXT_COMPRESSION_ENABLED,
+            ratio=settings.CONTEXT_COMPRESSION_RATIO,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            min_tokens=settings.CONTEXT_COMPRESSION_MIN_TOKENS,
+            max_concurrency=settings.CONTEXT_COMPRESSION_CONCURRENCY,
+            cache_size=settings.CONTEXT_COMPRESSION_CACHE_SIZE,
+        )
+
+
+class ContextCompressor:
+    """Compresses retrieved chunks relative to the question and fits them into a token budget.
+
+    Chunks are compressed concurrently, at most ``max_concurrency`` at a
+    time. Results are cached in an LRU keyed by (chunk digest, question
+    class, ratio), so a popular chunk is compressed once per kind of
+    question rather than once per request. Chunks precompressed at
+    ingestion (``LLMCompressor.precompress``) at the same ratio are used as
+    they are, without a model call. After compression, chunks are
+    kept in rank order until ``token_budget`` is spent. Each returned
+    document records its original text and token counts in its metadata.
+    """
+
+    def __init__(
+        self,
+        compressor: LLMCompressor,
+        config: ContextCompressionConfig = ContextCompressionConfig(),
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.compressor = compressor
+        self.config = config
+        self.count_tokens = token_counter or compressor.count_tokens
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+        # (chunk digest, question class, ratio) -> (compressed text, compressed tokens)
+        self._cache: "OrderedDict[Tuple[str, str, float], Tuple[str, int]]" = OrderedDict()
+
+    async def compress_documents(self, documents: List[Document], question: str, fit: bool = True) -> List[Document]:
+        """Compress ``documents``; with ``fit`` off all are returned, for a later stage to budget."""
+        start = time.perf_counter()
+        qclass = question_class(question)
+        compressed = await asyncio.gather(*(self._compress(document, question, qclass) for document in documents))
+        kept = self.fit_budget(compressed) if fit else list(compressed)
+        CONTEXT_COMPRESSION_SECONDS.observe(time.perf_counter() - start)
+        return kept
+
+    def fit_budget(self, documents: List[Document]) -> List[Document]:
+        """Keep documents in rank order while they fit ``token_budget`` (the first is always kept)."""
+        kept, used = [], 0
+        for document in documents:
+            tokens = document.metadata["compressed_tokens"]
+            if kept and used + tokens > self.config.token_budget:
+                break
+            kept.append(document)
+            used += tokens
+        CONTEXT_TOKENS.labels(stage="retrieved").observe(sum(d.metadata["original_tokens"] for d in documents))
+        CONTEXT_TOKENS.labels(stage="sent").observe(used)
+        return kept
+
+    def uncompressed(self, document: Document) -> Document:
+        tokens = self.count_tokens(document.page_content)
+        return self._with_text(document, document.page_content, tokens, tokens)
+
+    async def _compress(self, document: Document, question: str, qclass: str) -> Document:
+        text = document.page_content
+        original_tokens = self.count_tokens(text)
+        if original_tokens < self.config.min_tokens:
+            return self._with_text(document, text, original_tokens, original_tokens)
+
+        key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), qclass, self.config.ratio)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return self._with_text(document, cached[0], original_tokens, cached[1])
+
+        # Chunks precompressed at ingestion skip the model, at the cost of not being focused on this question
+        precompressed = await self.compressor.cached(text, self.config.ratio)
+        if precompressed is not None:
+            return self._with_text(document, precompressed.compressed_prompt, original_tokens, precompressed.compressed_tokens)
+
+        try:
+            async with self._semaphore:
+                result = await self.compressor.compress(text, self.config.ratio, question=question)
+        except Exception as e:
+            # Overloaded or failed alike, the chunk is still worth sending
+            logger.warning("Sending a retrieved chunk uncompressed: %r", e)
+            return self._with_text(document, text, original_tokens, original_tokens)
+
+        self._cache[key] = (result.compressed_prompt, result.compressed_tokens)
+        if len(self._cache) > self.config.cache_size:
+            self._cache.popitem(last=False)
+        return self._with_text(document, result.compressed_prompt, original_tokens, result.compressed_tokens)
+
+    @staticmethod
+    def _with_text(document: Document, text: str, original_tokens: int, compressed_tokens: int) -> Document:
+        # A copy: the retrieved document may be the docstore's own object
+        metadata = {
+            **document.metadata,
+            "original_content": document.page_content,
+            "original_tokens": original_tokens,
+            "compressed_tokens": compressed_tokens,
+        }
+        return Document(page_content=text, metadata=metadata, id=document.id)
+
+
+class ContextCompressionRetriever(BaseRetriever):
+    """Wraps a retriever so the chain only ever sees compressed, budgeted context.
+
+    With ``fit_budget`` off every compressed chunk is returned, so a context
+    packer can drop duplicates before the one token budget is applied.
+    """
+
+    base: BaseRetriever
+    compressor: Any
+    fit_budget: bool = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # The compression engine only runs on the event loop, so synchronous callers just get the budget applied
+        documents = [self.compressor.uncompressed(document) for document in self.base.invoke(query)]
+        return self.compressor.fit_budget(documents) if self.fit_budget else documents
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = await self.base.ainvoke(query)
+        return await self.compressor.compress_documents(documents, query, fit=self.fit_budget)
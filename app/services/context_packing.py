@@ -0,0 +1,139 @@
+import asyncio
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from app.db.vector_store import VectorStore
+from cross_cutting.observability.metrics import CONTEXT_DUPLICATES_DROPPED, CONTEXT_PACKING_TOKENS_SAVED
+
+
+class ContextPackingConfig(BaseModel):
+    enabled: bool = True
+    # Tokens of retrieved context the prompt may hold
+    token_budget: int = 3000
+    # Chunks at least this cosine-similar to a chunk already kept are dropped as near-duplicates
+    duplicate_threshold: float = 0.95
+    # MMR trade-off: 1.0 keeps the retriever's order, lower values favour chunks unlike those already kept
+    mmr_lambda: float = 0.7
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ContextPackingConfig":
+        return cls(
+            enabled=settings.CONTEXT_PACKING_ENABLED,
+            # Whatever the window holds beyond the completion and the prompt's own text
+            token_budget=max(
+                settings.LLM_CONTEXT_WINDOW - settings.OPENAI_LLM_MAX_TOKENS - settings.CONTEXT_PACKING_RESERVED_TOKENS,
+                0,
+            ),
+            duplicate_threshold=settings.CONTEXT_PACKING_DUPLICATE_THRESHOLD,
+            mmr_lambda=settings.CONTEXT_PACKING_MMR_LAMBDA,
+        )
+
+
+class PackedContext:
+    """The chunks chosen for the prompt and what packing left out."""
+
+    def __init__(self, documents: List[Document], retrieved_tokens: int, packed_tokens: int, duplicates_dropped: int):
+        self.documents = documents
+        self.retrieved_tokens = retrieved_tokens
+        self.packed_tokens = packed_tokens
+        self.duplicates_dropped = duplicates_dropped
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.retrieved_tokens - self.packed_tokens
+
+    def report(self) -> dict:
+        return {
+            "retrieved_tokens": self.retrieved_tokens,
+            "packed_tokens": self.packed_tokens,
+            "tokens_saved": self.tokens_saved,
+            "duplicates_dropped": self.duplicates_dropped,
+        }
+
+
+class ContextPacker:
+    """Chooses which retrieved chunks go into the prompt, within a token budget.
+
+    Near-duplicates are dropped first: a chunk whose embedding is at least
+    ``duplicate_threshold`` cosine-similar to a better-ranked kept chunk
+    adds nothing. The rest are picked MMR-style, trading the retriever's
+    rank against similarity to the chunks already picked, and each is kept
+    only if it still fits the budget. Embeddings are the vectors already in
+    the index; only chunks it does not hold locally are embedded again.
+    Rank stands in for query relevance, which saves embedding the query a
+    second time.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        token_counter: Callable[[str], int],
+        config: ContextPackingConfig = ContextPackingConfig(),
+    ):
+        self.vector_store = vector_store
+        self.count_tokens = token_counter
+        self.config = config
+
+    async def pack(self, documents: List[Document]) -> PackedContext:
+        # Chunks compressed upstream were already counted with the same tokenizer
+        tokens = [
+            document.metadata.get("compressed_tokens") or self.count_tokens(document.page_content)
+            for document in documents
+        ]
+        if len(documents) <= 1:
+            kept = [i for i in range(len(documents)) if tokens[i] <= self.config.token_budget]
+            return self._packed(documents, tokens, kept, 0)
+
+        similarity = await self._similarity(documents)
+        n = len(documents)
+        # Near-duplicate elimination, best-ranked first
+        unique: List[int] = []
+        for i in range(n):
+            if unique and similarity[i, unique].max() >= self.config.duplicate_threshold:
+                continue
+            unique.append(i)
+
+        relevance = 1.0 - np.arange(n) / n
+        kept: List[int] = []
+        used = 0
+        candidates = list(unique)
+        while candidates:
+            redundancy = similarity[np.ix_(candidates, kept)].max(axis=1) if kept else np.zeros(len(candidates))
+            scores = self.config.mmr_lambda * relevance[candidates] - (1 - self.config.mmr_lambda) * redundancy
+            best = candidates.pop(int(np.argmax(scores)))
+            if used + tokens[best] <= self.config.token_budget:
+                kept.append(best)
+                used += tokens[best]
+        return self._packed(documents, tokens, kept, n - len(unique))
+
+    async def _similarity(self, documents: List[Document]) -> np.ndarray:
+        ids = [document.id for document in documents]
+        indexed = await asyncio.get_running_loop().run_in_executor(
+            None, self.vector_store.get_vectors, [doc_id for doc_id in ids if doc_id is not None]
+        )
+        missing = [i for i, doc_id in enumerate(ids) if doc_id not in indexed]
+        vectors: List[Optional[np.ndarray]] = [indexed.get(doc_id) for doc_id in ids]
+        if missing:
+            texts = [documents[i].metadata.get("original_content", documents[i].page_content) for i in missing]
+            for i, vector in zip(missing, await self.vector_store.embedder.embed(texts)):
+                vectors[i] = np.asarray(vector, dtype=np.float32)
+        matrix = np.vstack(vectors).astype(np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return matrix @ matrix.T
+
+    @staticmethod
+    def _packed(documents: List[Document], tokens: List[int], kept: List[int], duplicates: int) -> PackedContext:
+        packed = PackedContext(
+            documents=[documents[i] for i in kept],
+            retrieved_tokens=sum(tokens),
+            packed_tokens=sum(tokens[i] for i in kept),
+            duplicates_dropped=duplicates,
+        )
+        CONTEXT_PACKING_TOKENS_SAVED.observe(packed.tokens_saved)
+        if duplicates:
+            CONTEXT_DUPLICATES_DROPPED.inc(duplicates)
+        return packed
@@ -1,47 +1,189 @@
+import logging
+import time
+from app.core.config import Settings
 from app.db.mongodb import MongoDB
 from app.services.llm_service import LLMService
-from app.db.vector_store import VectorStore
-from typing import List, Dict
+from app.services.kb_version import KnowledgeBaseVersion
+from app.db.vector_store import VectorStore, StartupReport
+from app.embeddings.providers import get_embedding_provider
+from cross_cutting.observability.metrics import VECTOR_STORE_STARTUP_SECONDS, VECTOR_STORE_STARTUP_SAVED_SECONDS
+from cross_cutting.compression import LLMCompressor
+from langchain_core.embeddings import Embeddings
+from typing import Iterable, List, Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 class DataSyncService:
     def __init__(self):
         self.mongodb = None
         self.llm_service = None
         self.vector_store = None
+        self.kb_version = None
+        self.compressor = None
+        self.precompress_ratios = ()
+        self.precompress_concurrency = 4
+        self.documents_collection = "documents"
 
-
-    async def initialize(self, mongodb: MongoDB, llm_service: LLMService, vector_store: VectorStore):
+    async def initialize(
+        self,
+        mongodb: MongoDB,
+        llm_service: LLMService,
+        vector_store: VectorStore,
+        kb_version: Optional[KnowledgeBaseVersion] = None,
+        compressor: Optional[LLMCompressor] = None,
+        precompress_ratios: Iterable[float] = (),
+        precompress_concurrency: int = 4,
+        documents_collection: str = "documents",
+    ):
         self.mongodb = mongodb
         self.llm_service = llm_service
         self.vector_store = vector_store
+        self.kb_version = kb_version
+        # Chunks are compressed at these ratios as they are ingested, so queries find them in the cache
+        self.compressor = compressor
+        self.precompress_ratios = tuple(precompress_ratios)
+        self.precompress_concurrency = precompress_concurrency
+        self.documents_collection = documents_collection
+
+    async def bootstrap_vector_store(self, settings: Settings, embeddings: Optional[Embeddings] = None) -> StartupReport:
+        """
+        Bring the vector store up, preferring the on-disk snapshot over a full re-embed.
+
+        With a snapshot only documents created after its high-water mark are
+        embedded; otherwise the whole collection is embedded and a snapshot is
+        written so the next start can skip that work.
+        """
+        if not self.mongodb or not self.vector_store:
+            raise ValueError("DataSyncService not initialized. Call initialize() first.")
+
+        embeddings = embeddings or get_embedding_provider(settings)
+        start = time.perf_counter()
+        if settings.VECTOR_STORE_SNAPSHOT_BOOT and VectorStore.snapshot_exists(settings.VECTOR_STORE_PATH):
+            manifest = await self.vector_store.restore(
+                settings.VECTOR_STORE_PATH,
+                settings.OPENAI_API_KEY,
+                mmap=settings.VECTOR_STORE_MMAP,
+                embeddings=embeddings,
+            )
+            new_documents = []
+            if self.vector_store.high_water_mark is not None:
+                new_documents = await self.mongodb.get_new_documents(
+                    settings.DOCUMENTS_COLLECTION, self.vector_store.high_water_mark
+                )
+            else:
+                logger.warning("Snapshot v%s has no high-water mark; skipping catch-up", manifest.version)
+            await self.vector_store.add_documents(new_documents)
+
+            load_seconds = time.perf_counter() - start
+            report = StartupReport(
+                mode="snapshot",
+                snapshot_version=manifest.version,
+                documents_loaded=manifest.document_count,
+                documents_embedded=len(new_documents),
+                load_seconds=load_seconds,
+                estimated_rebuild_seconds=self.vector_store.build_seconds,
+                seconds_saved=max(self.vector_store.build_seconds - load_seconds, 0.0),
+            )
+        else:
+            documents = await self.mongodb.find_documents(settings.DOCUMENTS_COLLECTION, {})
+            await self.vector_store.initialize(
+                documents, settings.OPENAI_API_KEY, embeddings=embeddings
+            )
+            snapshot_version = None
+            if settings.VECTOR_STORE_SNAPSHOT_BOOT and self.vector_store.is_initialized:
+                manifest = await self.vector_store.save(
+                    settings.VECTOR_STORE_PATH, keep=settings.VECTOR_STORE_SNAPSHOTS_KEPT
+                )
+                snapshot_version = manifest.version
+            load_seconds = time.perf_counter() - start
+            report = StartupReport(
+                mode="full",
+                snapshot_version=snapshot_version,
+                documents_embedded=len(documents),
+                load_seconds=load_seconds,
+                estimated_rebuild_seconds=load_seconds,
+            )
+
+        VECTOR_STORE_STARTUP_SECONDS.labels(mode=report.mode).set(report.load_seconds)
+        VECTOR_STORE_STARTUP_SAVED_SECONDS.set(report.seconds_saved)
+        logger.info(
+            "Vector store ready (%s): %d loaded, %d embedded in %.2fs, ~%.2fs saved",
+            report.mode, report.documents_loaded, report.documents_embedded,
+            report.load_seconds, report.seconds_saved,
+        )
+        return report
 
     async def sync_data(self):
         if not self.mongodb or not self.llm_service or not self.vector_store:
             raise ValueError("DataSyncService not initialized. Call initialize() first.")
-        
+
         new_documents = await self.fetch_new_documents()
         processed_documents = await self.process_documents(new_documents)
         await self.update_vector_store(processed_documents)
+        if processed_documents:
+            await self.checkpoint()
+            # Retire answers cached against the old contents as soon as the new ones are searchable
+            if self.kb_version is not None:
+                await self.kb_version.bump()
+        await self.precompress_documents(processed_documents)
+        return {"success": True, "documents_processed": len(processed_documents)}
+
+    async def checkpoint(self):
+        """Snapshot the store after a sync so its operation log only holds what came since."""
+        try:
+            manifest = await self.vector_store.checkpoint()
+        except OSError as e:
+            # The changes are still in the operation log; the next checkpoint covers them
+            logger.warning("Vector store checkpoint failed: %s", e)
+            return
+        if manifest is not None:
+            logger.info("Checkpointed vector store as snapshot v%s", manifest.version)
 
     async def fetch_new_documents(self) -> List[Dict]:
+        """
+        Documents created at or after the high-water mark, one per ID.
+
+        The boundary is inclusive so documents sharing the newest timestamp
+        are not missed; the ones already synced come back again and are
+        upserted over themselves.
+        """
         if not self.mongodb or not self.llm_service or not self.vector_store:
             raise ValueError("DataSyncService not initialized. Call initialize() first.")
-        # Implement logic to fetch new documents from MongoDB
-        return await self.mongodb.get_new_documents()
+        if self.vector_store.high_water_mark is None:
+            documents = await self.mongodb.find_documents(self.documents_collection, {})
+        else:
+            documents = await self.mongodb.get_new_documents(self.documents_collection, self.vector_store.high_water_mark)
+        return list({str(doc['_id']): doc for doc in documents}.values())
 
     async def process_documents(self, documents: List[Dict]) -> List[Dict]:
         if not self.mongodb or not self.llm_service or not self.vector_store:
             raise ValueError("DataSyncService not initialized. Call initialize() first.")
-        
-        processed_docs = []
-        for doc in documents:
-            embedding = await self.llm_service.get_embedding(doc['content'])
-            processed_docs.append({
+
+        # Embed through the vector store's batch embedder so sync and search share one provider
+        embeddings = await self.vector_store.embedder.embed([doc['content'] for doc in documents])
+        return [
+            {
                 'id': doc['_id'],
                 'content': doc['content'],
+                'metadata': doc.get('metadata', {}),
+                'created_at': doc.get('created_at'),
                 'embedding': embedding
-            })
-        return processed_docs
+            }
+            for doc, embedding in zip(documents, embeddings)
+        ]
+
+    async def precompress_documents(self, documents: List[Dict]) -> int:
+        """Warm the compression cache for new chunks. Best effort: queries compress whatever is missed."""
+        if self.compressor is None or not self.precompress_ratios or not documents:
+            return 0
+        try:
+            return await self.compressor.precompress(
+                [doc['content'] for doc in documents], self.precompress_ratios, self.precompress_concurrency
+            )
+        except Exception as e:
+            logger.warning("Precompressing %d documents failed: %s", len(documents), e)
+            return 0
 
     async def update_vector_store(self, documents: List[Dict]):
-        await self.vector_store.add_documents(documents)
\ No newline at end of file
+        # Upsert so a re-synced document replaces its old vector instead of being skipped
+        await self.vector_store.upsert_documents(documents)
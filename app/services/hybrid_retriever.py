@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = 60) -> List[str]:
+    """
+    Merge ranked ID lists: each ID scores ``sum(1 / (rrf_k + rank))`` over the lists it appears in.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval fused with reciprocal rank fusion.
+
+    Both searches take the top ``per_source_k`` from their source and run
+    concurrently (BM25 scoring in a worker thread); the fused top ``k`` is
+    returned. Drop-in replacement for the plain vector store retriever.
+    """
+
+    store: Any
+    k: int = 4
+    per_source_k: int = 20
+    rrf_k: int = 60
+
+    def _fuse(self, dense: List[Document], sparse: List[Any]) -> List[Document]:
+        dense_ids = [doc.id or doc.page_content for doc in dense]
+        by_id = dict(zip(dense_ids, dense))
+        sparse_ids = [doc_id for doc_id, _ in sparse]
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids], rrf_k=self.rrf_k)
+        # A sparse hit may have been deleted since it was scored
+        documents = [by_id.get(doc_id) or self.store.docstore.get(doc_id) for doc_id in fused]
+        return [doc for doc in documents if doc is not None][: self.k]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.store.embeddings.embed_query(query)
+        dense = self.store.similarity_search_by_vector(embedding, k=self.per_source_k)
+        sparse = self.store.bm25.search(query, self.per_source_k)
+        return self._fuse(dense, sparse)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense, sparse = await asyncio.gather(
+            self.store.similarity_search(query, k=self.per_source_k),
+            asyncio.to_thread(self.store.bm25.search, query, self.per_source_k),
+        )
+        return self._fuse(dense, sparse)
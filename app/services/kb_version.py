@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from redis.exceptions import RedisError
+
+from cross_cutting.caching.redis_cache import BATCH_SIZE, RedisCache
+from cross_cutting.observability.metrics import CACHE_GENERATION_KEYS_COLLECTED, KNOWLEDGE_BASE_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseVersion:
+    """A monotonically increasing knowledge-base version kept in Redis.
+
+    Every sync that changes the knowledge base ``bump``s it (an atomic
+    INCR), and derived cache entries are written under a per-version
+    namespace (``key``). Readers simply stop finding the old generation, so
+    a sync retires every cached answer in O(1) without touching its keys.
+
+    Workers re-read the version at most every ``refresh_interval`` seconds.
+    When one sees it move, it sweeps the retired generations in the
+    background (one SCAN + UNLINK in batches, under a lock so only one
+    worker does it); whatever the sweep misses still expires with its TTL.
+
+    The version is shared but each worker searches its own copy of the
+    index, and only the worker that ran the sync has the new contents at
+    the moment of the bump. ``on_change`` lets the others catch up (the
+    container replays the shared operation log) before ``current`` hands
+    out the new version, so they do not cache answers from the old
+    contents under it. Without a shared log (no snapshot directory) a
+    worker keeps answering from its own contents until it is restarted,
+    and may cache such answers under the new version for up to their TTL.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        refresh_interval: float = 1.0,
+        on_change: Optional[Callable[[int], Awaitable[Any]]] = None,
+    ):
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self._version_key = f"{cache.config.prefix}kb:version"
+        # Generations below this one have been swept
+        self._collected_key = f"{cache.config.prefix}kb:collected"
+        self._generation = re.compile(rf"^{re.escape(cache.config.prefix)}kb(\d+):".encode("utf-8"))
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._collection: Optional[asyncio.Task] = None
+        self._catching_up: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(version: int, key: str) -> str:
+        return f"kb{version}:{key}"
+
+    async def current(self) -> int:
+        """The current version, re-read from Redis once ``refresh_interval`` has passed."""
+        if self._version is None or time.monotonic() - self._checked_at >= self.refresh_interval:
+            try:
+                raw = await self.cache.redis.get(self._version_key)
+            except RedisError as e:
+                logger.warning("Could not read the knowledge-base version, keeping v%s: %s", self._version, e)
+                return self._version or 0
+            self._observe(int(raw or 0))
+        await self._wait_for_catch_up()
+        return self._version
+
+    async def _wait_for_catch_up(self):
+        task = self._catching_up
+        if task is None or task.done():
+            return
+        try:
+            # shield: one request giving up must not cancel it for the others
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Catching up with knowledge-base v%s failed, answering from local contents: %s", self._version, e)
+
+    async def bump(self) -> int:
+        version = await self.cache.redis.incr(self._version_key)
+        self._observe(int(version))
+        logger.info("Knowledge base is now at v%d", version)
+        return self._version
+
+    def _observe(self, version: int):
+        previous = self._version
+        self._checked_at = time.monotonic()
+        # A lower version means Redis lost its data; follow it rather than pin a stale one
+        if version == previous:
+            return
+        self._version = version
+        KNOWLEDGE_BASE_VERSION.set(version)
+        if previous is not None and self.on_change is not None:
+            self._catching_up = asyncio.get_running_loop().create_task(self.on_change(version))
+        if version > 0 and (self._collection is None or self._collection.done()):
+            self._collection = asyncio.get_running_loop().create_task(self.collect())
+            self._collection.add_done_callback(self._log_collection_failure)
+
+    async def collect(self) -> int:
+        """Delete the keys of every generation below the current one; returns how many went."""
+        token = await self.cache.acquire_lock("kb:collect")
+        if token is None:
+            return 0
+        try:
+            version = self._version or 0
+            if int(await self.cache.redis.get(self._collected_key) or 0) >= version:
+                return 0
+            # One pass over every generation's keys, however many versions were bumped since the last sweep
+            collected = 0
+            batch = []
+            async for key in self.cache.redis.scan_iter(match=f"{self.cache.config.prefix}kb*", count=BATCH_SIZE):
+                match = self._generation.match(key if isinstance(key, bytes) else key.encode("utf-8"))
+                if match is None or int(match.group(1)) >= version:
+                    continue
+                batch.append(key)
+                if len(batch) >= BATCH_SIZE:
+                    collected += await self.cache.redis.unlink(*batch)
+                    batch = []
+            if batch:
+                collected += await self.cache.redis.unlink(*batch)
+            await self.cache.redis.set(self._collected_key, version)
+            if collected:
+                CACHE_GENERATION_KEYS_COLLECTED.inc(collected)
+                logger.info("Collected %d cache keys from knowledge-base versions below v%d", collected, version)
+            return collected
+        finally:
+            await self.cache.release_lock("kb:collect", token)
+
+    @staticmethod
+    def _log_collection_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cache generation collection failed: %s", task.exception())
@@ -1,18 +1,19 @@
-from typing import List
-from langchain_openai import ChatOpenAI
+from typing import List, Optional
+import httpx
 from app.core.config import Settings
+from app.llm.providers import get_chat_model
 
 class LLMService:
     def __init__(self):
         self.llm = None
 
-    async def initialize(self, settings: Settings):
-        self.llm = ChatOpenAI(
-            temperature=settings.OPENAI_LLM_TEMPERATURE,
-            model_name=settings.OPENAI_LLM_MODEL_NAME,
-            max_tokens=settings.OPENAI_LLM_MAX_TOKENS,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+    async def initialize(
+        self,
+        settings: Settings,
+        http_client: Optional[httpx.Client] = None,
+        http_async_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.llm = get_chat_model(settings, http_client, http_async_client)
 
     async def generate_text(self, prompt: str) -> str:
         if not self.llm:
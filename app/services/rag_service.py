@@ -1,10 +1,42 @@
 from app.chains.rag_chain import RAGChain
 from app.services.llm_service import LLMService
 from app.services.retrieval_service import RetrievalService
-from cross_cutting.compression import compress_prompt
+from app.services.context_compression import ContextCompressionRetriever, ContextCompressor
+from app.services.context_packing import ContextPacker
+from app.services.kb_version import KnowledgeBaseVersion
+from app.services.semantic_cache import SemanticCache
+from cross_cutting.caching.coalescing import RequestCoalescer
+from cross_cutting.caching.redis_cache import RedisCache, make_cache_key
+from cross_cutting.compression import LLMCompressor
+from cross_cutting.observability.metrics import QUERY_RESPONSES
+from cross_cutting.resilience.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.utils.prefiltering import preprocess_query
+from app.utils.tokenization import count_tokens
 # from app.agents.react_agent import ReActAgent
-from typing import Dict, Any
+from langchain_core.retrievers import BaseRetriever
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def _with_history(query: str, context: Optional[Dict[str, Any]]) -> str:
+    history = (context or {}).get("history")
+    if not history:
+        return query
+    return f"Conversation so far:\n{history}\n\nCurrent question: {query}"
+
+
+def _uncompressed(prompt: str, model_name: Optional[str]) -> Dict[str, Any]:
+    tokens = count_tokens(prompt, model_name)
+    return {
+        "original_prompt": prompt,
+        "compressed_prompt": prompt,
+        "original_tokens": tokens,
+        "compressed_tokens": tokens,
+        "compression_ratio": 0.0,
+        "decision": "skip",
+    }
 
 class RAGService:
     # def __init__(self):
@@ -13,36 +45,249 @@ class RAGService:
     #     self.rag_chain = None
     #     self.react_agent = None
 
-    def __init__(self, llm_service: LLMService, retrieval_service: RetrievalService):
+    def __init__(
+        self,
+        llm_service: LLMService,
+        retrieval_service: RetrievalService,
+        semantic_cache: Optional[SemanticCache] = None,
+        query_cache: Optional[RedisCache] = None,
+        cache_context: Optional[Dict[str, Any]] = None,
+        kb_version: Optional[KnowledgeBaseVersion] = None,
+        llm_breaker: Optional[CircuitBreaker] = None,
+        compressor: Optional[LLMCompressor] = None,
+        context_compressor: Optional[ContextCompressor] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        context_packer: Optional[ContextPacker] = None,
+    ):
         self.llm_service = llm_service
         self.retrieval_service = retrieval_service
-        self.rag_chain = RAGChain(llm_service.llm, retrieval_service.retriever)
+        self.semantic_cache = semantic_cache
+        # Exact-match answers shared by all workers; ``cache_context`` holds the
+        # settings that change an answer, so they are part of every key
+        self.query_cache = query_cache
+        self.cache_context = cache_context or {}
+        # Cached answers are namespaced by knowledge-base version, so a sync retires them all at once
+        self.kb_version = kb_version
+        # None stuffs the retrieved chunks into the prompt as they are
+        self.context_compressor = context_compressor
+        # None sends every retrieved chunk, duplicates included, whatever its size
+        self.context_packer = context_packer
+        # Identical queries arriving together share one run of the pipeline
+        self.coalescer = coalescer
+        self.rag_chain = RAGChain(llm_service.llm, self._context_retriever(retrieval_service.retriever))
+        # Shared by every request in the process, so one failing upstream opens it for all
+        self.llm_breaker = llm_breaker or CircuitBreaker()
+        # None sends queries to the LLM uncompressed
+        self.compressor = compressor
+        self.model_name = getattr(llm_service.llm, "model_name", None)
         # self.react_agent = ReActAgent(llm_service.llm)
 
 
     def initiialize(self, llm_service: LLMService, retrieval_service: RetrievalService):
         self.llm_service = llm_service
         self.retrieval_service = retrieval_service
-        self.rag_chain = RAGChain(llm_service.llm, retrieval_service.retriever)
+        self.rag_chain = RAGChain(llm_service.llm, self._context_retriever(retrieval_service.retriever))
         # self.react_agent = ReActAgent(llm_service.llm)
 
+    def _context_retriever(self, retriever: BaseRetriever) -> BaseRetriever:
+        if self.context_compressor is None:
+            return retriever
+        # A packer budgets the context itself, after dropping duplicates the compressor's budget would have counted
+        return ContextCompressionRetriever(
+            base=retriever, compressor=self.context_compressor, fit_budget=self.context_packer is None
+        )
 
-    async def process_query(self, query: str) -> Dict[str, Any]:
+
+    async def process_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Answer ``query``; ``context`` holds conversation memory variables, as for ``stream_query``."""
+        start = time.perf_counter()
         # Preprocess the query
         preprocessed_query = preprocess_query(query)
+
+        kb_version = await self.kb_version.current() if self.kb_version is not None else 0
+        if self.coalescer is None:
+            response = await self._respond(preprocessed_query, kb_version, context)
+        else:
+            # Versioned like the answer cache, so a result shared just before a sync is not handed out after it
+            key = KnowledgeBaseVersion.key(kb_version, self._query_key(preprocessed_query, context))
+            response = await self.coalescer.do(key, lambda: self._respond(preprocessed_query, kb_version, context))
+        QUERY_RESPONSES.labels(freshness=response["freshness"]).inc()
+        return {**response, "latency_seconds": time.perf_counter() - start}
+
+    def _query_key(self, preprocessed_query: str, context: Optional[Dict[str, Any]] = None) -> str:
+        history = (context or {}).get("history")
+        # A conversation's history changes the answer, so it is part of the key
+        parts = (preprocessed_query, self.cache_context, history) if history else (preprocessed_query, self.cache_context)
+        return f"query:{make_cache_key(*parts)}"
+
+    async def _respond(
+        self, preprocessed_query: str, kb_version: int = 0, context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        # Answers generated for this request; anything else came out of a cache
+        generated: List[Dict[str, Any]] = []
+
+        async def answer() -> Dict[str, Any]:
+            response, semantic_hit = await self._answer(preprocessed_query, kb_version, context)
+            if not semantic_hit:
+                generated.append(response)
+            return response
+
+        try:
+            if self.query_cache is None:
+                response, fresh = await answer(), True
+            else:
+                key = KnowledgeBaseVersion.key(kb_version, self._query_key(preprocessed_query, context))
+                # Expired answers are served at once and refreshed in the background, unless the LLM is down
+                response, fresh = await self.query_cache.get_or_compute_stale(
+                    key, answer, revalidate=not self.llm_breaker.is_open,
+                )
+        except CircuitOpenError:
+            response, freshness = await self._retrieval_only(preprocessed_query), "degraded"
+            generated.append(response)
+        else:
+            freshness = "fresh" if fresh else "stale"
+        # Cached entries are stored without the flag, which is set on the way out
+        cached = not any(response is candidate for candidate in generated)
+        return {**response, "cached": cached, "freshness": freshness}
+
+    async def _retrieval_only(self, preprocessed_query: str) -> Dict[str, Any]:
+        # The LLM circuit is open and nothing is cached: return the top sources without an answer
+        documents = await self.retrieval_service.retrieve_documents(preprocessed_query, k=self.retrieval_service.k)
+        return {
+            "answer": "",
+            "sources": [document["content"] for document in documents],
+            "query_compression": _uncompressed(preprocessed_query, self.model_name),
+            "method": "retrieval",
+        }
+
+    async def _answer(
+        self, preprocessed_query: str, kb_version: int = 0, context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """The answer to ``preprocessed_query`` and whether it came from the semantic cache."""
+        # Serve a paraphrase of an already answered query from the semantic cache.
+        # Entries are valid for one shared knowledge-base version and this process's index contents.
+        # Follow-up questions mean something else in another conversation, so they bypass it.
+        vector_store = self.retrieval_service.vector_store
+        generation = (kb_version, vector_store.content_version)
+        has_history = bool((context or {}).get("history"))
+        query_vector = None
+        if self.semantic_cache is not None and vector_store.embedder is not None and not has_history:
+            query_vector = (await vector_store.embedder.embed([preprocessed_query]))[0]
+            cached = self.semantic_cache.lookup(query_vector, generation)
+            if cached is not None:
+                return cached[0], True
         
         # Compress the query
-        compression_result = await compress_prompt(preprocessed_query)
+        compression_result = await self._compress(preprocessed_query)
         compressed_query = compression_result["compressed_prompt"]
         
-        # Run the RAG chain with the compressed query
-        result = await self.rag_chain.run(compressed_query)
+        packed = None
+        if self.context_packer is None and not has_history:
+            # Run the RAG chain with the compressed query
+            result = await self.llm_breaker(self.rag_chain.run)(compressed_query)
+        else:
+            # Retrieve on the question alone, then answer it (after the conversation so far)
+            # over the chunks that fit the context budget
+            documents = await self.rag_chain.aretrieve(compressed_query)
+            if self.context_packer is not None:
+                packed = await self.context_packer.pack(documents)
+                documents = packed.documents
+            result = await self.llm_breaker(self.rag_chain.run)(_with_history(compressed_query, context), documents)
+        documents = result["source_documents"]
         
-        return {
+        response = {
             "answer": result["answer"],
-            "sources": [doc.page_content for doc in result["source_documents"]],
-            "query_compression": compression_result
+            # Sources are shown as written, not as compressed for the prompt
+            "sources": [doc.metadata.get("original_content", doc.page_content) for doc in documents],
+            "query_compression": compression_result,
+            "method": "rag",
+        }
+        if self.context_compressor is not None:
+            response["context_compression"] = {
+                "original_tokens": sum(doc.metadata["original_tokens"] for doc in documents),
+                "compressed_tokens": sum(doc.metadata["compressed_tokens"] for doc in documents),
+            }
+        if packed is not None:
+            response["context_packing"] = packed.report()
+        if query_vector is not None:
+            self.semantic_cache.store(preprocessed_query, query_vector, response, generation)
+        return response, False
+
+    async def stream_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Answer ``query`` as a stream of events: ``sources``, then ``token``s, then ``done``.
+
+        Sources are sent as soon as retrieval finishes, before the LLM is
+        called. Streamed answers always come from the LLM; they are not
+        served from or written to the answer caches. Closing the iterator
+        cancels the upstream completion. ``context`` holds the conversation
+        memory variables; its ``history`` is shown to the LLM but not used
+        for retrieval.
+        """
+        start = time.perf_counter()
+        preprocessed_query = preprocess_query(query)
+        compression_result = await self._compress(preprocessed_query)
+        compressed_query = compression_result["compressed_prompt"]
+
+        documents = await self.rag_chain.aretrieve(compressed_query)
+        packed = None
+        if self.context_packer is not None:
+            packed = await self.context_packer.pack(documents)
+            documents = packed.documents
+        yield {"event": "sources", "sources": [doc.metadata.get("original_content", doc.page_content) for doc in documents]}
+
+        answer: List[str] = []
+        freshness = "fresh"
+        tokens = self.rag_chain.astream_answer(_with_history(compressed_query, context), documents)
+        try:
+            # The breaker guards reaching the LLM, up to its first token
+            first = await self.llm_breaker(self._first_token)(tokens)
+            if first is not None:
+                answer.append(first)
+                yield {"event": "token", "text": first}
+                async for text in tokens:
+                    answer.append(text)
+                    yield {"event": "token", "text": text}
+        except CircuitOpenError:
+            # The sources already sent are all the client gets
+            freshness = "degraded"
+        finally:
+            await tokens.aclose()
+
+        QUERY_RESPONSES.labels(freshness=freshness).inc()
+        done = {
+            "event": "done",
+            "query_compression": compression_result,
+            "completion_tokens": count_tokens("".join(answer), self.model_name),
+            "method": "rag" if freshness == "fresh" else "retrieval",
+            "freshness": freshness,
+            "latency_seconds": time.perf_counter() - start,
         }
+        if self.context_compressor is not None:
+            done["context_compression"] = {
+                "original_tokens": sum(doc.metadata["original_tokens"] for doc in documents),
+                "compressed_tokens": sum(doc.metadata["compressed_tokens"] for doc in documents),
+            }
+        if packed is not None:
+            done["context_packing"] = packed.report()
+        yield done
+
+    @staticmethod
+    async def _first_token(tokens: AsyncIterator[str]) -> Optional[str]:
+        try:
+            return await tokens.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def _compress(self, prompt: str) -> Dict[str, Any]:
+        if self.compressor is None:
+            return _uncompressed(prompt, self.model_name)
+        try:
+            # Short queries skip the compressor; long ones are compressed as hard as they need
+            return (await self.compressor.compress_adaptive(prompt)).model_dump()
+        except Exception as e:
+            # Answering uncompressed beats queueing behind a saturated compressor or failing on a broken one
+            logger.warning("Skipping query compression: %r", e)
+            return _uncompressed(prompt, self.model_name)
     
     # async def process_query_with_agents(self, query: str) -> Dict[str, Any]:
     #     # Preprocess the query
@@ -74,4 +319,6 @@ class RAGService:
 
     async def update_knowledge_base(self):
         new_retriever = await self.retrieval_service.get_updated_retriever()
-        self.rag_chain.update_retriever(new_retriever)
\ No newline at end of file
+        self.rag_chain.update_retriever(self._context_retriever(new_retriever))
+        if self.kb_version is not None:
+            await self.kb_version.bump()
\ No newline at end of file
@@ -1,16 +1,55 @@
 from app.db.vector_store import VectorStore
-from typing import List, Dict
+from app.services.hybrid_retriever import HybridRetriever
+from typing import Any, Dict, List, Optional
 from langchain_core.retrievers import BaseRetriever
 
 class RetrievalService:
-    def __init__(self, vector_store: VectorStore):
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        hybrid: bool = False,
+        k: int = 4,
+        per_source_k: int = 20,
+        rrf_k: int = 60,
+    ):
         self.vector_store = vector_store
-        self.retriever = self.vector_store.as_retriever()
+        self.hybrid = hybrid
+        self.k = k
+        self.per_source_k = per_source_k
+        self.rrf_k = rrf_k
+        self.retriever = self._build_retriever()
 
-    async def retrieve_documents(self, query: str, k: int = 5) -> List[Dict]:
-        docs = await self.retriever.aget_relevant_documents(query)
+    def _build_retriever(self, k: Optional[int] = None) -> BaseRetriever:
+        k = k or self.k
+        if not self.hybrid:
+            return self.vector_store.as_retriever(k=k)
+        if not self.vector_store.is_initialized:
+            raise ValueError("VectorStore not initialized. Call initialize() first.")
+        return HybridRetriever(
+            store=self.vector_store, k=k, per_source_k=max(self.per_source_k, k), rrf_k=self.rrf_k
+        )
+
+    async def retrieve_documents(
+        self,
+        query: str,
+        k: int = 5,
+        keywords: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
+        """
+        Retrieve the ``k`` most similar documents, optionally restricted by keywords and metadata.
+
+        Keyword and metadata predicates are resolved against the inverted index
+        first and pushed down into the vector search as an allowed-ID set.
+        """
+        if keywords or filters:
+            allowed_ids = self.vector_store.keyword_index.match(keywords=keywords, filters=filters)
+            docs = await self.vector_store.similarity_search(query, k=k, allowed_ids=allowed_ids)
+        else:
+            retriever = self.retriever if k == self.k else self._build_retriever(k)
+            docs = await retriever.aget_relevant_documents(query)
         return [{'content': doc.page_content, 'metadata': doc.metadata} for doc in docs[:k]]
 
     async def get_updated_retriever(self) -> BaseRetriever:
         # This method would be called if the vector store has been updated
-        return self.vector_store.as_retriever()
\ No newline at end of file
+        return self._build_retriever()
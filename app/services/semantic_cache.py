@@ -0,0 +1,141 @@
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings
+from cross_cutting.observability.metrics import SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_SIMILARITY
+
+
+class SemanticCacheConfig(BaseModel):
+    enabled: bool = True
+    threshold: float = 0.95
+    # Lookups scoring within this margin below the threshold are counted as near misses
+    near_miss_margin: float = 0.05
+    max_entries: int = 10_000
+    ttl: int = 3600
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SemanticCacheConfig":
+        return cls(
+            enabled=settings.SEMANTIC_CACHE_ENABLED,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            near_miss_margin=settings.SEMANTIC_CACHE_NEAR_MISS_MARGIN,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl=settings.SEMANTIC_CACHE_TTL,
+        )
+
+
+class SemanticCacheMetrics(BaseModel):
+    hits: int = 0
+    near_misses: int = 0
+    misses: int = 0
+
+
+class _Entry:
+    __slots__ = ("query", "value", "kb_version", "expires_at")
+
+    def __init__(self, query: str, value: Any, kb_version: Any, expires_at: float):
+        self.query = query
+        self.value = value
+        self.kb_version = kb_version
+        self.expires_at = expires_at
+
+
+class SemanticCache:
+    """Answers keyed by query meaning rather than query text.
+
+    Cached query embeddings are unit-normalized rows of one matrix, so a
+    lookup is a single matrix-vector product (cosine similarity against every
+    entry) plus an argmax. The best entry is served when it scores at least
+    ``threshold``, has not expired and was answered against the current
+    knowledge-base version. Entries are evicted least-recently-used once
+    ``max_entries`` is reached; expired or stale ones are dropped when seen.
+    """
+
+    def __init__(self, config: SemanticCacheConfig = SemanticCacheConfig()):
+        self.config = config
+        self.metrics = SemanticCacheMetrics()
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Optional[_Entry]] = []
+        self._free: List[int] = []
+        # Slot -> None in least- to most-recently-used order
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: Sequence[float], kb_version: Any) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, similarity)`` for the closest fresh entry above the threshold, else None."""
+        if not self._lru:
+            self._record("miss")
+            return None
+        query = self._normalize(vector)
+        similarities = self._vectors[: len(self._entries)] @ query
+        now = time.time()
+        for slot in np.argsort(-similarities):
+            entry = self._entries[slot]
+            if entry is None:
+                continue
+            if entry.expires_at <= now or entry.kb_version != kb_version:
+                self._evict(int(slot))
+                continue
+            similarity = float(similarities[slot])
+            SEMANTIC_CACHE_SIMILARITY.observe(similarity)
+            if similarity >= self.config.threshold:
+                self._lru.move_to_end(int(slot))
+                self._record("hit")
+                return entry.value, similarity
+            self._record("near_miss" if similarity >= self.config.threshold - self.config.near_miss_margin else "miss")
+            return None
+        self._record("miss")
+        return None
+
+    def store(self, query: str, vector: Sequence[float], value: Any, kb_version: Any, ttl: Optional[int] = None):
+        vector = self._normalize(vector)
+        if self._vectors is None:
+            self._vectors = np.zeros((min(64, self.config.max_entries), len(vector)), dtype=np.float32)
+        if len(self._lru) >= self.config.max_entries:
+            self._evict(next(iter(self._lru)))
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._entries)
+            self._entries.append(None)
+            if slot >= len(self._vectors):
+                grown = np.zeros((min(2 * len(self._vectors), self.config.max_entries), self._vectors.shape[1]), dtype=np.float32)
+                grown[: len(self._vectors)] = self._vectors
+                self._vectors = grown
+        self._vectors[slot] = vector
+        self._entries[slot] = _Entry(query, value, kb_version, time.time() + (ttl or self.config.ttl))
+        self._lru[slot] = None
+
+    def clear(self):
+        self._vectors = None
+        self._entries = []
+        self._free = []
+        self._lru.clear()
+
+    def _evict(self, slot: int):
+        self._entries[slot] = None
+        # A zero row scores 0 against every query, so it never shadows a live entry
+        self._vectors[slot] = 0.0
+        self._lru.pop(slot, None)
+        self._free.append(slot)
+
+    def _record(self, result: str):
+        SEMANTIC_CACHE_LOOKUPS.labels(result=result).inc()
+        if result == "hit":
+            self.metrics.hits += 1
+        elif result == "near_miss":
+            self.metrics.near_misses += 1
+        else:
+            self.metrics.misses += 1
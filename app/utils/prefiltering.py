@@ -4,6 +4,9 @@ import re
 def prefilter_documents(documents: List[Dict], keywords: List[str]) -> List[Dict]:
     """
     Prefilter documents based on the presence of specified keywords.
+
+    This scans every document and is only meant for small in-memory lists.
+    For the indexed corpus use ``VectorStore.keyword_index.match`` instead.
     """
     filtered_docs = []
     for doc in documents:
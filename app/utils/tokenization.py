@@ -0,0 +1,40 @@
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=16)
+def get_encoding(model_name: Optional[str] = None):
+    """
+    Return the tiktoken encoding for a model, or None when it cannot be loaded.
+
+    tiktoken fetches encoding files on first use, so air-gapped hosts without
+    a populated TIKTOKEN_CACHE_DIR fall back to the character heuristic.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        if model_name:
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Count tokens the way the target model does, falling back to ~4 characters per token.
+    """
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from cross_cutting.caching.redis_cache import RedisCache, SingleFlight
+from cross_cutting.observability.metrics import REQUESTS_COALESCED
+
+logger = logging.getLogger(__name__)
+
+DONE = b"done"
+FAILED = b"failed"
+
+
+class CoalescerConfig(BaseModel):
+    # Longest a leader may take before a waiting worker assumes it died and takes over
+    lease_timeout: float = 30.0
+    # How long the leader's result stays readable for workers that subscribed late
+    result_ttl: int = 5
+    # How often waiters check that the leader still holds its lease
+    poll_interval: float = 0.5
+
+
+class RequestCoalescer:
+    """Runs identical in-flight requests once and hands every caller the same result.
+
+    Within a worker, concurrent calls for a key await one future (single
+    flight). With a ``cache``, the workers' leaders also coalesce: the first
+    to take the key's Redis lease computes, stores the result briefly and
+    broadcasts it on a pub/sub channel, while the others wait for that
+    message. A waiter takes over if the leader fails or its lease expires.
+    Nothing outlives the request beyond ``result_ttl``; this is
+    deduplication, not caching. Redis errors degrade to per-worker
+    coalescing.
+    """
+
+    def __init__(self, cache: Optional[RedisCache] = None, config: CoalescerConfig = CoalescerConfig()):
+        self.cache = cache
+        self.config = config
+        self._flights = SingleFlight(waiters=REQUESTS_COALESCED.labels(scope="worker"))
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.cache is None:
+            return await self._flights.do(key, fn)
+        return await self._flights.do(key, lambda: self._across_workers(key, fn))
+
+    async def _across_workers(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        channel = f"{self.cache.config.prefix}coalesce:{key}"
+        try:
+            pubsub = self.cache.redis.pubsub()
+            # Subscribe before looking for a leader so its broadcast cannot be missed
+            await pubsub.subscribe(channel)
+        except RedisError as e:
+            logger.warning("Coalescing %s in this worker only: %s", key, e)
+            return await fn()
+
+        try:
+            counted = False
+            while True:
+                try:
+                    token = await self.cache.acquire_lock(f"coalesce:{key}", self.config.lease_timeout)
+                    found, value = await self._result(key)
+                    if found:
+                        if token is not None:
+                            await self.cache.release_lock(f"coalesce:{key}", token)
+                        return value
+                    if token is not None:
+                        break
+                    if not counted:
+                        REQUESTS_COALESCED.labels(scope="cluster").inc()
+                        counted = True
+                    found, value = await self._await_leader(pubsub, key)
+                    if found:
+                        return value
+                    # The leader failed or vanished: try to take over
+                except RedisError as e:
+                    logger.warning("Coalescing %s in this worker only: %s", key, e)
+                    return await fn()
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                # aclose() replaced reset() in redis-py 5
+                await getattr(pubsub, "aclose", pubsub.reset)()
+            except Exception:
+                pass
+
+        return await self._lead(key, token, channel, fn)
+
+    async def _lead(self, key: str, token: str, channel: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fn()
+        except BaseException:
+            await self._broadcast(channel, FAILED)
+            raise
+        finally:
+            try:
+                await self.cache.release_lock(f"coalesce:{key}", token)
+            except RedisError:
+                # The lease expires by itself
+                pass
+        try:
+            await self.cache.set(f"coalesce:result:{key}", value, ttl=self.config.result_ttl)
+        except RedisError as e:
+            logger.warning("Could not share the result of %s: %s", key, e)
+            await self._broadcast(channel, FAILED)
+        else:
+            await self._broadcast(channel, DONE)
+        return value
+
+    async def _broadcast(self, channel: str, message: bytes):
+        try:
+            await self.cache.redis.publish(channel, message)
+        except RedisError as e:
+            # Waiters fall back to noticing the released lease
+            logger.warning("Could not broadcast on %s: %s", channel, e)
+
+    async def _result(self, key: str) -> Tuple[bool, Any]:
+        value = await self.cache.get(f"coalesce:result:{key}")
+        return value is not None, value
+
+    async def _await_leader(self, pubsub: Any, key: str) -> Tuple[bool, Any]:
+        """Wait for the leader's broadcast; ``(False, None)`` if it failed or lost its lease."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.lease_timeout
+        while loop.time() < deadline:
+            message = await pubsub.get_message(timeout=self.config.poll_interval)
+            if message is not None and message["type"] == "message":
+                if message["data"] == DONE:
+                    return await self._result(key)
+                return False, None
+            if not await self.cache.redis.exists(f"{self.cache.config.prefix}lock:coalesce:{key}"):
+                # Released without a broadcast we saw (or expired): the result may still be there
+                return await self._result(key)
+        return False, None
@@ -0,0 +1,201 @@
+import asyncio
+import fnmatch
+import hashlib
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from redis.exceptions import NoScriptError
+
+from cross_cutting.caching.redis_cache import RELEASE_LOCK_SCRIPT
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class InMemoryPubSub:
+    def __init__(self, server: "InMemoryRedis"):
+        self._server = server
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.add(channel)
+            self._server._subscribers.setdefault(channel, set()).add(self)
+            self._queue.put_nowait({"type": "subscribe", "channel": channel.encode(), "data": len(self.channels)})
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or list(self.channels):
+            self.channels.discard(channel)
+            self._server._subscribers.get(channel, set()).discard(self)
+
+    async def listen(self) -> AsyncIterator[Dict[str, Any]]:
+        while self.channels:
+            yield await self._queue.get()
+
+    async def get_message(self, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        await self.unsubscribe()
+
+    reset = aclose
+
+
+class InMemoryPipeline:
+    """Buffers commands and runs them in order on ``execute``."""
+
+    def __init__(self, server: "InMemoryRedis"):
+        self._server = server
+        self._commands: List[Any] = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._server, name)
+
+        def queue(*args: Any, **kwargs: Any) -> "InMemoryPipeline":
+            self._commands.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [await method(*args, **kwargs) for method, args, kwargs in commands]
+
+    async def __aenter__(self) -> "InMemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        self._commands = []
+
+
+class InMemoryRedis:
+    """A single-process stand-in for the subset of ``redis.asyncio.Redis`` the caches use.
+
+    Strings with expiry, ``SET NX/PX``, ``MGET``, pipelines, key scans,
+    pub/sub and the Lua scripts the caches issue, re-implemented in Python
+    and looked up by SHA1 like ``EVALSHA``. Any other script fails with
+    ``NoScriptError``, a ``RedisError`` the caches already degrade on. Several cache instances sharing one ``InMemoryRedis``
+    behave like workers sharing one server, which is enough for local runs
+    and tests without a Redis server.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, bytes] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[InMemoryPubSub]] = {}
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._data.get(key) if self._alive(key) else None
+
+    async def set(
+        self, key: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None, nx: bool = False
+    ) -> Optional[bool]:
+        if nx and self._alive(key):
+            return None
+        self._data[key] = _encode(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + ex
+        elif px is not None:
+            self._expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        value = int(await self.get(key) or 0) + amount
+        self._data[key] = _encode(value)
+        return value
+
+    async def delete(self, *keys: Union[str, bytes]) -> int:
+        deleted = 0
+        for key in keys:
+            # Scans return keys as bytes, as redis-py does
+            key = key.decode() if isinstance(key, bytes) else key
+            if self._alive(key):
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return deleted
+
+    async def mget(self, keys: Union[str, List[str]], *args: str) -> List[Optional[bytes]]:
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        return [await self.get(key) for key in [*keys, *args]]
+
+    unlink = delete
+
+    async def exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._alive(key))
+
+    async def keys(self, pattern: str = "*") -> List[bytes]:
+        return [key.encode() for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    async def scan_iter(self, match: str = "*", count: Optional[int] = None) -> AsyncIterator[bytes]:
+        for key in await self.keys(match):
+            yield key
+
+    async def eval(self, script: str, numkeys: int, *args: Any) -> Any:
+        return await self.evalsha(_sha(script), numkeys, *args)
+
+    async def evalsha(self, sha: str, numkeys: int, *args: Any) -> Any:
+        script = _SCRIPTS.get(sha)
+        if script is None:
+            raise NoScriptError(
+                f"NOSCRIPT InMemoryRedis has no Python version of script {sha}; "
+                "it only runs the scripts the caches issue"
+            )
+        return await script(self, list(args[:numkeys]), list(args[numkeys:]))
+
+    async def script_load(self, script: str) -> str:
+        sha = _sha(script)
+        if sha not in _SCRIPTS:
+            raise NoScriptError(f"NOSCRIPT InMemoryRedis cannot run script {sha}")
+        return sha
+
+    async def publish(self, channel: str, message: Any) -> int:
+        subscribers = self._subscribers.get(channel, set())
+        for subscriber in subscribers:
+            subscriber._queue.put_nowait({"type": "message", "channel": channel.encode(), "data": _encode(message)})
+        return len(subscribers)
+
+    def pipeline(self, transaction: bool = True) -> InMemoryPipeline:
+        return InMemoryPipeline(self)
+
+    def pubsub(self) -> InMemoryPubSub:
+        return InMemoryPubSub(self)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self):
+        pass
+
+    close = aclose
+
+
+def _sha(script: str) -> str:
+    return hashlib.sha1(script.encode("utf-8")).hexdigest()
+
+
+async def _release_lock(server: InMemoryRedis, keys: List[Any], args: List[Any]) -> int:
+    if await server.get(keys[0]) == _encode(args[0]):
+        return await server.delete(keys[0])
+    return 0
+
+
+# SHA1 of each Lua script the caches send -> its Python equivalent
+_SCRIPTS: Dict[str, Callable[[InMemoryRedis, List[Any], List[Any]], Awaitable[Any]]] = {
+    _sha(RELEASE_LOCK_SCRIPT): _release_lock,
+}
@@ -1,9 +1,49 @@
 import redis.asyncio as redis
+from redis.exceptions import RedisError
 from functools import wraps
+import asyncio
+import hashlib
+import inspect
 import json
-from typing import Any, Callable
-import pickle
+import logging
+import uuid
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 from pydantic import BaseModel
+from cross_cutting.caching.serialization import decode_value, encode_value, resolve_codec
+from cross_cutting.observability.metrics import CACHE_SINGLE_FLIGHT_WAITERS, CACHE_LOCK_WAITS, CACHE_TIER_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Keys are deleted and scanned in batches of this size
+BATCH_SIZE = 1000
+
+# Delete the lock only if we still own it (it may have expired and been taken by another worker)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def stale_entry(value: Any, ttl: int) -> Dict[str, Any]:
+    """Wrap ``value`` for :meth:`RedisCache.get_or_compute_stale`, fresh for ``ttl`` seconds.
+
+    A dict rather than a tuple so it survives JSON serialization (``allow_pickle`` off) intact.
+    """
+    return {"v": value, "fresh_until": time.time() + ttl}
+
+
+def unwrap_stale_entry(entry: Any) -> Optional[Tuple[Any, float]]:
+    """``(value, fresh_until)`` of a stale-while-revalidate entry, or None for anything else."""
+    if isinstance(entry, dict) and entry.keys() == {"v", "fresh_until"}:
+        return entry["v"], entry["fresh_until"]
+    # Written before entries were dicts; pickled, so still a tuple
+    if isinstance(entry, tuple) and len(entry) == 2 and isinstance(entry[1], (int, float)):
+        return entry
+    return None
+
 
 class CacheConfig(BaseModel):
     host: str = "localhost"
@@ -11,16 +51,94 @@ class CacheConfig(BaseModel):
     db: int = 0
     prefix: str = "rag:"
     ttl: int = 3600  # Default TTL: 1 hour
+    lock_timeout: float = 30.0  # Longest a worker may hold a key's compute lock
+    stale_ttl: int = 0  # How long get_or_compute_stale keeps serving an entry past its ttl
+    compression: str = "zstd"  # none, zlib, zstd or lz4; falls back to zlib if the library is missing
+    compression_threshold: int = 1024  # Values smaller than this (in bytes) are stored uncompressed
+    allow_pickle: bool = True  # Off: only JSON-native values and bytes can be cached
+
+class L1Config(BaseModel):
+    max_entries: int = 10_000
+    max_bytes: int = 64 * 1024 * 1024
+    # Kept short: it bounds staleness if an invalidation message is lost
+    ttl: int = 30
 
 class CacheMetrics(BaseModel):
     hits: int = 0
     misses: int = 0
 
+class TieredCacheMetrics(BaseModel):
+    l1_hits: int = 0
+    l1_misses: int = 0
+    l2_hits: int = 0
+    l2_misses: int = 0
+    l1_entries: int = 0
+    l1_bytes: int = 0
+    invalidations_received: int = 0
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Stable digest of ``parts``.
+
+    Unlike ``hash()``, which is salted per process, the same values give the
+    same key in every worker, so workers share entries.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key in this process into one execution.
+
+    The first caller runs ``fn``; callers arriving while it is in flight
+    await the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self, waiters: Any = CACHE_SINGLE_FLIGHT_WAITERS):
+        self._calls: Dict[str, asyncio.Future] = {}
+        # Counter incremented for every caller that joins an in-flight call
+        self._waiters = waiters
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while key in self._calls:
+            future = self._calls[key]
+            self._waiters.inc()
+            try:
+                # shield: a waiter giving up must not cancel the shared call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled; loop to join a newer call or lead one
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+
 class RedisCache:
-    def __init__(self, config: CacheConfig = CacheConfig()):
+    def __init__(self, config: CacheConfig = CacheConfig(), client: Optional[Any] = None):
         self.config = config
-        self.redis = redis.Redis(host=config.host, port=config.port, db=config.db)
+        # ``client`` lets a stand-in such as InMemoryRedis replace the server connection
+        self.redis = client if client is not None else redis.Redis(host=config.host, port=config.port, db=config.db)
         self.metrics = CacheMetrics()
+        self._flights = SingleFlight()
+        self._codec = resolve_codec(config.compression)
+        self._revalidations: Dict[str, asyncio.Task] = {}
 
     async def get(self, key: str) -> Any:
         full_key = f"{self.config.prefix}{key}"
@@ -42,47 +160,444 @@ class RedisCache:
         full_key = f"{self.config.prefix}{key}"
         await self.redis.delete(full_key)
 
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """The cached values of ``keys`` in one MGET round trip; missing keys are left out."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        raw_values = await self.redis.mget([f"{self.config.prefix}{key}" for key in keys])
+        values = {}
+        for key, raw in zip(keys, raw_values):
+            if raw:
+                values[key] = self._deserialize(raw)
+        self.metrics.hits += len(values)
+        self.metrics.misses += len(keys) - len(values)
+        return values
+
+    async def set_many(self, mapping: Mapping[str, Any], ttl: int = None) -> None:
+        """Store every item of ``mapping`` with one pipelined round trip."""
+        await self._set_serialized({key: self._serialize(value) for key, value in mapping.items()}, ttl)
+
+    async def _set_serialized(self, serialized: Mapping[str, bytes], ttl: Optional[int]) -> None:
+        if not serialized:
+            return
+        if ttl is None:
+            ttl = self.config.ttl
+        # MSET has no expiry, so pipeline one SET EX per key instead
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in serialized.items():
+                pipe.set(f"{self.config.prefix}{key}", value, ex=ttl)
+            await pipe.execute()
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        full_keys = [f"{self.config.prefix}{key}" for key in keys]
+        for start in range(0, len(full_keys), BATCH_SIZE):
+            await self.redis.delete(*full_keys[start:start + BATCH_SIZE])
+
     async def clear(self) -> None:
-        keys = await self.redis.keys(f"{self.config.prefix}*")
-        if keys:
-            await self.redis.delete(*keys)
+        # SCAN walks the keyspace incrementally where KEYS would block the server;
+        # UNLINK frees the values in the background
+        batch: List[Any] = []
+        async for key in self.redis.scan_iter(match=f"{self.config.prefix}*", count=BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= BATCH_SIZE:
+                await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            await self.redis.unlink(*batch)
+
+    async def acquire_lock(self, key: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Take the cross-worker lock on ``key``; returns the owner token, or None if it is held."""
+        token = uuid.uuid4().hex
+        timeout_ms = int((timeout or self.config.lock_timeout) * 1000)
+        acquired = await self.redis.set(f"{self.config.prefix}lock:{key}", token, nx=True, px=timeout_ms)
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{self.config.prefix}lock:{key}", token)
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Return the cached value for ``key``, computing and storing it on a miss.
+
+        Stampede-safe at both levels: concurrent misses in this process share
+        one call (single flight), and across workers only the holder of the
+        key's Redis lock computes while the others poll for its result. If
+        the holder dies, its lock expires and a waiter takes over. A Redis
+        outage degrades to computing without caching.
+        """
+        return await self._flights.do(key, lambda: self._get_or_compute(key, compute, ttl))
+
+    async def _get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[int]) -> Any:
+        try:
+            value = await self.get(key)
+            if value is not None:
+                return value
+            token = await self.acquire_lock(key)
+            if token is None:
+                CACHE_LOCK_WAITS.inc()
+                value = await self._wait_for(key)
+                if value is not None:
+                    return value
+                token = await self.acquire_lock(key)
+        except RedisError as e:
+            logger.warning("Cache unavailable, computing %s uncached: %s", key, e)
+            return await compute()
+
+        try:
+            value = await compute()
+            if value is not None:
+                try:
+                    await self.set(key, value, ttl)
+                except RedisError as e:
+                    # The caller still gets the value; the next miss computes it again
+                    logger.warning("Could not cache %s: %s", key, e)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    await self.release_lock(key, token)
+                except RedisError:
+                    # The lock expires by itself
+                    pass
+
+    async def _wait_for(self, key: str) -> Any:
+        """Poll for a value another worker is computing, until its lock is released or expires."""
+        full_key = f"{self.config.prefix}{key}"
+        lock_key = f"{self.config.prefix}lock:{key}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.lock_timeout
+        delay = 0.01
+        while loop.time() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            value = await self.redis.get(full_key)
+            if value is not None:
+                return self._deserialize(value)
+            if not await self.redis.exists(lock_key):
+                return None
+        return None
+
+    async def get_or_compute_stale(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        revalidate: bool = True,
+    ) -> Tuple[Any, bool]:
+        """
+        Stale-while-revalidate variant of :meth:`get_or_compute`; returns ``(value, fresh)``.
+
+        Entries stay in Redis for ``stale_ttl`` seconds past their ``ttl``.
+        An expired-but-recent entry is returned at once with ``fresh=False``
+        and, if ``revalidate``, recomputed in the background by whichever
+        worker takes the key's lock. Pass ``revalidate=False`` while the
+        upstream is known to be failing to keep serving what is cached.
+        Only a miss waits for ``compute``.
+        """
+        ttl = ttl or self.config.ttl
+        stale_ttl = self.config.stale_ttl if stale_ttl is None else stale_ttl
+        try:
+            entry = await self.get(key)
+        except RedisError as e:
+            logger.warning("Cache unavailable, computing %s uncached: %s", key, e)
+            return await compute(), True
+        # Anything other than a stale entry was written by plain set() and is ignored
+        unwrapped = unwrap_stale_entry(entry)
+        if unwrapped is not None:
+            value, fresh_until = unwrapped
+            if time.time() < fresh_until:
+                return value, True
+            if revalidate:
+                self._revalidate(key, compute, ttl, stale_ttl)
+            return value, False
+
+        async def compute_entry():
+            value = await compute()
+            return None if value is None else stale_entry(value, ttl)
+
+        entry = await self.get_or_compute(key, compute_entry, ttl + stale_ttl)
+        unwrapped = unwrap_stale_entry(entry)
+        return (None, True) if unwrapped is None else (unwrapped[0], True)
+
+    def _revalidate(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int):
+        if key in self._revalidations:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(key, compute, ttl, stale_ttl))
+        self._revalidations[key] = task
+        task.add_done_callback(lambda t: self._finish_revalidation(key, t))
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int):
+        token = await self.acquire_lock(key)
+        if token is None:
+            # Another worker is already refreshing (or computing) this key
+            return
+        try:
+            value = await compute()
+            if value is not None:
+                await self.set(key, stale_entry(value, ttl), ttl + stale_ttl)
+        finally:
+            await self.release_lock(key, token)
+
+    def _finish_revalidation(self, key: str, task: asyncio.Task):
+        self._revalidations.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh of %s failed, still serving the stale entry: %s", key, task.exception())
 
     def _serialize(self, value: Any) -> bytes:
-        if isinstance(value, (str, int, float, bool)):
-            return json.dumps(value).encode('utf-8')
-        return pickle.dumps(value)
+        return encode_value(value, self._codec, self.config.compression_threshold, self.config.allow_pickle)
 
     def _deserialize(self, value: bytes) -> Any:
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return pickle.loads(value)
+        return decode_value(value, self.config.allow_pickle)
 
     async def get_metrics(self) -> CacheMetrics:
         return self.metrics
 
-# Global cache instance
-cache = RedisCache()
+class L1Cache:
+    """In-process LRU bounded by entry count and by the serialized size of its values, with a TTL.
+
+    Values are handed out as-is (no copy), so callers must treat them as read-only.
+    """
+
+    def __init__(self, config: L1Config = L1Config()):
+        self.config = config
+        # key -> (value, size in bytes, expires_at), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: Any, size: int, ttl: Optional[int] = None):
+        self.pop(key)
+        if size > self.config.max_bytes:
+            return
+        ttl = min(ttl, self.config.ttl) if ttl else self.config.ttl
+        self._entries[key] = (value, size, time.monotonic() + ttl)
+        self.bytes += size
+        while len(self._entries) > self.config.max_entries or self.bytes > self.config.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+
+class TieredCache(RedisCache):
+    """A per-process :class:`L1Cache` in front of Redis (L2).
+
+    Reads try L1 first and fill it from L2. Every ``set``, ``delete`` and
+    ``clear`` is published on a Redis channel and each worker's listener
+    drops the affected L1 entries. L1 is only consulted while that
+    subscription is live; it is emptied whenever the subscription is
+    (re)established, so no worker serves entries whose invalidations it may
+    have missed.
+    """
+
+    def __init__(self, config: CacheConfig = CacheConfig(), l1_config: L1Config = L1Config(), client: Optional[Any] = None):
+        super().__init__(config, client)
+        self.l1 = L1Cache(l1_config)
+        self.tier_metrics = TieredCacheMetrics()
+        self.channel = f"{config.prefix}invalidate"
+        self._origin = uuid.uuid4().hex
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        delay = 0.1
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self.l1.clear()
+                        self._subscribed = True
+                        delay = 0.1
+                    elif message["type"] == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation channel lost, bypassing L1 until it is back: %s", e)
+            finally:
+                self._subscribed = False
+                self.l1.clear()
+                try:
+                    # aclose() replaced reset() in redis-py 5
+                    await getattr(pubsub, "aclose", pubsub.reset)()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+    def _apply_invalidation(self, data: Any):
+        message = json.loads(data)
+        if message.get("origin") == self._origin:
+            return
+        self.tier_metrics.invalidations_received += 1
+        if message.get("clear"):
+            self.l1.clear()
+        for key in message.get("keys", []):
+            self.l1.pop(key)
+
+    async def _publish(self, **message: Any):
+        try:
+            await self.redis.publish(self.channel, json.dumps({"origin": self._origin, **message}))
+        except RedisError as e:
+            logger.warning("Could not publish cache invalidation: %s", e)
+
+    async def get(self, key: str) -> Any:
+        self._ensure_listener()
+        if self._subscribed:
+            value = self.l1.get(key)
+            if value is not None:
+                self.tier_metrics.l1_hits += 1
+                CACHE_TIER_LOOKUPS.labels(tier="l1", result="hit").inc()
+                return value
+            self.tier_metrics.l1_misses += 1
+            CACHE_TIER_LOOKUPS.labels(tier="l1", result="miss").inc()
+
+        full_key = f"{self.config.prefix}{key}"
+        raw = await self.redis.get(full_key)
+        if not raw:
+            self.metrics.misses += 1
+            self.tier_metrics.l2_misses += 1
+            CACHE_TIER_LOOKUPS.labels(tier="l2", result="miss").inc()
+            return None
+        self.metrics.hits += 1
+        self.tier_metrics.l2_hits += 1
+        CACHE_TIER_LOOKUPS.labels(tier="l2", result="hit").inc()
+        value = self._deserialize(raw)
+        if self._subscribed:
+            self.l1.put(key, value, len(raw))
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int = None) -> None:
+        self._ensure_listener()
+        full_key = f"{self.config.prefix}{key}"
+        serialized_value = self._serialize(value)
+        if ttl is None:
+            ttl = self.config.ttl
+        await self.redis.set(full_key, serialized_value, ex=ttl)
+        if self._subscribed:
+            self.l1.put(key, value, len(serialized_value), ttl)
+        await self._publish(keys=[key])
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        self._ensure_listener()
+        keys = list(keys)
+        values: Dict[str, Any] = {}
+        if self._subscribed:
+            for key in keys:
+                value = self.l1.get(key)
+                if value is not None:
+                    values[key] = value
+            self.tier_metrics.l1_hits += len(values)
+            self.tier_metrics.l1_misses += len(keys) - len(values)
+            CACHE_TIER_LOOKUPS.labels(tier="l1", result="hit").inc(len(values))
+            CACHE_TIER_LOOKUPS.labels(tier="l1", result="miss").inc(len(keys) - len(values))
+
+        missing = [key for key in keys if key not in values]
+        if not missing:
+            return values
+        raw_values = await self.redis.mget([f"{self.config.prefix}{key}" for key in missing])
+        found = 0
+        for key, raw in zip(missing, raw_values):
+            if not raw:
+                continue
+            found += 1
+            values[key] = self._deserialize(raw)
+            if self._subscribed:
+                self.l1.put(key, values[key], len(raw))
+        self.metrics.hits += found
+        self.metrics.misses += len(missing) - found
+        self.tier_metrics.l2_hits += found
+        self.tier_metrics.l2_misses += len(missing) - found
+        CACHE_TIER_LOOKUPS.labels(tier="l2", result="hit").inc(found)
+        CACHE_TIER_LOOKUPS.labels(tier="l2", result="miss").inc(len(missing) - found)
+        return values
+
+    async def set_many(self, mapping: Mapping[str, Any], ttl: int = None) -> None:
+        self._ensure_listener()
+        serialized = {key: self._serialize(value) for key, value in mapping.items()}
+        await self._set_serialized(serialized, ttl)
+        if self._subscribed:
+            for key, value in mapping.items():
+                self.l1.put(key, value, len(serialized[key]), ttl or self.config.ttl)
+        if serialized:
+            await self._publish(keys=list(serialized))
+
+    async def delete(self, key: str) -> None:
+        self.l1.pop(key)
+        await super().delete(key)
+        await self._publish(keys=[key])
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        for key in keys:
+            self.l1.pop(key)
+        await super().delete_many(keys)
+        if keys:
+            await self._publish(keys=keys)
+
+    async def clear(self) -> None:
+        self.l1.clear()
+        await super().clear()
+        await self._publish(clear=True)
+
+    async def get_metrics(self) -> TieredCacheMetrics:
+        self.tier_metrics.l1_entries = len(self.l1)
+        self.tier_metrics.l1_bytes = self.l1.bytes
+        return self.tier_metrics
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+# Global cache instance: per-process L1 in front of Redis
+cache = TieredCache()
 
 def cached(ttl: int = None):
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        # Methods are keyed on their arguments only; the instance differs per request and per process
+        parameters = list(inspect.signature(func).parameters)
+        skip_first = bool(parameters) and parameters[0] in ("self", "cls")
+        name = f"{func.__module__}.{func.__qualname__}"
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create a cache key based on the function name and arguments
-            key = f"{func.__name__}:{hash(str(args) + str(kwargs))}"
-            
-            # Try to get the result from cache
-            cached_result = await cache.get(key)
-            if cached_result is not None:
-                return cached_result
-            
-            # If not in cache, call the function
-            result = await func(*args, **kwargs)
-            
-            # Store the result in cache
-            await cache.set(key, result, ttl)
-            
-            return result
+            # Create a cache key from the function name and a stable digest of its arguments
+            key = f"{name}:{make_cache_key(args[1:] if skip_first else args, kwargs)}"
+            return await cache.get_or_compute(key, lambda: func(*args, **kwargs), ttl)
         return wrapper
     return decorator
 
@@ -105,5 +620,5 @@ async def manual_cache_operation(operation: str, key: str, value: Any = None, tt
         raise ValueError("Invalid operation. Use 'get', 'set', or 'delete'.")
 
 # Function to get cache metrics
-async def get_cache_metrics() -> CacheMetrics:
+async def get_cache_metrics() -> TieredCacheMetrics:
     return await cache.get_metrics()
\ No newline at end of file
@@ -0,0 +1,119 @@
+import json
+import logging
+import pickle
+import zlib
+from typing import Any, Callable, Dict
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# Envelope: MAGIC, VERSION, format tag, codec tag, payload.
+# Neither JSON text nor a pickle (0x80 ...) can start with MAGIC, so values
+# written before the envelope existed are still recognised and decoded.
+MAGIC = 0xCA
+ENVELOPE_VERSION = 1
+HEADER_SIZE = 4
+
+FORMAT_JSON = ord("j")
+FORMAT_PICKLE = ord("p")
+FORMAT_BYTES = ord("b")
+
+CODEC_NONE = ord("n")
+CODEC_ZLIB = ord("z")
+CODEC_ZSTD = ord("s")
+CODEC_LZ4 = ord("l")
+
+_COMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {CODEC_ZLIB: lambda data: zlib.compress(data, 1)}
+_DECOMPRESSORS: Dict[int, Callable[[bytes], bytes]] = {CODEC_ZLIB: zlib.decompress}
+if zstandard is not None:
+    _COMPRESSORS[CODEC_ZSTD] = zstandard.ZstdCompressor(level=3).compress
+    _DECOMPRESSORS[CODEC_ZSTD] = zstandard.ZstdDecompressor().decompress
+if lz4_frame is not None:
+    _COMPRESSORS[CODEC_LZ4] = lz4_frame.compress
+    _DECOMPRESSORS[CODEC_LZ4] = lz4_frame.decompress
+
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "lz4": CODEC_LZ4}
+
+
+class SerializationError(ValueError):
+    pass
+
+
+def resolve_codec(name: str) -> int:
+    """The codec tag for ``name``, falling back to zlib when its library is not installed."""
+    codec = CODECS[name]
+    if codec != CODEC_NONE and codec not in _COMPRESSORS:
+        logger.warning("%s is not installed; compressing cache values with zlib instead", name)
+        return CODEC_ZLIB
+    return codec
+
+
+def encode_value(value: Any, codec: int = CODEC_NONE, threshold: int = 1024, allow_pickle: bool = True) -> bytes:
+    """
+    Wrap ``value`` in the versioned envelope.
+
+    Raw bytes are stored as-is. Other values are pickled, which keeps their
+    exact types and is several times faster than JSON in CPython; with
+    ``allow_pickle`` off they must be JSON-serializable instead (tuples come
+    back as lists). Payloads of at least ``threshold`` bytes are compressed
+    with ``codec`` when that makes them smaller.
+    """
+    if isinstance(value, bytes):
+        fmt, payload = FORMAT_BYTES, value
+    elif allow_pickle:
+        fmt, payload = FORMAT_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        try:
+            payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            raise SerializationError(f"Cannot cache {type(value).__name__} with pickling disabled: {e}") from e
+        fmt = FORMAT_JSON
+
+    used = CODEC_NONE
+    if codec != CODEC_NONE and len(payload) >= threshold:
+        compressed = _COMPRESSORS[codec](payload)
+        if len(compressed) < len(payload):
+            used, payload = codec, compressed
+    return bytes((MAGIC, ENVELOPE_VERSION, fmt, used)) + payload
+
+
+def decode_value(data: bytes, allow_pickle: bool = True) -> Any:
+    if not data or data[0] != MAGIC:
+        return _decode_legacy(data, allow_pickle)
+    version, fmt, codec = data[1], data[2], data[3]
+    if version > ENVELOPE_VERSION:
+        raise SerializationError(f"Cache envelope version {version} is newer than supported ({ENVELOPE_VERSION})")
+    payload = data[HEADER_SIZE:]
+    if codec != CODEC_NONE:
+        decompress = _DECOMPRESSORS.get(codec)
+        if decompress is None:
+            raise SerializationError(f"No decompressor installed for codec {chr(codec)!r}")
+        payload = decompress(payload)
+    if fmt == FORMAT_JSON:
+        return json.loads(payload)
+    if fmt == FORMAT_BYTES:
+        return payload
+    if fmt == FORMAT_PICKLE:
+        if not allow_pickle:
+            raise SerializationError("Refusing to unpickle a cache value with pickling disabled")
+        return pickle.loads(payload)
+    raise SerializationError(f"Unknown cache value format {chr(fmt)!r}")
+
+
+def _decode_legacy(data: bytes, allow_pickle: bool) -> Any:
+    # Values written before the envelope: JSON scalars or pickles
+    if data[:1] == b"\x80":
+        if not allow_pickle:
+            raise SerializationError("Refusing to unpickle a cache value with pickling disabled")
+        return pickle.loads(data)
+    return json.loads(data)
+
@@ -1 +1,6 @@
+from .cache import CompressionCache, CompressionCacheConfig
+from .engine import (
+    CompressionEngine, CompressionEngineConfig, CompressionOverloadedError, LocalPromptCompressor, get_compression_engine
+)
+from .policy import CompressionPolicy, CompressionPolicyConfig
 from .llm_lingua import LLMCompressor, CompressionResult, compress_prompt
\ No newline at end of file
@@ -0,0 +1,82 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from cross_cutting.caching.redis_cache import RedisCache
+from cross_cutting.observability.metrics import COMPRESSION_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionCacheConfig(BaseModel):
+    max_entries: int = 10_000
+    # Entries are content-addressed, so they never go stale; the TTL only bounds Redis memory
+    ttl: int = 7 * 24 * 3600
+
+
+class CompressionCache:
+    """Compressed prompts keyed by (model, ratio, prompt digest).
+
+    An in-process LRU sits in front of an optional Redis tier shared by
+    every worker, which also keeps results precompressed at ingestion
+    across restarts. Redis errors degrade to a miss.
+    """
+
+    def __init__(self, config: CompressionCacheConfig = CompressionCacheConfig(), store: Optional[RedisCache] = None):
+        self.config = config
+        self.store = store
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    @staticmethod
+    def key(model_name: str, ratio: float, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"compression:{model_name}:{ratio:g}:{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        found, missing = {}, []
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[key] = self._entries[key]
+                COMPRESSION_CACHE_LOOKUPS.labels(tier="memory", result="hit").inc()
+            else:
+                missing.append(key)
+                COMPRESSION_CACHE_LOOKUPS.labels(tier="memory", result="miss").inc()
+
+        if missing and self.store is not None:
+            try:
+                stored = await self.store.get_many(missing)
+            except RedisError as e:
+                logger.warning("Compression cache unavailable, treating %d lookups as misses: %s", len(missing), e)
+                stored = {}
+            for key in missing:
+                COMPRESSION_CACHE_LOOKUPS.labels(tier="redis", result="hit" if key in stored else "miss").inc()
+            for key, compressed in stored.items():
+                self._remember(key, compressed)
+                found[key] = compressed
+        return found
+
+    async def set(self, key: str, compressed: str) -> None:
+        await self.set_many({key: compressed})
+
+    async def set_many(self, entries: Dict[str, str]) -> None:
+        for key, compressed in entries.items():
+            self._remember(key, compressed)
+        if entries and self.store is not None:
+            try:
+                await self.store.set_many(entries, ttl=self.config.ttl)
+            except RedisError as e:
+                logger.warning("Could not persist %d compressed prompts: %s", len(entries), e)
+
+    def _remember(self, key: str, compressed: str):
+        self._entries[key] = compressed
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
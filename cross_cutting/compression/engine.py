@@ -0,0 +1,277 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from cross_cutting.observability.metrics import (
+    COMPRESSION_BATCH_SIZE,
+    COMPRESSION_COMPUTE_SECONDS,
+    COMPRESSION_QUEUE_DEPTH,
+    COMPRESSION_QUEUE_SECONDS,
+    COMPRESSION_REJECTED,
+    COMPRESSION_WORKER_RESTARTS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionEngineConfig(BaseModel):
+    model_name: str = "openai-community/gpt2"
+    device: str = "cpu"
+    workers: int = 2
+    max_batch_size: int = 8
+    # How long a worker waits for more requests to join a batch that is not full yet
+    batch_window_ms: float = 5.0
+    # Requests waiting beyond this are refused (backpressure) instead of queued without bound
+    max_queue: int = 256
+    enqueue_timeout: float = 1.0
+
+
+class CompressionOverloadedError(Exception):
+    """Raised when the compression queue stays full for longer than ``enqueue_timeout``"""
+
+
+# Model name selecting the offline stand-in for LLMLingua
+LOCAL_MODEL = "local"
+
+
+class LocalPromptCompressor:
+    """Deterministic, offline stand-in for ``llmlingua.PromptCompressor``.
+
+    Drops ``ratio`` of the words at evenly spaced positions, so no model
+    needs to be downloaded or loaded. Counts words as tokens.
+    """
+
+    def compress_prompt(self, context: List[str], question: str = "", ratio: float = 0.5) -> Dict[str, Any]:
+        words = " ".join(context).split()
+        keep = max(1, round(len(words) * (1 - ratio))) if words else 0
+        kept = [words[int(i * len(words) / keep)] for i in range(keep)]
+        return {"compressed_prompt": " ".join(kept), "origin_tokens": len(words), "compressed_tokens": len(kept)}
+
+
+# --- Worker process side -----------------------------------------------------
+
+_compressor = None
+
+
+def _init_worker(model_name: str, device: str):
+    global _compressor
+    if model_name == LOCAL_MODEL:
+        _compressor = LocalPromptCompressor()
+        return
+    # Imported here: only worker processes need torch and the model in memory
+    from llmlingua import PromptCompressor
+
+    _compressor = PromptCompressor(model_name=model_name, device_map=device)
+
+
+def _ready() -> bool:
+    return _compressor is not None
+
+
+def _compress_batch(
+    prompts: List[str], ratios: List[float], questions: List[str]
+) -> List[Tuple[str, int, int, float]]:
+    """Compress each prompt with the warm model; ``(compressed, original_tokens, compressed_tokens, seconds)``."""
+    results = []
+    for prompt, ratio, question in zip(prompts, ratios, questions):
+        start = time.perf_counter()
+        # With a question, tokens are scored by their relevance to it rather than on their own
+        output = _compressor.compress_prompt([prompt], question=question, ratio=ratio)
+        results.append((
+            output["compressed_prompt"],
+            output.get("origin_tokens", len(prompt.split())),
+            output.get("compressed_tokens", len(output["compressed_prompt"].split())),
+            time.perf_counter() - start,
+        ))
+    return results
+
+
+# --- Event loop side ---------------------------------------------------------
+
+class _PendingCompression:
+    __slots__ = ("prompt", "ratio", "question", "future", "enqueued_at")
+
+    def __init__(self, prompt: str, ratio: float, question: str, future: asyncio.Future):
+        self.prompt = prompt
+        self.ratio = ratio
+        self.question = question
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class CompressionEngine:
+    """LLMLingua compression on a fixed pool of worker processes, each holding the model warm.
+
+    Requests go onto one bounded queue. Each worker has a dispatcher that
+    takes the next request, waits up to ``batch_window_ms`` for others (up
+    to ``max_batch_size``) and ships them to its process in one call, so
+    model calls run in parallel across processes instead of contending for
+    the GIL in a thread pool. When the queue is full, ``compress`` waits up
+    to ``enqueue_timeout`` for room and then raises
+    :class:`CompressionOverloadedError`.
+
+    A worker that dies (OOM kill, segfault) breaks the whole pool: the batch
+    it held fails and the pool is replaced with a fresh one, so later
+    requests are served again once the new workers have loaded the model.
+    """
+
+    def __init__(self, config: CompressionEngineConfig = CompressionEngineConfig()):
+        self.config = config
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._queue: Optional["asyncio.Queue[_PendingCompression]"] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._starting: Optional[asyncio.Future] = None
+        self._restart_lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._dispatchers)
+
+    async def start(self):
+        """Spawn the workers and wait until each has loaded the model."""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        try:
+            await asyncio.shield(self._starting)
+        except Exception:
+            # Let the next call try again rather than failing forever
+            if self._starting is not None and self._starting.done():
+                self._starting = None
+            raise
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        self._pool = await self._spawn_pool()
+        self._queue = asyncio.Queue(maxsize=self.config.max_queue)
+        self._dispatchers = [loop.create_task(self._dispatch()) for _ in range(self.config.workers)]
+        logger.info(
+            "Compression engine ready: %d workers with %s in %.1fs",
+            self.config.workers, self.config.model_name, time.perf_counter() - start,
+        )
+
+    async def _spawn_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        loop = asyncio.get_running_loop()
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.config.workers,
+            # Forking a process that has already touched torch or CUDA is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.config.model_name, self.config.device),
+        )
+        try:
+            # One call per worker makes the pool start them all now rather than on first use
+            await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(self.config.workers)))
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        return pool
+
+    async def _replace_pool(self, broken: concurrent.futures.ProcessPoolExecutor):
+        """Swap a broken pool for a new one; every dispatcher that saw it break calls this, one replaces it."""
+        async with self._restart_lock:
+            if self._pool is not broken:
+                return
+            logger.warning("A compression worker died; restarting the worker pool")
+            COMPRESSION_WORKER_RESTARTS.inc()
+            broken.shutdown(wait=False, cancel_futures=True)
+            try:
+                self._pool = await self._spawn_pool()
+            except Exception:
+                # The broken pool stays in place, so the next batch fails fast and tries again
+                logger.exception("Restarting the compression worker pool failed")
+
+    async def compress(self, prompt: str, ratio: float = 0.5, question: str = "") -> Dict[str, Any]:
+        """Compress ``prompt`` (relative to ``question``, if given); returns its compressed text and token counts."""
+        await self.start()
+        pending = _PendingCompression(prompt, ratio, question, asyncio.get_running_loop().create_future())
+        try:
+            await asyncio.wait_for(self._queue.put(pending), self.config.enqueue_timeout)
+        except asyncio.TimeoutError:
+            COMPRESSION_REJECTED.inc()
+            raise CompressionOverloadedError(
+                f"Compression queue full ({self.config.max_queue} waiting) for {self.config.enqueue_timeout}s"
+            )
+        COMPRESSION_QUEUE_DEPTH.set(self._queue.qsize())
+        return await pending.future
+
+    async def _next_batch(self) -> List[_PendingCompression]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.config.batch_window_ms / 1000
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        COMPRESSION_QUEUE_DEPTH.set(self._queue.qsize())
+        # Callers that gave up while queued are dropped before any work is done for them
+        return [pending for pending in batch if not pending.future.done()]
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            COMPRESSION_BATCH_SIZE.observe(len(batch))
+            for pending in batch:
+                COMPRESSION_QUEUE_SECONDS.observe(started - pending.enqueued_at)
+            pool = self._pool
+            try:
+                results = await loop.run_in_executor(
+                    pool, _compress_batch,
+                    [pending.prompt for pending in batch],
+                    [pending.ratio for pending in batch],
+                    [pending.question for pending in batch],
+                )
+            except Exception as e:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                if isinstance(e, BrokenProcessPool):
+                    await self._replace_pool(pool)
+                continue
+
+            for pending, (compressed, original_tokens, compressed_tokens, seconds) in zip(batch, results):
+                COMPRESSION_COMPUTE_SECONDS.observe(seconds)
+                if not pending.future.done():
+                    pending.future.set_result({
+                        "compressed_prompt": compressed,
+                        "original_tokens": original_tokens,
+                        "compressed_tokens": compressed_tokens,
+                        "queue_seconds": started - pending.enqueued_at,
+                        "compute_seconds": seconds,
+                    })
+
+    async def close(self):
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._starting = None
+
+
+# One engine per process: every caller shares the same warm workers
+_default_engine: Optional[CompressionEngine] = None
+
+
+def get_compression_engine(config: Optional[CompressionEngineConfig] = None) -> CompressionEngine:
+    """The process-wide engine, created with ``config`` on first use."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = CompressionEngine(config or CompressionEngineConfig())
+    return _default_engine
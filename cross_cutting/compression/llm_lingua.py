@@ -1,9 +1,15 @@
 # from llmlingua import PromptCompressor
-from langchain_community.document_compressors import LLMLinguaCompressor
-from functools import wraps
-from typing import Callable, Any
 import asyncio
+import logging
+from functools import wraps
+from typing import Callable, Any, Dict, Iterable, Optional
 from pydantic import BaseModel
+from cross_cutting.observability.metrics import COMPRESSION_PRECOMPRESSED
+from .cache import CompressionCache
+from .engine import CompressionEngine, CompressionOverloadedError, get_compression_engine
+from .policy import SKIP, CompressionPolicy
+
+logger = logging.getLogger(__name__)
 
 
 # from langchain.retrievers import ContextualCompressionRetriever
@@ -29,31 +35,122 @@ class CompressionResult(BaseModel):
     original_tokens: int
     compressed_tokens: int
     compression_ratio: float
+    # skip, light or aggressive when chosen by the policy; fixed for an explicit ratio
+    decision: str = "fixed"
 
 class LLMCompressor:
-    def __init__(self, model_name: str = "gpt-3.5-turbo"):
-        # self.compressor = PromptCompressor(model_name=model_name)
-        
-        self.compressor = LLMLinguaCompressor(model_name="openai-community/gpt2", device_map="cpu")
+    def __init__(
+        self,
+        engine: Optional[CompressionEngine] = None,
+        policy: Optional[CompressionPolicy] = None,
+        token_counter: Optional[Callable[[str], int]] = None,
+        cache: Optional[CompressionCache] = None,
+    ):
+        # The model lives in the engine's worker processes, so creating a compressor is cheap
+        self.engine = engine or get_compression_engine()
+        self.policy = policy or CompressionPolicy()
+        # Should count the target LLM's tokens, which is what compression saves
+        self.count_tokens = token_counter or (lambda text: len(text.split()))
+        self.cache = cache or CompressionCache()
     
-    async def compress(self, prompt: str, ratio: float = 0.5) -> CompressionResult:
-        loop = asyncio.get_event_loop()
-        compressed_prompt = await loop.run_in_executor(
-            None, self.compressor.compress_prompt, prompt, ratio
-        )
-        
-        original_tokens = len(prompt.split())
-        compressed_tokens = len(compressed_prompt.split())
-        compression_ratio = 1 - (compressed_tokens / original_tokens)
+    def cache_key(self, prompt: str, ratio: float) -> str:
+        return CompressionCache.key(self.engine.config.model_name, ratio, prompt)
+
+    async def cached(self, prompt: str, ratio: float) -> Optional[CompressionResult]:
+        """The result of compressing ``prompt`` at ``ratio`` without a question, if it is cached."""
+        compressed = await self.cache.get(self.cache_key(prompt, ratio))
+        if compressed is None:
+            return None
+        return self._result(prompt, compressed, self.count_tokens(prompt), "fixed")
+
+    async def compress(
+        self, prompt: str, ratio: float = 0.5, decision: str = "fixed", question: str = ""
+    ) -> CompressionResult:
+        original_tokens = self.count_tokens(prompt)
+        # Output relative to a question is only reusable for that question, so only plain compression is cached
+        key = None if question else self.cache_key(prompt, ratio)
+        if key is not None:
+            compressed = await self.cache.get(key)
+            if compressed is not None:
+                return self._result(prompt, compressed, original_tokens, decision)
+
+        output = await self.engine.compress(prompt, ratio, question)
+        self.policy.observe(original_tokens, output["queue_seconds"], output["compute_seconds"])
+        if key is not None:
+            await self.cache.set(key, output["compressed_prompt"])
+        return self._result(prompt, output["compressed_prompt"], original_tokens, decision)
+
+    async def precompress(self, prompts: Iterable[str], ratios: Iterable[float], concurrency: int = 4) -> int:
+        """Compress and cache ``prompts`` at each of ``ratios`` ahead of use; returns how many were compressed.
+
+        Prompts already cached are skipped. At most ``concurrency`` are
+        queued at once, so a large sync leaves room on the shared queue for
+        live queries. Chunks the engine refuses or fails on are left for the
+        query path rather than failing the caller.
+        """
+        prompts = list(dict.fromkeys(prompts))
+        slots = asyncio.Semaphore(max(concurrency, 1))
+
+        async def compress(prompt: str, ratio: float) -> Dict[str, Any]:
+            async with slots:
+                return await self.engine.compress(prompt, ratio)
+
+        compressed = 0
+        for ratio in ratios:
+            keys = {self.cache_key(prompt, ratio): prompt for prompt in prompts}
+            cached = await self.cache.get_many(keys)
+            missing = [(key, prompt) for key, prompt in keys.items() if key not in cached]
+            if not missing:
+                continue
+            outputs = await asyncio.gather(
+                *(compress(prompt, ratio) for _, prompt in missing), return_exceptions=True
+            )
+            entries = {}
+            errors = []
+            for (key, _), output in zip(missing, outputs):
+                if isinstance(output, BaseException):
+                    errors.append(output)
+                    continue
+                entries[key] = output["compressed_prompt"]
+            await self.cache.set_many(entries)
+            compressed += len(entries)
+            if errors:
+                overloaded = sum(isinstance(error, CompressionOverloadedError) for error in errors)
+                logger.warning(
+                    "%d of %d chunks left uncompressed at ratio %g (%d refused by an overloaded engine, last error: %r)",
+                    len(errors), len(missing), ratio, overloaded, errors[-1],
+                )
+        COMPRESSION_PRECOMPRESSED.inc(compressed)
+        return compressed
+
+    def _result(self, prompt: str, compressed: str, original_tokens: int, decision: str) -> CompressionResult:
+        compressed_tokens = self.count_tokens(compressed)
+        compression_ratio = 1 - (compressed_tokens / original_tokens) if original_tokens else 0.0
         
         return CompressionResult(
             original_prompt=prompt,
-            compressed_prompt=compressed_prompt,
+            compressed_prompt=compressed,
             original_tokens=original_tokens,
             compressed_tokens=compressed_tokens,
-            compression_ratio=compression_ratio
+            compression_ratio=compression_ratio,
+            decision=decision
         )
 
+    async def compress_adaptive(self, prompt: str, budget: Optional[int] = None) -> CompressionResult:
+        """Compress only as hard as the policy finds worthwhile for this prompt and context ``budget``."""
+        tokens = self.count_tokens(prompt)
+        decision, ratio = self.policy.decide(tokens, budget)
+        if decision == SKIP:
+            return CompressionResult(
+                original_prompt=prompt,
+                compressed_prompt=prompt,
+                original_tokens=tokens,
+                compressed_tokens=tokens,
+                compression_ratio=0.0,
+                decision=decision
+            )
+        return await self.compress(prompt, ratio, decision)
+
 def compress_prompt(ratio: float = 0.5):
     compressor = LLMCompressor()
     
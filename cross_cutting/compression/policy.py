@@ -0,0 +1,84 @@
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+
+from cross_cutting.observability.metrics import COMPRESSION_DECISIONS
+
+SKIP = "skip"
+LIGHT = "light"
+AGGRESSIVE = "aggressive"
+
+
+class CompressionPolicyConfig(BaseModel):
+    # Prompts shorter than this are never worth a compressor round trip
+    min_tokens: int = 64
+    light_ratio: float = 0.3
+    aggressive_ratio: float = 0.6
+    # Aggressive compression loses detail, so it is only considered once the
+    # prompt takes more than this share of the remaining context budget
+    aggressive_budget_share: float = 0.5
+    context_window: int = 16385
+    # Tokens kept free for everything sent with the prompt (system prompt,
+    # retrieved context) and for the completion
+    reserved_tokens: int = 4096
+    # Latency-equivalent value of one input token not sent to the LLM
+    # (prefill time plus price), weighed against the compressor's latency
+    token_value_ms: float = 0.5
+    # Smoothing for the measured compressor latency
+    latency_alpha: float = 0.2
+
+
+class CompressionPolicy:
+    """Chooses skip, light or aggressive compression for a prompt.
+
+    Compressing pays off when the input tokens it saves are worth more than
+    the time the compressor takes. Savings are the prompt's real token count
+    (from the target LLM's tokenizer) times the option's ratio, valued at
+    ``token_value_ms`` each. The cost is the compressor's measured queue
+    wait plus its per-token compute time, both exponentially smoothed from
+    recent calls (``observe``). Prompts that do not fit the remaining
+    context budget are always compressed, aggressively.
+    """
+
+    def __init__(self, config: CompressionPolicyConfig = CompressionPolicyConfig()):
+        self.config = config
+        # No measurements yet: assume compression is cheap until shown otherwise
+        self.queue_ms = 0.0
+        self.compute_ms_per_token = 0.0
+
+    @property
+    def budget(self) -> int:
+        return max(self.config.context_window - self.config.reserved_tokens, 0)
+
+    def decide(self, tokens: int, budget: Optional[int] = None) -> Tuple[str, float]:
+        """``(decision, ratio)`` for a prompt of ``tokens`` tokens given ``budget`` tokens to spare."""
+        budget = self.budget if budget is None else budget
+        if tokens > budget:
+            decision = AGGRESSIVE
+        elif tokens < self.config.min_tokens:
+            decision = SKIP
+        else:
+            options = [(SKIP, 0.0), (LIGHT, self._net_benefit_ms(tokens, self.config.light_ratio))]
+            if tokens > self.config.aggressive_budget_share * budget:
+                options.append((AGGRESSIVE, self._net_benefit_ms(tokens, self.config.aggressive_ratio)))
+            decision = max(options, key=lambda option: option[1])[0]
+            if decision == SKIP:
+                # Skipped prompts measure nothing, so let a backlog-inflated wait estimate fade
+                self.queue_ms *= 1 - self.config.latency_alpha
+        COMPRESSION_DECISIONS.labels(decision=decision).inc()
+        return decision, self.ratio(decision)
+
+    def ratio(self, decision: str) -> float:
+        return {SKIP: 0.0, LIGHT: self.config.light_ratio, AGGRESSIVE: self.config.aggressive_ratio}[decision]
+
+    def _net_benefit_ms(self, tokens: int, ratio: float) -> float:
+        saved_ms = tokens * ratio * self.config.token_value_ms
+        cost_ms = self.queue_ms + tokens * self.compute_ms_per_token
+        return saved_ms - cost_ms
+
+    def observe(self, tokens: int, queue_seconds: float, compute_seconds: float):
+        """Fold one compressor call's measured latency into the cost estimate."""
+        alpha = self.config.latency_alpha
+        self.queue_ms += alpha * (queue_seconds * 1000 - self.queue_ms)
+        if tokens:
+            self.compute_ms_per_token += alpha * (compute_seconds * 1000 / tokens - self.compute_ms_per_token)
@@ -27,6 +27,203 @@ LLM_TOKEN_USAGE = Counter(
     ['model']
 )
 
+VECTOR_STORE_STARTUP_SECONDS = Gauge(
+    'vector_store_startup_seconds',
+    'Time spent bringing the vector store up at startup',
+    ['mode']
+)
+
+VECTOR_STORE_STARTUP_SAVED_SECONDS = Gauge(
+    'vector_store_startup_saved_seconds',
+    'Estimated startup time saved by booting from a snapshot instead of re-embedding'
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size',
+    'Number of texts sent per embedding request',
+    buckets=(1, 8, 32, 64, 128, 256, 512, 1024, 2048)
+)
+
+EMBEDDING_BATCH_RETRIES = Counter(
+    'embedding_batch_retries_total',
+    'Number of embedding batch retries'
+)
+
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    'embedding_cache_lookups_total',
+    'Embedding cache lookups by outcome',
+    ['result']
+)
+
+SEARCH_BATCH_FILL_RATIO = Histogram(
+    'vector_search_batch_fill_ratio',
+    'Queries per micro-batched vector search as a fraction of the maximum batch size',
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0)
+)
+
+SEARCH_QUEUE_DELAY_SECONDS = Histogram(
+    'vector_search_queue_delay_seconds',
+    'Time a vector search waited to be batched',
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+VECTOR_STORE_TOMBSTONE_RATIO = Gauge(
+    'vector_store_tombstone_ratio',
+    'Fraction of indexed vectors belonging to deleted or replaced documents'
+)
+
+VECTOR_STORE_COMPACTIONS = Counter(
+    'vector_store_compactions_total',
+    'Vector index rebuilds that dropped tombstoned rows'
+)
+
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    'semantic_cache_lookups_total',
+    'Semantic answer cache lookups by outcome (hit, near_miss, miss)',
+    ['result']
+)
+
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    'semantic_cache_best_similarity',
+    'Cosine similarity of the closest cached query, to tune the hit threshold',
+    buckets=(0.5, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0)
+)
+
+CACHE_SINGLE_FLIGHT_WAITERS = Counter(
+    'cache_single_flight_waiters_total',
+    'Cache misses that awaited an identical in-flight computation in the same process'
+)
+
+REQUESTS_COALESCED = Counter(
+    'requests_coalesced_total',
+    'Requests answered by an identical in-flight request, in this worker or another one',
+    ['scope']
+)
+
+CACHE_LOCK_WAITS = Counter(
+    'cache_lock_waits_total',
+    'Cache misses that waited for another worker holding the key lock'
+)
+
+CACHE_TIER_LOOKUPS = Counter(
+    'cache_tier_lookups_total',
+    'Tiered cache lookups by tier (l1 in-process, l2 Redis) and outcome',
+    ['tier', 'result']
+)
+
+KNOWLEDGE_BASE_VERSION = Gauge(
+    'knowledge_base_version',
+    'Current knowledge-base version; derived caches are namespaced by it'
+)
+
+CACHE_GENERATION_KEYS_COLLECTED = Counter(
+    'cache_generation_keys_collected_total',
+    'Cache keys deleted from retired knowledge-base versions'
+)
+
+QUERY_RESPONSES = Counter(
+    'query_responses_total',
+    'Query responses by freshness: fresh, stale (served while revalidating) or degraded (retrieval only)',
+    ['freshness']
+)
+
+COMPRESSION_QUEUE_SECONDS = Histogram(
+    'compression_queue_seconds',
+    'Time a prompt waited for a compression worker',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+COMPRESSION_COMPUTE_SECONDS = Histogram(
+    'compression_compute_seconds',
+    'Time a compression worker spent on one prompt',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+COMPRESSION_BATCH_SIZE = Histogram(
+    'compression_batch_size',
+    'Prompts sent to a compression worker per call',
+    buckets=(1, 2, 4, 8, 16, 32)
+)
+
+COMPRESSION_QUEUE_DEPTH = Gauge(
+    'compression_queue_depth',
+    'Prompts waiting for a compression worker'
+)
+
+COMPRESSION_REJECTED = Counter(
+    'compression_rejected_total',
+    'Compression requests refused because the queue stayed full'
+)
+
+COMPRESSION_WORKER_RESTARTS = Counter(
+    'compression_worker_restarts_total',
+    'Compression worker pools replaced after a worker process died'
+)
+
+COMPRESSION_DECISIONS = Counter(
+    'compression_decisions_total',
+    'Prompt compression decisions taken by the cost model',
+    ['decision']
+)
+
+COMPRESSION_CACHE_LOOKUPS = Counter(
+    'compression_cache_lookups_total',
+    'Compressed prompt cache lookups by tier (memory, redis) and outcome',
+    ['tier', 'result']
+)
+
+COMPRESSION_PRECOMPRESSED = Counter(
+    'compression_precompressed_total',
+    'Chunks compressed ahead of queries during ingestion'
+)
+
+CONTEXT_TOKENS = Histogram(
+    'context_tokens',
+    'Tokens of retrieved context per query, as retrieved and as sent to the LLM',
+    ['stage'],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+
+CONTEXT_COMPRESSION_SECONDS = Histogram(
+    'context_compression_seconds',
+    'Time spent compressing and budgeting the retrieved context of one query'
+)
+
+STREAM_TIME_TO_FIRST_BYTE = Histogram(
+    'stream_time_to_first_byte_seconds',
+    'Time from a streaming request to its first event (the retrieved sources)',
+    ['endpoint']
+)
+
+STREAM_TIME_TO_FIRST_TOKEN = Histogram(
+    'stream_time_to_first_token_seconds',
+    'Time from a streaming request to the first answer token',
+    ['endpoint']
+)
+
+STREAMS_CANCELLED = Counter(
+    'streams_cancelled_total',
+    'Streaming responses abandoned because the client disconnected',
+    ['endpoint']
+)
+
+CONTEXT_PACKING_TOKENS_SAVED = Histogram(
+    'context_packing_tokens_saved',
+    'Retrieved-context tokens per query left out of the prompt by context packing',
+    buckets=(0, 50, 100, 250, 500, 1000, 2000, 4000, 8000)
+)
+
+CONTEXT_DUPLICATES_DROPPED = Counter(
+    'context_duplicates_dropped_total',
+    'Retrieved chunks dropped from prompts as near-duplicates of better-ranked ones'
+)
+
+SHARD_SEARCH_TIMEOUTS = Counter(
+    'vector_store_shard_search_timeouts_total',
+    'Shard searches dropped for missing the scatter-gather deadline',
+    ['shard']
+)
+
 def track_request_metrics(endpoint):
     """
     Decorator to track request metrics
@@ -3,6 +3,11 @@ from functools import wraps
 from datetime import datetime, timedelta
 from typing import Callable, Any
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling through while the circuit is open"""
+    def __init__(self, message: str = "Circuit is OPEN"):
+        super().__init__(message)
+
 class CircuitBreaker:
     def __init__(self, failure_threshold: int = 5, recovery_timeout: int = 30):
         self.failure_threshold = failure_threshold
@@ -11,6 +16,11 @@ class CircuitBreaker:
         self.last_failure_time = None
         self.state = "CLOSED"
 
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open and still inside the recovery timeout)."""
+        return self.state == "OPEN" and datetime.now() - self.last_failure_time <= timedelta(seconds=self.recovery_timeout)
+
     def __call__(self, func: Callable[..., Any]) -> Callable[..., Any]:
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -18,7 +28,7 @@ class CircuitBreaker:
                 if datetime.now() - self.last_failure_time > timedelta(seconds=self.recovery_timeout):
                     self.state = "HALF-OPEN"
                 else:
-                    raise Exception("Circuit is OPEN")
+                    raise CircuitOpenError()
             
             try:
                 result = await func(*args, **kwargs)
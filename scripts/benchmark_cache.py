@@ -0,0 +1,147 @@
+"""
+Cache serialization and bulk-operation benchmark.
+
+Compares the old try-JSON-then-pickle serializer with the versioned
+envelope under each available codec (bytes stored, encode/decode ops/sec),
+then single-key get/set against pipelined get_many/set_many. Runs against
+the in-process InMemoryRedis unless a Redis server is given, in which case
+round-trip savings show up too.
+
+    python -m scripts.benchmark_cache --values 2000
+    python -m scripts.benchmark_cache --host localhost --port 6379
+"""
+import argparse
+import asyncio
+import json
+import pickle
+import time
+
+from cross_cutting.caching.memory_redis import InMemoryRedis
+from cross_cutting.caching.redis_cache import CacheConfig, RedisCache
+from cross_cutting.caching.serialization import CODECS, decode_value, encode_value, resolve_codec
+
+
+def make_values(count: int) -> list:
+    # Shaped like cached RAG responses: an answer plus source snippets
+    return [
+        {
+            "answer": f"Answer {i}: " + "the retrieved context says the policy applies to all regions. " * 8,
+            "sources": [
+                {"id": f"doc-{i}-{j}", "snippet": f"source {j} of {i}: " + "lorem ipsum dolor sit amet " * 10}
+                for j in range(4)
+            ],
+            "score": 0.5 + i / (2 * count),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_serialize(value) -> bytes:
+    if isinstance(value, (str, int, float, bool)):
+        return json.dumps(value).encode("utf-8")
+    return pickle.dumps(value)
+
+
+def legacy_deserialize(data: bytes):
+    try:
+        return json.loads(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+def ops_per_second(fn, items: list) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def serializer_report(values: list, threshold: int) -> dict:
+    encoded = [legacy_serialize(value) for value in values]
+    report = {
+        "legacy": {
+            "bytes_per_value": sum(map(len, encoded)) / len(values),
+            "encode_ops_per_second": ops_per_second(legacy_serialize, values),
+            "decode_ops_per_second": ops_per_second(legacy_deserialize, encoded),
+        }
+    }
+    for name in CODECS:
+        codec = resolve_codec(name)
+        if name != "none" and codec != CODECS[name]:
+            continue  # library not installed
+        encoded = [encode_value(value, codec, threshold) for value in values]
+        report[f"envelope_{name}"] = {
+            "bytes_per_value": sum(map(len, encoded)) / len(values),
+            "encode_ops_per_second": ops_per_second(lambda value: encode_value(value, codec, threshold), values),
+            "decode_ops_per_second": ops_per_second(decode_value, encoded),
+        }
+    return report
+
+
+async def bulk_report(cache: RedisCache, values: list, batch_size: int) -> dict:
+    mapping = {f"value:{i}": value for i, value in enumerate(values)}
+    keys = list(mapping)
+    batches = [keys[start:start + batch_size] for start in range(0, len(keys), batch_size)]
+
+    start = time.perf_counter()
+    for key, value in mapping.items():
+        await cache.set(key, value)
+    single_set = len(keys) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for key in keys:
+        await cache.get(key)
+    single_get = len(keys) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for batch in batches:
+        await cache.set_many({key: mapping[key] for key in batch})
+    bulk_set = len(keys) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for batch in batches:
+        found = await cache.get_many(batch)
+        assert len(found) == len(batch)
+    bulk_get = len(keys) / (time.perf_counter() - start)
+
+    await cache.clear()
+    return {
+        "batch_size": batch_size,
+        "single_set_ops_per_second": single_set,
+        "single_get_ops_per_second": single_get,
+        "set_many_ops_per_second": bulk_set,
+        "get_many_ops_per_second": bulk_get,
+    }
+
+
+async def run(values: int, threshold: int, batch_size: int, compression: str, host: str, port: int) -> dict:
+    data = make_values(values)
+    config = CacheConfig(prefix="bench:", compression=compression, compression_threshold=threshold)
+    if host:
+        cache = RedisCache(config.copy(update={"host": host, "port": port}))
+    else:
+        cache = RedisCache(config, client=InMemoryRedis())
+    try:
+        return {
+            "values": values,
+            "backend": f"{host}:{port}" if host else "in-memory",
+            "serializers": serializer_report(data, threshold),
+            "operations": await bulk_report(cache, data, batch_size),
+        }
+    finally:
+        await getattr(cache.redis, "aclose", cache.redis.close)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--values", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=1024, help="compress values of at least this many bytes")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--compression", choices=list(CODECS), default="zstd", help="codec for the get/set runs")
+    parser.add_argument("--host", help="Redis host; the in-memory stand-in is used when omitted")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    report = asyncio.run(run(args.values, args.threshold, args.batch_size, args.compression, args.host, args.port))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Per-request service construction benchmark.
+
+Compares what resolving the query controller used to cost on every request
+(reading Settings from .env, a new VectorStore and ChatOpenAI with its own
+HTTP client, a new RAGChain/RetrievalQA) with handing out the
+ServiceContainer's shared instances. Then compares a fresh HTTP client
+per request with one shared keep-alive pool against a local HTTP server,
+which is the connection setup every OpenAI call used to pay. Runs offline.
+
+    python -m scripts.benchmark_container --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+import httpx
+
+# Settings require these; nothing here connects to either
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from app.chains.rag_chain import RAGChain  # noqa: E402
+from app.core.config import Settings  # noqa: E402
+from app.core.container import ServiceContainer  # noqa: E402
+from app.db.index_spec import IndexSpec  # noqa: E402
+from app.db.search_executor import SearchExecutorConfig  # noqa: E402
+from app.db.sharding import ShardingConfig  # noqa: E402
+from app.db.vector_store import VectorStore  # noqa: E402
+from app.embeddings.batch_embedder import BatchEmbedderConfig  # noqa: E402
+from app.embeddings.cache import EmbeddingCache  # noqa: E402
+from app.embeddings.providers import HashEmbeddings  # noqa: E402
+
+
+def per_request_construction(retriever) -> object:
+    # The old dependency graph, with the LLM the request actually needed initialized
+    settings = Settings()
+    VectorStore(
+        BatchEmbedderConfig.from_settings(settings),
+        EmbeddingCache.from_settings(settings),
+        IndexSpec.from_settings(settings),
+        SearchExecutorConfig.from_settings(settings),
+        ShardingConfig.from_settings(settings),
+    )
+    llm = ChatOpenAI(model_name=settings.OPENAI_LLM_MODEL_NAME, openai_api_key=settings.OPENAI_API_KEY)
+    return RAGChain(llm, retriever)
+
+
+def measure(fn, requests: int) -> dict:
+    tracemalloc.start()
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    seconds = time.perf_counter() - start
+    tracemalloc.stop()
+    return {"ms_per_request": seconds * 1000 / requests, "peak_kib_per_request": sum(peaks) / len(peaks) / 1024}
+
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # Minimal keep-alive HTTP/1.1 server standing in for the OpenAI API
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nContent-Type: application/json\r\n\r\n{}")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def http_report(requests: int) -> dict:
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    async with server:
+        start = time.perf_counter()
+        for _ in range(requests):
+            async with httpx.AsyncClient() as client:
+                await client.get(url)
+        fresh = (time.perf_counter() - start) * 1000 / requests
+
+        async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=20)) as client:
+            start = time.perf_counter()
+            for _ in range(requests):
+                await client.get(url)
+            pooled = (time.perf_counter() - start) * 1000 / requests
+    return {"fresh_client_ms_per_call": fresh, "shared_pool_ms_per_call": pooled, "saved_ms_per_call": fresh - pooled}
+
+
+async def run(requests: int) -> dict:
+    store = VectorStore()
+    await store.initialize(
+        [{"id": str(i), "content": f"document {i}", "metadata": {}} for i in range(10)],
+        "sk-benchmark",
+        embeddings=HashEmbeddings(dimension=64),
+    )
+    retriever = store.as_retriever()
+
+    container = ServiceContainer(Settings())
+    per_request = measure(lambda: per_request_construction(retriever), requests)
+    shared = measure(lambda: (container.settings, container.vector_store, container.llm_service), requests)
+    await container.close()
+    store.close()
+
+    return {
+        "requests": requests,
+        "per_request_construction": per_request,
+        "container": shared,
+        "construction_ms_saved_per_request": per_request["ms_per_request"] - shared["ms_per_request"],
+        "http": await http_report(requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    report = asyncio.run(run(args.requests))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
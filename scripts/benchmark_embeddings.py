@@ -0,0 +1,60 @@
+"""
+Offline embedding throughput benchmark.
+
+Compares one-request-per-document embedding (the old DataSyncService path)
+with BatchEmbedder, using the deterministic local provider with a simulated
+per-request round trip so no network or API key is needed.
+
+    python -m scripts.benchmark_embeddings --documents 5000 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.embeddings.batch_embedder import BatchEmbedder, BatchEmbedderConfig
+from app.embeddings.providers import HashEmbeddings
+
+
+async def run(documents: int, latency: float, batch_size: int, concurrency: int, dimension: int) -> dict:
+    texts = [f"document {i} " + "lorem ipsum dolor sit amet " * 20 for i in range(documents)]
+    provider = HashEmbeddings(dimension=dimension, latency=latency)
+
+    # Sequential baseline is extrapolated from a sample to keep the run short
+    sample = texts[: min(len(texts), 50)]
+    start = time.perf_counter()
+    for text in sample:
+        await provider.aembed_documents([text])
+    sequential_per_doc = (time.perf_counter() - start) / len(sample)
+
+    embedder = BatchEmbedder(
+        provider, BatchEmbedderConfig(max_batch_items=batch_size, max_concurrency=concurrency)
+    )
+    start = time.perf_counter()
+    vectors = await embedder.embed(texts)
+    batched_seconds = time.perf_counter() - start
+    assert len(vectors) == len(texts)
+
+    return {
+        "documents": documents,
+        "sequential_docs_per_second": 1 / sequential_per_doc,
+        "batched_docs_per_second": documents / batched_seconds,
+        "speedup": (sequential_per_doc * documents) / batched_seconds,
+        "requests": len(embedder.plan_batches(texts)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per provider request")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dimension", type=int, default=1536)
+    args = parser.parse_args()
+    report = asyncio.run(run(args.documents, args.latency, args.batch_size, args.concurrency, args.dimension))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
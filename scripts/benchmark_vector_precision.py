@@ -0,0 +1,89 @@
+"""
+Vector storage precision benchmark.
+
+Builds one segment per storage precision over the same random unit vectors
+and reports index bytes per vector, search latency and recall@k against the
+exact float32 flat baseline, with and without full-precision re-ranking.
+
+    python -m scripts.benchmark_vector_precision --vectors 50000 --dimension 1536 --kind flat
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from app.db.index_spec import IndexSpec
+from app.db.segment import Segment
+
+
+def unit_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(t) & set(f[f != -1])) / k for t, f in zip(truth, found)]))
+
+
+def measure(spec: IndexSpec, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    start = time.perf_counter()
+    segment = Segment.build(spec, vectors.shape[1], vectors)
+    segment.add([str(i) for i in range(len(vectors))], vectors)
+    build_seconds = time.perf_counter() - start
+    index_bytes = faiss.serialize_index(segment.index).nbytes
+
+    report = {"build_seconds": build_seconds, "bytes_per_vector": index_bytes / len(vectors)}
+    factors = [1, spec.rerank_factor] if segment.vectors is not None else [1]
+    for factor in factors:
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            _, positions = segment.search(query[None, :], k, rerank_factor=factor)
+            latencies.append(time.perf_counter() - start)
+            found.append(positions[0])
+        label = "rerank" if factor > 1 else "direct"
+        report[label] = {
+            "recall_at_k": recall_at_k(truth, np.asarray(found)),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        }
+    return report
+
+
+def run(vectors: int, dimension: int, queries: int, k: int, kind: str, pq_m: int, rerank_factor: int) -> dict:
+    rng = np.random.default_rng(0)
+    data = unit_vectors(vectors, dimension, rng)
+    query_vectors = unit_vectors(queries, dimension, rng)
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(data)
+    _, truth = exact.search(query_vectors, k)
+
+    results = {}
+    for precision in ("float32", "float16", "int8", "pq"):
+        spec = IndexSpec(kind=kind, precision=precision, pq_m=pq_m, rerank_factor=rerank_factor)
+        results[precision] = measure(spec, data, query_vectors, truth, k)
+    return {"vectors": vectors, "dimension": dimension, "kind": kind, "k": k, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--kind", choices=["flat", "ivf", "hnsw"], default="flat")
+    parser.add_argument("--pq-m", type=int, default=64, help="PQ sub-quantizers (bytes per vector)")
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+    report = run(args.vectors, args.dimension, args.queries, args.k, args.kind, args.pq_m, args.rerank_factor)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
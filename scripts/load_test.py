@@ -0,0 +1,322 @@
+"""
+End-to-end load test.
+
+Drives the app built by create_app() in process over ASGI, sending
+/api/v1/query (or /api/v1/query/stream) requests at a fixed arrival rate,
+and reports throughput, end-to-end and per-stage latency percentiles and
+peak RSS as JSON. By default every provider is the offline stand-in (local
+chat model and hash embeddings, in-memory document store and Redis,
+word-dropping compressor), seeded with synthetic documents, so it runs in
+CI or on an air-gapped host; environment variables override any of them.
+
+    python -m scripts.load_test --rps 20 --duration 30 --output baseline.json
+    python -m scripts.load_test --rps 20 --duration 30 --compare baseline.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+OFFLINE_DEFAULTS = {
+    # Settings require these; nothing connects to either
+    "OPENAI_API_KEY": "sk-load-test",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "LLM_PROVIDER": "local",
+    "EMBEDDING_PROVIDER": "local",
+    "DOCUMENT_STORE_PROVIDER": "memory",
+    "CACHE_PROVIDER": "memory",
+    "COMPRESSION_MODEL": "local",
+}
+for name, value in OFFLINE_DEFAULTS.items():
+    os.environ.setdefault(name, value)
+
+# A scratch directory keeps snapshots and the embedding cache of earlier runs from skewing startup
+_scratch = tempfile.TemporaryDirectory(prefix="load-test-")
+os.environ.setdefault("VECTOR_STORE_PATH", os.path.join(_scratch.name, "vector_store"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(_scratch.name, "embeddings.bin"))
+
+from app.core.config import Settings  # noqa: E402
+from app.core.container import ServiceContainer  # noqa: E402
+from app.db.memory_mongodb import InMemoryMongoDB  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+PERCENTILES = (50, 90, 95, 99)
+
+WORDS = (
+    "account billing refund invoice shipping delivery warranty repair return policy order payment card "
+    "subscription plan upgrade cancel support ticket password login security privacy data export report "
+    "dashboard api limit quota region latency outage status incident backup restore storage network"
+).split()
+
+
+def make_text(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words)) + "."
+
+
+async def seed_documents(mongodb: InMemoryMongoDB, collection: str, count: int, words: int, seed: int):
+    rng = np.random.default_rng(seed)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        await mongodb.insert_document(collection, {
+            "_id": f"doc-{i}",
+            "content": make_text(rng, words),
+            "metadata": {"source": f"source-{i % 10}"},
+            "created_at": created + timedelta(seconds=i),
+        })
+
+
+def make_queries(count: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed + 1)
+    return [f"How does {' '.join(rng.choice(WORDS, size=int(rng.integers(3, 9))))} work?" for _ in range(count)]
+
+
+class StageTimer:
+    """Collects the wall time of each call to the wrapped pipeline stages."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def instrument(self, container: ServiceContainer):
+        rag_service = container.rag_service
+        rag_service._compress = self.wrap("query_compression", rag_service._compress)
+        # Includes compressing the retrieved chunks when context compression is on
+        rag_service.rag_chain.aretrieve = self.wrap("retrieval", rag_service.rag_chain.aretrieve)
+        if rag_service.context_packer is not None:
+            rag_service.context_packer.pack = self.wrap("context_packing", rag_service.context_packer.pack)
+        # Includes retrieval when context packing is off
+        rag_service.rag_chain.run = self.wrap("generation", rag_service.rag_chain.run)
+
+    def reset(self):
+        self.samples.clear()
+
+
+def percentiles(samples: List[float]) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000
+    report = {f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES}
+    report.update(mean_ms=float(values.mean()), max_ms=float(values.max()), count=len(samples))
+    return report
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def stream_over_asgi(app: Any, path: str, payload: Dict[str, Any], result: Dict[str, Any], start: float):
+    """POST to a streaming endpoint, timing body chunks as the app sends them.
+
+    httpx's ASGI transport hands back the body only once the app has
+    finished, which would hide the time to the first event and token.
+    """
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"load-test"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("load-test", 80),
+    }
+    received = False
+    finished = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk and "first_byte" not in result:
+                result["first_byte"] = time.perf_counter() - start
+            if b"event: token" in chunk and "first_token" not in result:
+                result["first_token"] = time.perf_counter() - start
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+
+
+async def send(client: httpx.AsyncClient, app: Any, query: str, stream: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"status": None}
+    try:
+        if stream:
+            await stream_over_asgi(app, "/api/v1/query/stream", {"query": query}, result, start)
+        else:
+            response = await client.post("/api/v1/query", json={"query": query})
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                body = response.json()
+                result["server"] = body.get("latency_seconds")
+                result["freshness"] = body.get("freshness")
+    except Exception as e:
+        result["error"] = type(e).__name__
+    result["latency"] = time.perf_counter() - start
+    return result
+
+
+async def drive(client: httpx.AsyncClient, app: Any, queries: List[str], rps: float, duration: float, stream: bool):
+    """Open-loop arrivals: requests start on schedule whether or not earlier ones finished."""
+    loop = asyncio.get_running_loop()
+    tasks = []
+    start = loop.time()
+    for i in range(max(int(rps * duration), 1)):
+        delay = start + i / rps - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, app, queries[i % len(queries)], stream)))
+    results = await asyncio.gather(*tasks)
+    return results, loop.time() - start
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    settings = Settings()
+    app = create_app()
+    # What the app's lifespan does, with the document store seeded before the vector store loads
+    container = ServiceContainer(settings)
+    if isinstance(container.mongodb, InMemoryMongoDB):
+        await seed_documents(container.mongodb, settings.DOCUMENTS_COLLECTION, args.documents, args.words, args.seed)
+    startup = time.perf_counter()
+    await container.start()
+    startup_seconds = time.perf_counter() - startup
+    app.state.container = container
+    app.state.startup_report = container.startup_report
+
+    timer = StageTimer()
+    timer.instrument(container)
+    # Warm-up queries are not among the measured ones, so they cannot pre-fill the caches for them
+    queries = make_queries(args.distinct_queries + args.warmup, args.seed)
+    queries, warmup = queries[:args.distinct_queries], queries[args.distinct_queries:]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            for query in warmup:
+                await send(client, app, query, args.stream)
+            timer.reset()
+            results, elapsed = await drive(client, app, queries, args.rps, args.duration, args.stream)
+    finally:
+        await container.close()
+
+    ok = [r for r in results if r["status"] == 200 and "error" not in r]
+    statuses: Dict[str, int] = defaultdict(int)
+    for r in results:
+        statuses[str(r["status"] or r.get("error"))] += 1
+    freshness: Dict[str, int] = defaultdict(int)
+    for r in ok:
+        if r.get("freshness"):
+            freshness[r["freshness"]] += 1
+
+    stages = {"end_to_end": percentiles([r["latency"] for r in ok])}
+    if not args.stream:
+        stages["server"] = percentiles([r["server"] for r in ok if r.get("server") is not None])
+    else:
+        stages["time_to_first_byte"] = percentiles([r["first_byte"] for r in ok if "first_byte" in r])
+        stages["time_to_first_token"] = percentiles([r["first_token"] for r in ok if "first_token" in r])
+    stages.update({stage: percentiles(samples) for stage, samples in sorted(timer.samples.items())})
+
+    return {
+        "config": {
+            "endpoint": "/api/v1/query/stream" if args.stream else "/api/v1/query",
+            "target_rps": args.rps,
+            "duration_seconds": args.duration,
+            "documents": args.documents,
+            "distinct_queries": args.distinct_queries,
+            "providers": {
+                "llm": settings.LLM_PROVIDER,
+                "embeddings": settings.EMBEDDING_PROVIDER,
+                "document_store": settings.DOCUMENT_STORE_PROVIDER,
+                "cache": settings.CACHE_PROVIDER,
+                "compression": settings.COMPRESSION_MODEL if settings.COMPRESSION_ENABLED else None,
+            },
+        },
+        "startup_seconds": startup_seconds,
+        "requests": len(results),
+        "succeeded": len(ok),
+        "statuses": dict(statuses),
+        "freshness": dict(freshness),
+        "throughput_rps": len(ok) / elapsed,
+        "latency": stages,
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline`` beyond ``tolerance`` (a fraction) and ``min_delta_ms``."""
+    regressions = []
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput_rps {baseline['throughput_rps']:.2f} -> {report['throughput_rps']:.2f}")
+    for stage, current in report["latency"].items():
+        previous = baseline["latency"].get(stage)
+        if current is None or previous is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[key] > max(previous[key] * (1 + tolerance), previous[key] + min_delta_ms):
+                regressions.append(f"{stage} {key} {previous[key]:.1f} -> {current[key]:.1f}")
+    if report["peak_rss_mib"] > baseline["peak_rss_mib"] * (1 + tolerance):
+        regressions.append(f"peak_rss_mib {baseline['peak_rss_mib']:.1f} -> {report['peak_rss_mib']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=10.0, help="target request arrival rate")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--stream", action="store_true", help="load the SSE endpoint instead of /query")
+    parser.add_argument("--documents", type=int, default=1000, help="synthetic documents seeded into the memory store")
+    parser.add_argument("--words", type=int, default=120, help="words per synthetic document")
+    parser.add_argument("--distinct-queries", type=int, default=200, help="queries cycled through; repeats hit the caches")
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report; exit 1 if this run regresses beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="latency changes smaller than this never count")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.core.exceptions import RAGLLMException
+from app.embeddings.batch_embedder import BatchEmbedder, BatchEmbedderConfig
+
+
+class ProviderError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ScriptedEmbeddings(Embeddings):
+    """Fails each call with ``fail(texts)``'s error, if any, and counts the calls."""
+
+    def __init__(self, fail=lambda texts: None, delay=0.0):
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self.finished = 0
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        error = self.fail(texts)
+        if error is not None:
+            raise error
+        self.finished += 1
+        return [[float(len(text))] for text in texts]
+
+
+def embedder(provider, **config):
+    return BatchEmbedder(
+        provider,
+        BatchEmbedderConfig(max_batch_items=8, retry_backoff=0, **config),
+        token_counter=lambda text: 1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_auth_errors_fail_fast_without_retrying_or_splitting():
+    provider = ScriptedEmbeddings(lambda texts: ProviderError("invalid api key", 401))
+
+    with pytest.raises(RAGLLMException):
+        await embedder(provider).embed([f"text {i}" for i in range(8)])
+    assert provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_but_not_split():
+    provider = ScriptedEmbeddings(lambda texts: ProviderError("overloaded", 503))
+
+    with pytest.raises(RAGLLMException):
+        await embedder(provider, max_retries=2).embed([f"text {i}" for i in range(8)])
+    assert provider.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_batches_too_large_are_split_until_they_fit():
+    provider = ScriptedEmbeddings(
+        lambda texts: ProviderError("too many tokens in request", 400) if len(texts) > 2 else None
+    )
+
+    vectors = await embedder(provider).embed(["a", "bb", "ccc", "dddd", "e", "ff", "ggg", "hhhh"])
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [1.0], [2.0], [3.0], [4.0]]
+    # 8 -> 4 + 4 -> 2 + 2 + 2 + 2
+    assert provider.calls == 7
+
+
+@pytest.mark.asyncio
+async def test_a_failing_batch_cancels_the_others():
+    provider = ScriptedEmbeddings(
+        lambda texts: ProviderError("forbidden", 403) if "bad" in texts else None, delay=0.05
+    )
+    texts = ["bad"] + [f"text {i}" for i in range(31)]
+
+    with pytest.raises(RAGLLMException):
+        await embedder(provider, max_concurrency=1).embed(texts)
+    await asyncio.sleep(0.2)
+    # The batches queued or in flight behind the failing one were cancelled
+    assert provider.calls < 4
+    assert provider.finished == 0
@@ -0,0 +1,34 @@
+import time
+
+from app.db.bm25 import BM25Index
+from app.db.keyword_index import InvertedIndex
+
+
+def wait_for_version(bm25: BM25Index, version: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while bm25._matrix.version != version and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_changes_are_picked_up_by_a_background_rebuild():
+    index = InvertedIndex()
+    index.add("a", "apples and pears")
+    bm25 = BM25Index(index)
+    assert [doc_id for doc_id, _ in bm25.search("apples", 5)] == ["a"]
+
+    index.add("b", "apples apples apples")
+    index.remove("a")
+    # The previous build keeps serving until the new one is swapped in
+    assert [doc_id for doc_id, _ in bm25.search("apples", 5)] == ["a"]
+    wait_for_version(bm25, index.version)
+    assert [doc_id for doc_id, _ in bm25.search("apples", 5)] == ["b"]
+
+
+def test_refresh_rebuilds_in_the_calling_thread():
+    index = InvertedIndex()
+    bm25 = BM25Index(index)
+    assert bm25.search("apples", 5) == []
+    index.add("a", "apples")
+    bm25.refresh()
+    assert bm25.search("apples", 5, allowed_ids={"a"})[0][0] == "a"
+    assert bm25.search("apples", 5, allowed_ids={"b"}) == []
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from cross_cutting.compression import CompressionEngine, CompressionEngineConfig
+from cross_cutting.compression.engine import LOCAL_MODEL
+
+
+@pytest.mark.asyncio
+async def test_a_dead_worker_is_replaced():
+    engine = CompressionEngine(CompressionEngineConfig(model_name=LOCAL_MODEL, workers=1))
+    await engine.start()
+    try:
+        broken = engine._pool
+        for process in list(broken._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        with pytest.raises(BrokenProcessPool):
+            await engine.compress("a prompt sent while the worker is dead", 0.5)
+
+        for _ in range(100):
+            if engine._pool is not broken:
+                break
+            await asyncio.sleep(0.1)
+        result = await engine.compress("a prompt sent after the restart", 0.5)
+        assert result["compressed_prompt"]
+    finally:
+        await engine.close()
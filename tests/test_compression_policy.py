@@ -0,0 +1,54 @@
+from cross_cutting.compression.policy import AGGRESSIVE, LIGHT, SKIP, CompressionPolicy, CompressionPolicyConfig
+
+# Light compression of 1000 tokens saves 1000 * 0.3 * 0.5 = 150 ms
+TOKENS = 1000
+
+
+def policy(**config) -> CompressionPolicy:
+    return CompressionPolicy(CompressionPolicyConfig(token_value_ms=0.5, light_ratio=0.3, **config))
+
+
+def test_short_prompts_are_skipped():
+    assert policy(min_tokens=64).decide(63) == (SKIP, 0.0)
+
+
+def test_prompts_over_budget_are_compressed_aggressively():
+    compression_policy = policy(aggressive_ratio=0.6)
+    # Even when the compressor is known to be slow
+    compression_policy.observe(TOKENS, queue_seconds=10.0, compute_seconds=10.0)
+
+    assert compression_policy.decide(5000, budget=4000) == (AGGRESSIVE, 0.6)
+
+
+def test_light_compression_only_while_the_compressor_is_cheap_enough():
+    assert policy().decide(TOKENS) == (LIGHT, 0.3)
+
+    queued = policy(latency_alpha=1.0)
+    queued.observe(TOKENS, queue_seconds=0.2, compute_seconds=0.0)
+    assert queued.decide(TOKENS)[0] == SKIP
+
+    slow = policy(latency_alpha=1.0)
+    # 0.2 ms per token: 200 ms of compute to save 150 ms
+    slow.observe(TOKENS, queue_seconds=0.0, compute_seconds=0.2)
+    assert slow.decide(TOKENS)[0] == SKIP
+    # Twice the tokens, same per-token cost: still not worth it
+    assert slow.decide(2 * TOKENS)[0] == SKIP
+
+    fast = policy(latency_alpha=1.0)
+    fast.observe(TOKENS, queue_seconds=0.1, compute_seconds=0.01)
+    assert fast.decide(TOKENS)[0] == LIGHT
+
+
+def test_queue_estimate_fades_while_prompts_are_skipped():
+    compression_policy = policy(latency_alpha=0.5)
+    compression_policy.observe(TOKENS, queue_seconds=0.4, compute_seconds=0.0)
+    assert compression_policy.queue_ms == 200.0
+
+    assert compression_policy.decide(TOKENS)[0] == SKIP
+    assert compression_policy.queue_ms == 100.0
+    # 150 ms saved now outweighs the 100 ms wait
+    assert compression_policy.decide(TOKENS)[0] == LIGHT
+    assert compression_policy.queue_ms == 100.0
+    # Below min_tokens nothing is weighed, so nothing decays
+    compression_policy.decide(10)
+    assert compression_policy.queue_ms == 100.0
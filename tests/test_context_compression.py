@@ -0,0 +1,36 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.services.context_compression import (
+    ContextCompressionConfig,
+    ContextCompressionRetriever,
+    ContextCompressor,
+)
+from cross_cutting.compression import LLMCompressor
+from tests.test_llm_compressor import FakeEngine
+
+
+class ListRetriever(BaseRetriever):
+    documents: list
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return self.documents
+
+
+DOCUMENTS = [Document(page_content=" ".join([f"word{i}"] * 100), id=str(i)) for i in range(5)]
+
+
+def retriever(fit_budget: bool) -> ContextCompressionRetriever:
+    compressor = ContextCompressor(
+        LLMCompressor(FakeEngine()), ContextCompressionConfig(token_budget=120, min_tokens=1000)
+    )
+    return ContextCompressionRetriever(base=ListRetriever(documents=DOCUMENTS), compressor=compressor, fit_budget=fit_budget)
+
+
+@pytest.mark.asyncio
+async def test_the_budget_is_applied_unless_a_packer_takes_over():
+    assert len(await retriever(fit_budget=True).ainvoke("question")) == 1
+    # A packer downstream sees every chunk, so duplicates are dropped before anything is cut for size
+    assert len(await retriever(fit_budget=False).ainvoke("question")) == 5
+    assert len(retriever(fit_budget=False).invoke("question")) == 5
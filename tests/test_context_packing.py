@@ -0,0 +1,100 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.services.context_packing import ContextPacker, ContextPackingConfig
+
+X, Y, Z = [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]
+
+
+class RecordingEmbedder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.texts = []
+
+    async def embed(self, texts):
+        self.texts.extend(texts)
+        return [self.vectors[text] for text in texts]
+
+
+class StubVectorStore:
+    """Holds the vectors of some document IDs; everything else goes through ``embedder``."""
+
+    def __init__(self, indexed, embedded=None):
+        self.indexed = indexed
+        self.embedder = RecordingEmbedder(embedded or {})
+        self.requested = []
+
+    def get_vectors(self, ids):
+        self.requested.append(list(ids))
+        return {doc_id: self.indexed[doc_id] for doc_id in ids if doc_id in self.indexed}
+
+
+def documents(*specs):
+    """``(id, word count)`` pairs; a chunk's tokens are its words."""
+    return [Document(page_content=" ".join([doc_id] * words), id=doc_id) for doc_id, words in specs]
+
+
+def packer(vector_store, **config) -> ContextPacker:
+    return ContextPacker(vector_store, lambda text: len(text.split()), ContextPackingConfig(**config))
+
+
+def ids(packed):
+    return [document.id for document in packed.documents]
+
+
+@pytest.mark.asyncio
+async def test_near_duplicates_of_better_ranked_chunks_are_dropped():
+    store = StubVectorStore({"a": X, "b": [0.99, 0.1, 0.0], "c": Z})
+
+    packed = await packer(store, duplicate_threshold=0.95, mmr_lambda=1.0).pack(documents(("a", 10), ("b", 10), ("c", 10)))
+
+    assert ids(packed) == ["a", "c"]
+    assert packed.duplicates_dropped == 1
+    assert packed.report() == {"retrieved_tokens": 30, "packed_tokens": 20, "tokens_saved": 10, "duplicates_dropped": 1}
+
+
+@pytest.mark.asyncio
+async def test_mmr_promotes_chunks_unlike_those_already_kept():
+    # b is similar to a (0.9) but not a duplicate; c is unlike both
+    store = StubVectorStore({"a": X, "b": [0.9, 0.43589, 0.0], "c": Z})
+    chunks = documents(("a", 10), ("b", 10), ("c", 10))
+
+    assert ids(await packer(store, mmr_lambda=1.0).pack(chunks)) == ["a", "b", "c"]
+    assert ids(await packer(store, mmr_lambda=0.5).pack(chunks)) == ["a", "c", "b"]
+
+
+@pytest.mark.asyncio
+async def test_chunks_over_the_budget_are_skipped_but_smaller_later_ones_kept():
+    store = StubVectorStore({"a": X, "b": Y, "c": Z})
+
+    packed = await packer(store, token_budget=30, mmr_lambda=1.0).pack(documents(("a", 20), ("b", 20), ("c", 10)))
+
+    assert ids(packed) == ["a", "c"]
+    assert packed.packed_tokens == 30
+
+
+@pytest.mark.asyncio
+async def test_a_single_chunk_is_kept_if_it_fits_without_looking_up_vectors():
+    store = StubVectorStore({})
+
+    assert ids(await packer(store, token_budget=10).pack(documents(("a", 10)))) == ["a"]
+    assert ids(await packer(store, token_budget=9).pack(documents(("a", 10)))) == []
+    assert ids(await packer(store).pack([])) == []
+    assert store.requested == []
+    assert store.embedder.texts == []
+
+
+@pytest.mark.asyncio
+async def test_chunks_the_index_does_not_hold_are_embedded():
+    store = StubVectorStore({"a": X}, embedded={"original b": X, "c c": Z})
+    chunks = documents(("a", 1), ("b", 1), ("c", 2))
+    chunks[1].metadata["original_content"] = "original b"
+    chunks[2].id = None
+
+    packed = await packer(store, mmr_lambda=1.0).pack(chunks)
+
+    assert store.requested == [["a", "b"]]
+    # Compressed chunks are embedded as written, not as compressed
+    assert store.embedder.texts == ["original b", "c c"]
+    assert [document.page_content for document in packed.documents] == ["a", "c c"]
+    assert packed.duplicates_dropped == 1
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+from app.db.vector_store import VectorStore
+from app.embeddings.providers import HashEmbeddings
+from app.services.data_sync_service import DataSyncService
+
+EMBEDDINGS = HashEmbeddings(dimension=16)
+NOW = datetime(2024, 1, 1)
+
+
+def doc(doc_id: str, content: str = "") -> dict:
+    return {"_id": doc_id, "content": content or f"document {doc_id}", "created_at": NOW}
+
+
+class FakeMongoDB:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def find_documents(self, collection, query):
+        return list(self.documents)
+
+    async def get_new_documents(self, collection, last_sync_time):
+        return [document for document in self.documents if document["created_at"] >= last_sync_time]
+
+
+@pytest.mark.asyncio
+async def test_sync_picks_up_documents_sharing_the_high_water_mark():
+    vector_store = VectorStore()
+    await vector_store.initialize([doc("1")], "", EMBEDDINGS)
+    # Inserted after the last sync, with the same timestamp as the newest synced document
+    mongodb = FakeMongoDB([doc("1"), doc("2"), doc("2", "document 2, revised")])
+    service = DataSyncService()
+    await service.initialize(mongodb, object(), vector_store, documents_collection="chunks")
+
+    new_documents = await service.fetch_new_documents()
+    assert [document["_id"] for document in new_documents] == ["1", "2"]
+
+    result = await service.sync_data()
+    assert result["documents_processed"] == 2
+    assert len(vector_store.docstore) == 2
+    assert vector_store.docstore["2"].page_content == "document 2, revised"
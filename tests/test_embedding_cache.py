@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from app.embeddings.cache import HEADER, EmbeddingCache, EmbeddingFileStore, embedding_key
+
+DIMENSION = 4
+
+
+def key(i: int) -> bytes:
+    return embedding_key("model", f"text {i}")
+
+
+def vector(i: int):
+    return [float(i)] * DIMENSION
+
+
+def test_stores_sharing_a_file_see_each_others_records(tmp_path):
+    path = str(tmp_path / "embeddings.bin")
+    # Two stores on one file stand in for two worker processes
+    first, second = EmbeddingFileStore(path, DIMENSION), EmbeddingFileStore(path, DIMENSION)
+    for i in range(20):
+        (first if i % 2 else second).put_many({key(i): vector(i)})
+
+    for store in (first, second):
+        assert store.get_many([key(i) for i in range(20)]) == [vector(i) for i in range(20)]
+    assert len(EmbeddingFileStore(path, DIMENSION)) == 20
+
+
+def test_a_torn_record_is_ignored_and_cut_off(tmp_path):
+    path = str(tmp_path / "embeddings.bin")
+    store = EmbeddingFileStore(path, DIMENSION)
+    store.put_many({key(0): vector(0)})
+    with open(path, "ab") as f:
+        f.write(key(1)[:10])
+
+    reopened = EmbeddingFileStore(path, DIMENSION)
+    assert reopened.get(key(1)) is None
+    reopened.put_many({key(2): vector(2)})
+    assert os.path.getsize(path) == HEADER.size + 2 * reopened.record_size
+    assert store.get_many([key(0), key(2)]) == [vector(0), vector(2)]
+
+
+def test_file_is_capped_at_max_bytes(tmp_path):
+    path = str(tmp_path / "embeddings.bin")
+    record_size = EmbeddingFileStore(path, DIMENSION).record_size
+    writer = EmbeddingFileStore(path, DIMENSION, max_bytes=HEADER.size + 10 * record_size)
+    reader = EmbeddingFileStore(path, DIMENSION)
+    reader.get(key(0))
+    for i in range(50):
+        writer.put_many({key(i): vector(i)})
+
+    assert os.path.getsize(path) <= HEADER.size + 10 * record_size
+    # The newest records survive, and a store holding the old file reopens it
+    assert reader.get(key(49)) == vector(49)
+    assert writer.get(key(0)) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_promotes_disk_hits(tmp_path):
+    store = EmbeddingFileStore(str(tmp_path / "embeddings.bin"), DIMENSION)
+    await EmbeddingCache("model", store=store).put_many(["a", "b"], [vector(1), vector(2)])
+
+    cache = EmbeddingCache("model", store=EmbeddingFileStore(str(tmp_path / "embeddings.bin"), DIMENSION))
+    assert await cache.get_many(["a", "b", "c"]) == [vector(1), vector(2), None]
+    assert await cache.get_many(["a"]) == [vector(1)]
+    assert (cache.metrics.disk_hits, cache.metrics.memory_hits, cache.metrics.misses) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_vectors_of_another_dimension_are_refused(tmp_path):
+    path = str(tmp_path / "embeddings.bin")
+    store = EmbeddingFileStore(path, DIMENSION)
+    store.put_many({key(0): vector(0)})
+
+    with pytest.raises(ValueError):
+        store.put_many({key(1): vector(1) + [0.0]})
+    with pytest.raises(ValueError):
+        await EmbeddingCache("model", store=store).put_many(["text"], [[1.0] * (DIMENSION * 2)])
+    with pytest.raises(ValueError):
+        await EmbeddingCache("model", dimension=DIMENSION).put_many(["text"], [[1.0]])
+    # The file is untouched, so every record still lines up
+    assert EmbeddingFileStore(path, DIMENSION).get_many([key(0), key(1)]) == [vector(0), None]
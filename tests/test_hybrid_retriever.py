@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.services.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+def doc(doc_id: str) -> Document:
+    return Document(page_content=f"text {doc_id}", id=doc_id)
+
+
+class StubBM25:
+    def __init__(self, ranking):
+        self.ranking = ranking
+
+    def search(self, query, k):
+        return [(doc_id, 1.0 / rank) for rank, doc_id in enumerate(self.ranking[:k], start=1)]
+
+
+class StubStore:
+    def __init__(self, dense, sparse, docstore):
+        self.dense = dense
+        self.bm25 = StubBM25(sparse)
+        self.docstore = {doc_id: doc(doc_id) for doc_id in docstore}
+
+    async def similarity_search(self, query, k):
+        return [doc(doc_id) for doc_id in self.dense[:k]]
+
+
+def test_reciprocal_rank_fusion_scores_by_summed_reciprocal_ranks():
+    # a: 1/61 + 1/62, c: 1/63 + 1/61, b: 1/62, d: 1/63
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], rrf_k=60) == ["a", "c", "b", "d"]
+
+
+@pytest.mark.asyncio
+async def test_fused_results_are_unique_and_cut_to_k():
+    # "e" was deleted after BM25 scored it
+    store = StubStore(dense=["a", "b", "c"], sparse=["c", "a", "d", "e"], docstore=["a", "b", "c", "d"])
+
+    fused = await HybridRetriever(store=store, k=3, rrf_k=60).ainvoke("query")
+    assert [document.id for document in fused] == ["a", "c", "b"]
+
+    fused = await HybridRetriever(store=store, k=10, rrf_k=60).ainvoke("query")
+    # Sparse-only hits are resolved through the docstore; each ID appears once
+    assert [document.id for document in fused] == ["a", "c", "b", "d"]
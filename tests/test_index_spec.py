@@ -0,0 +1,56 @@
+import faiss
+import numpy as np
+import pytest
+
+from app.db.index_spec import MIN_POINTS_PER_CENTROID, MIN_PQ_NBITS, IndexSpec
+from app.db.segment import Segment
+
+DIMENSION = 16
+
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def search_ids(spec: IndexSpec, segment: Segment, query: np.ndarray, k: int, selector=None):
+    params = spec.search_parameters(selector=selector)
+    _, positions = segment.search(query, k, params, spec.rerank_factor)
+    return [segment.ids[position] for position in positions[0] if position != -1]
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw"])
+def test_pq_segment_from_a_single_vector(kind):
+    spec = IndexSpec(kind=kind, precision="pq", pq_m=4)
+    vectors = unit_vectors(3)
+    segment = Segment.build(spec, DIMENSION, vectors[:1])
+    segment.add(["a"], vectors[:1])
+    segment.add(["b", "c"], vectors[1:])
+
+    assert search_ids(spec, segment, vectors[1:2], 1) == ["b"]
+    # Filtered and tombstone-masked searches both pass a selector to faiss
+    assert set(search_ids(spec, segment, vectors[1:2], 3, segment.selector({"a", "c"}))) == {"a", "c"}
+    segment.delete(["b"])
+    assert "b" not in search_ids(spec, segment, vectors[1:2], 3, segment.live_selector())
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw"])
+def test_pq_segment_with_selectors(kind):
+    spec = IndexSpec(kind=kind, precision="pq", pq_m=4, nlist=4)
+    vectors = unit_vectors(MIN_POINTS_PER_CENTROID * 2 ** MIN_PQ_NBITS)
+    ids = [str(i) for i in range(len(vectors))]
+    segment = Segment.build(spec, DIMENSION, vectors)
+    assert faiss.downcast_index(segment.index).__class__.__name__ != "IndexPQ"
+    segment.add(ids, vectors)
+
+    allowed = {"1", "2", "3"}
+    assert set(search_ids(spec, segment, vectors[:1], 3, segment.selector(allowed))) <= allowed
+    segment.delete(["0"])
+    assert "0" not in search_ids(spec, segment, vectors[:1], 5, segment.live_selector())
+
+
+def test_pq_needs_enough_training_vectors():
+    spec = IndexSpec(precision="pq", pq_m=4)
+    assert spec.pq_nbits_for(1) is None
+    assert spec.pq_nbits_for(MIN_POINTS_PER_CENTROID * 2 ** MIN_PQ_NBITS) == MIN_PQ_NBITS
+    assert spec.pq_nbits_for(10 ** 6) == spec.pq_nbits
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.services.kb_version import KnowledgeBaseVersion
+from cross_cutting.caching.memory_redis import InMemoryRedis
+from cross_cutting.caching.redis_cache import CacheConfig, RedisCache
+
+
+@pytest.mark.asyncio
+async def test_collect_sweeps_every_retired_generation_in_one_pass():
+    cache = RedisCache(CacheConfig(), client=InMemoryRedis())
+    kb_version = KnowledgeBaseVersion(cache, refresh_interval=0)
+    for version in range(3):
+        await cache.set(KnowledgeBaseVersion.key(version, "query:a"), "answer")
+    for _ in range(2):
+        await kb_version.bump()
+
+    assert await kb_version.collect() == 2
+    assert await cache.get(KnowledgeBaseVersion.key(2, "query:a")) == "answer"
+    assert await cache.get(KnowledgeBaseVersion.key(1, "query:a")) is None
+    # Nothing left below the current version, so the next sweep does no work
+    assert await kb_version.collect() == 0
+
+
+@pytest.mark.asyncio
+async def test_current_waits_for_the_worker_to_catch_up():
+    redis = InMemoryRedis()
+    caught_up = []
+
+    async def catch_up(version):
+        await asyncio.sleep(0.05)
+        caught_up.append(version)
+
+    syncing = KnowledgeBaseVersion(RedisCache(CacheConfig(), client=redis))
+    serving = KnowledgeBaseVersion(RedisCache(CacheConfig(), client=redis), refresh_interval=0, on_change=catch_up)
+    assert await serving.current() == 0
+
+    await syncing.bump()
+    assert await serving.current() == 1
+    assert caught_up == [1]
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from cross_cutting.compression import CompressionEngineConfig, LLMCompressor
+
+
+class FakeEngine:
+    config = CompressionEngineConfig(model_name="fake")
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def compress(self, prompt: str, ratio: float = 0.5, question: str = ""):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if prompt in self.fail_on:
+                raise RuntimeError("worker died")
+            return {"compressed_prompt": prompt[: len(prompt) // 2]}
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_precompress_bounds_queued_chunks_and_skips_failures():
+    engine = FakeEngine(fail_on={"chunk 3"})
+    compressor = LLMCompressor(engine)
+
+    compressed = await compressor.precompress([f"chunk {i}" for i in range(20)], [0.5], concurrency=3)
+
+    assert compressed == 19
+    assert engine.peak == 3
+    assert await compressor.precompress(["chunk 0"], [0.5]) == 0
@@ -0,0 +1,73 @@
+import pytest
+
+from app.db.oplog import OperationLog
+from app.db.vector_store import VectorStore
+from app.embeddings.providers import HashEmbeddings
+
+EMBEDDINGS = HashEmbeddings(dimension=16)
+
+
+def doc(doc_id: str) -> dict:
+    return {"_id": doc_id, "content": f"document {doc_id}"}
+
+
+def test_logs_sharing_a_file_hand_out_unique_sequences(tmp_path):
+    path = str(tmp_path / "oplog.jsonl")
+    # Two logs on one file stand in for two worker processes
+    first, second = OperationLog(path), OperationLog(path)
+    seqs = [(first if i % 2 else second).append("delete", ids=[str(i)]) for i in range(10)]
+
+    assert seqs == list(range(1, 11))
+    assert [record["seq"] for record in OperationLog(path).records()] == seqs
+
+
+def test_truncate_keeps_records_past_the_snapshot(tmp_path):
+    log = OperationLog(str(tmp_path / "oplog.jsonl"))
+    for i in range(5):
+        log.append("delete", ids=[str(i)])
+    log.truncate(3)
+
+    assert [record["seq"] for record in log.records()] == [4, 5]
+    # Numbering continues past truncated records
+    assert OperationLog(log.path).append("delete", ids=["5"]) == 6
+
+
+@pytest.mark.asyncio
+async def test_a_checkpoint_covers_every_workers_changes(tmp_path):
+    path = str(tmp_path / "store")
+    first = VectorStore()
+    await first.initialize([doc("1")], "", EMBEDDINGS)
+    await first.save(path)
+    second = await VectorStore.load(path, "", embeddings=EMBEDDINGS)
+
+    await first.add_documents([doc("2")])
+    await second.add_documents([doc("3")])
+    await first.delete_documents(["1"])
+    manifest = await second.checkpoint()
+
+    assert manifest.oplog_seq == 3
+    assert sorted(second.docstore) == ["2", "3"]
+    # Kept until the next checkpoint, for workers that have not caught up yet
+    assert len(second.oplog.records()) == 3
+    await first.checkpoint()
+    assert second.oplog.records() == []
+    restored = await VectorStore.load(path, "", embeddings=EMBEDDINGS)
+    assert sorted(restored.docstore) == ["2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_catch_up_reloads_when_records_were_truncated_by_another_worker(tmp_path):
+    path = str(tmp_path / "store")
+    first = VectorStore()
+    await first.initialize([doc("1")], "", EMBEDDINGS)
+    await first.save(path)
+    second = await VectorStore.load(path, "", embeddings=EMBEDDINGS)
+
+    await second.add_documents([doc("2")])
+    await second.checkpoint()
+    await second.add_documents([doc("3")])
+    await second.checkpoint()
+    await first.add_documents([doc("4")])
+    await first.catch_up()
+
+    assert sorted(first.docstore) == ["1", "2", "3", "4"]
@@ -0,0 +1,79 @@
+import pytest
+
+from app.api.v1.controllers.query_controller import QueryController
+from app.api.v1.schemas.request.query_request import ConversationRequest
+from app.services.memory_service import MemoryService
+from tests.test_rag_service import rag_service as make_rag_service
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+class StreamingRAGService:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.contexts = []
+
+    async def stream_query(self, query, context=None):
+        self.contexts.append(context)
+        yield {"event": "sources", "sources": ["a source"]}
+        for text in self.tokens:
+            yield {"event": "token", "text": text}
+        yield {
+            "event": "done",
+            "query_compression": {
+                "original_prompt": query,
+                "compressed_prompt": query,
+                "original_tokens": 1,
+                "compressed_tokens": 1,
+                "compression_ratio": 1.0,
+            },
+            "freshness": "fresh" if self.tokens else "degraded",
+        }
+
+
+async def _drain(controller, message):
+    conversation = ConversationRequest(message=message, conversation_id="c1")
+    return [chunk async for chunk in controller.stream_conversation(conversation, ConnectedRequest())]
+
+
+@pytest.mark.asyncio
+async def test_stream_conversation_passes_history_and_saves_the_answer():
+    rag_service = StreamingRAGService(["Hel", "lo"])
+    memory_service = MemoryService()
+    controller = QueryController(rag_service, memory_service)
+
+    await _drain(controller, "first")
+    await _drain(controller, "second")
+
+    assert rag_service.contexts[0] == {"history": ""}
+    assert "Human: first\nAI: Hello" in rag_service.contexts[1]["history"]
+    assert memory_service.load_memory_variables("c1")["history"].count("AI: Hello") == 2
+
+
+@pytest.mark.asyncio
+async def test_degraded_stream_is_not_saved_to_memory():
+    memory_service = MemoryService()
+    controller = QueryController(StreamingRAGService([]), memory_service)
+
+    chunks = await _drain(controller, "first")
+
+    assert chunks[-1].startswith("event: done")
+    assert memory_service.load_memory_variables("c1") == {"history": ""}
+
+
+@pytest.mark.asyncio
+async def test_conversation_answers_follow_ups_with_the_history():
+    rag_service = await make_rag_service()
+    controller = QueryController(rag_service, MemoryService())
+
+    first = await controller.process_conversation(ConversationRequest(message="What is fact one?", conversation_id="c1"))
+    second = await controller.process_conversation(ConversationRequest(message="And fact two?", conversation_id="c1"))
+
+    assert (first.response, first.method) == ("answer 0", "rag")
+    assert second.response == "answer 1"
+    prompt = "\n".join(message.content for message in rag_service.llm_service.llm.calls[1])
+    assert "Human: What is fact one?\nAI: answer 0" in prompt
+    assert "Current question: and fact two" in prompt
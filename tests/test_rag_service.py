@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.db.vector_store import VectorStore
+from app.embeddings.providers import HashEmbeddings
+from app.services.kb_version import KnowledgeBaseVersion
+from app.services.rag_service import RAGService
+from app.services.retrieval_service import RetrievalService
+from cross_cutting.caching.coalescing import CoalescerConfig, RequestCoalescer
+from cross_cutting.caching.memory_redis import InMemoryRedis
+from cross_cutting.caching.redis_cache import CacheConfig, RedisCache
+from cross_cutting.resilience.circuit_breaker import CircuitBreaker
+
+EMBEDDINGS = HashEmbeddings(dimension=16)
+
+
+class SlowFakeChatModel(FakeListChatModel):
+    """Answers from ``responses`` after a short delay, so concurrent queries overlap, and counts its calls."""
+
+    calls: list = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(messages)
+        await asyncio.sleep(0.05)
+        return self._generate(messages, stop=stop, **kwargs)
+
+
+async def rag_service(**kwargs) -> RAGService:
+    vector_store = VectorStore()
+    await vector_store.initialize(
+        [{"_id": str(i), "content": f"fact number {i}", "created_at": datetime(2024, 1, 1)} for i in range(3)],
+        "",
+        EMBEDDINGS,
+    )
+    llm = SlowFakeChatModel(responses=[f"answer {i}" for i in range(100)], calls=[])
+    return RAGService(SimpleNamespace(llm=llm), RetrievalService(vector_store, k=2), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_call_the_llm_once():
+    service = await rag_service(coalescer=RequestCoalescer())
+
+    responses = await asyncio.gather(*(service.process_query("What is fact one?") for _ in range(10)))
+
+    assert len(service.llm_service.llm.calls) == 1
+    assert {response["answer"] for response in responses} == {"answer 0"}
+
+
+@pytest.mark.asyncio
+async def test_identical_queries_are_coalesced_across_workers():
+    redis = InMemoryRedis()
+    config = CoalescerConfig(poll_interval=0.01)
+    # Each service stands in for a worker process with its own cache client
+    workers = [
+        await rag_service(coalescer=RequestCoalescer(RedisCache(CacheConfig(), client=redis), config))
+        for _ in range(3)
+    ]
+
+    responses = await asyncio.gather(*(
+        worker.process_query("What is fact one?") for worker in workers for _ in range(4)
+    ))
+
+    assert sum(len(worker.llm_service.llm.calls) for worker in workers) == 1
+    assert len({response["answer"] for response in responses}) == 1
+
+
+@pytest.mark.asyncio
+async def test_a_result_shared_before_a_sync_is_not_handed_out_after_it():
+    redis = InMemoryRedis()
+
+    async def worker() -> RAGService:
+        cache = RedisCache(CacheConfig(), client=redis)
+        return await rag_service(
+            coalescer=RequestCoalescer(cache, CoalescerConfig(result_ttl=60)),
+            kb_version=KnowledgeBaseVersion(cache, refresh_interval=0),
+        )
+
+    before, after = await worker(), await worker()
+    await before.process_query("What is fact one?")
+    await before.kb_version.bump()
+    await after.process_query("What is fact one?")
+
+    assert len(after.llm_service.llm.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_the_same_question_in_different_conversations_is_answered_apart():
+    query_cache = RedisCache(CacheConfig(), client=InMemoryRedis())
+    service = await rag_service(query_cache=query_cache, coalescer=RequestCoalescer())
+
+    await service.process_query("And the next one?", context={"history": "Human: fact one?\nAI: one"})
+    repeated = await service.process_query("And the next one?", context={"history": "Human: fact one?\nAI: one"})
+    other = await service.process_query("And the next one?", context={"history": "Human: fact two?\nAI: two"})
+
+    assert repeated["cached"] is True
+    assert other["cached"] is False
+    assert len(service.llm_service.llm.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_answers_are_served_stale_and_refreshed():
+    # Answers expire at once but stay servable for a minute
+    query_cache = RedisCache(CacheConfig(ttl=0, stale_ttl=60), client=InMemoryRedis())
+    service = await rag_service(query_cache=query_cache)
+
+    first = await service.process_query("What is fact one?")
+    second = await service.process_query("What is fact one?")
+
+    assert (first["freshness"], first["cached"]) == ("fresh", False)
+    assert (second["freshness"], second["cached"]) == ("stale", True)
+    assert second["answer"] == first["answer"]
+    # The refresh runs in the background
+    await asyncio.sleep(0.2)
+    assert len(service.llm_service.llm.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_an_open_breaker_degrades_to_retrieved_sources():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.state, breaker.last_failure_time = "OPEN", datetime.now()
+    service = await rag_service(llm_breaker=breaker)
+
+    response = await service.process_query("What is fact one?")
+
+    assert response["freshness"] == "degraded"
+    assert response["method"] == "retrieval"
+    assert response["answer"] == ""
+    assert len(response["sources"]) == 2
+    assert response["cached"] is False
+    assert service.llm_service.llm.calls == []
+
+    events = [event async for event in service.stream_query("What is fact one?")]
+    assert [event["event"] for event in events] == ["sources", "done"]
+    assert events[-1]["freshness"] == "degraded"
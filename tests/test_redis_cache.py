@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError, RedisError
+
+from cross_cutting.caching.memory_redis import InMemoryRedis
+from cross_cutting.caching.redis_cache import CacheConfig, RedisCache, TieredCache
+
+
+class ReadOnlyRedis(InMemoryRedis):
+    """Locks can be taken, but no value can be stored (e.g. Redis out of memory)."""
+
+    async def set(self, key, value, *args, **kwargs):
+        if ":lock:" not in key:
+            raise ConnectionError("write refused")
+        return await super().set(key, value, *args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_a_failed_write_still_returns_the_computed_value():
+    cache = RedisCache(CacheConfig(), client=ReadOnlyRedis())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"answer": 42}
+
+    assert await cache.get_or_compute("key", compute) == {"answer": 42}
+    assert await cache.get_or_compute("key", compute) == {"answer": 42}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("allow_pickle", [True, False])
+async def test_stale_entries_are_recognised_whatever_the_serialization(allow_pickle):
+    cache = RedisCache(CacheConfig(allow_pickle=allow_pickle, stale_ttl=60), client=InMemoryRedis())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"answer": len(calls)}
+
+    assert await cache.get_or_compute_stale("key", compute, ttl=1) == ({"answer": 1}, True)
+    assert await cache.get_or_compute_stale("key", compute, ttl=1) == ({"answer": 1}, True)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_legacy_tuple_entries_are_still_served():
+    cache = RedisCache(CacheConfig(stale_ttl=60), client=InMemoryRedis())
+    await cache.set("key", ({"answer": "old"}, 0.0))
+
+    async def compute():
+        return {"answer": "new"}
+
+    value, fresh = await cache.get_or_compute_stale("key", compute, revalidate=False)
+    assert (value, fresh) == ({"answer": "old"}, False)
+
+
+async def subscribed(cache: TieredCache) -> TieredCache:
+    await cache.get("warm-up")
+    while not cache._subscribed:
+        await asyncio.sleep(0)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_writes_in_one_worker_invalidate_l1_in_the_others():
+    redis = InMemoryRedis()
+    # Two tiered caches on one Redis stand in for two worker processes
+    first = await subscribed(TieredCache(client=redis))
+    second = await subscribed(TieredCache(client=redis))
+    try:
+        await first.set("key", "v1")
+        assert await second.get("key") == "v1"
+        assert second.l1.get("key") == "v1"
+
+        await first.set("key", "v2")
+        await asyncio.sleep(0.01)
+        assert second.l1.get("key") is None
+        assert await second.get("key") == "v2"
+
+        await first.delete_many(["key"])
+        await asyncio.sleep(0.01)
+        assert await second.get("key") is None
+
+        await second.set("other", "value")
+        await first.clear()
+        await asyncio.sleep(0.01)
+        assert len(second.l1) == 0
+        assert (await second.get_metrics()).invalidations_received == 4
+    finally:
+        await first.close()
+        await second.close()
+
+
+
+@pytest.mark.asyncio
+async def test_in_memory_redis_runs_the_lock_script_and_refuses_others():
+    cache = RedisCache(CacheConfig(), client=InMemoryRedis())
+    token = await cache.acquire_lock("key", timeout=60)
+    assert await cache.acquire_lock("key", timeout=60) is None
+
+    await cache.release_lock("key", "someone else's token")
+    assert await cache.acquire_lock("key", timeout=60) is None
+    await cache.release_lock("key", token)
+    assert await cache.acquire_lock("key", timeout=60) is not None
+
+    with pytest.raises(RedisError):
+        await cache.redis.eval("return 1", 0)
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.documents import Document
+
+from app.db.rwlock import ReadWriteLock
+from app.db.search_executor import SearchExecutor, SearchExecutorConfig
+from app.db.segment import Segment
+from app.db.vector_store import VectorStore
+from app.embeddings.providers import HashEmbeddings
+
+
+class StubEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.0] for text in texts]
+
+
+class StubStore:
+    """Records each batched search; every query gets ``k`` hits named after it."""
+
+    def __init__(self):
+        self.embeddings = StubEmbeddings()
+        self.searches = []
+
+    async def _search_async(self, queries, k, **search_kwargs):
+        self.searches.append((len(queries), k, search_kwargs))
+        return [
+            [(Document(page_content=f"{int(query[0])}-{rank}"), 0.0) for rank in range(k)]
+            for query in queries
+        ]
+
+
+@pytest.mark.asyncio
+async def test_searches_within_the_window_share_one_embedding_and_index_call():
+    store = StubStore()
+    executor = SearchExecutor(store, SearchExecutorConfig(window_ms=50, max_batch_size=32))
+
+    results = await asyncio.gather(*(executor.search("q" * length, k=length) for length in (1, 2, 3)))
+
+    assert store.embeddings.calls == [["q", "qq", "qqq"]]
+    assert store.searches == [(3, 3, {})]
+    # Each caller gets its own hits, cut to its own k
+    assert [[doc.page_content for doc in docs] for docs in results] == [
+        ["1-0"], ["2-0", "2-1"], ["3-0", "3-1", "3-2"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_a_full_batch_is_flushed_without_waiting_for_the_window():
+    store = StubStore()
+    executor = SearchExecutor(store, SearchExecutorConfig(window_ms=10_000, max_batch_size=2))
+
+    await asyncio.wait_for(asyncio.gather(executor.search("a", k=1), executor.search("b", k=1)), timeout=1)
+
+    assert store.searches == [(2, 1, {})]
+
+
+@pytest.mark.asyncio
+async def test_searches_with_different_parameters_are_batched_apart():
+    store = StubStore()
+    executor = SearchExecutor(store, SearchExecutorConfig(window_ms=50))
+
+    await asyncio.gather(
+        executor.search("a", k=1), executor.search("b", k=1, nprobe=8), executor.search("c", k=1, nprobe=8),
+    )
+
+    assert sorted(store.searches, key=lambda search: search[0]) == [(1, 1, {}), (2, 1, {"nprobe": 8})]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_store_searches_go_out_as_one_faiss_call(monkeypatch):
+    store = VectorStore(search_config=SearchExecutorConfig(window_ms=50))
+    await store.initialize(
+        [{"_id": str(i), "content": f"document {i}"} for i in range(10)], "", HashEmbeddings(dimension=16)
+    )
+    batches = []
+    search = Segment.search
+
+    def recording_search(self, queries, *args, **kwargs):
+        batches.append(len(queries))
+        return search(self, queries, *args, **kwargs)
+
+    monkeypatch.setattr(Segment, "search", recording_search)
+
+    results = await asyncio.gather(*(store.similarity_search(f"document {i}", k=1) for i in range(5)))
+
+    assert batches == [5]
+    assert [docs[0].id for docs in results] == [str(i) for i in range(5)]
+
+
+def test_a_waiting_writer_blocks_new_readers():
+    lock = ReadWriteLock()
+    events = []
+    reader_in, writer_waiting = threading.Event(), threading.Event()
+    release_reader = threading.Event()
+
+    def first_reader():
+        with lock.read():
+            reader_in.set()
+            release_reader.wait(5)
+            events.append("first reader out")
+
+    def writer():
+        writer_waiting.set()
+        with lock.write():
+            events.append("writer")
+
+    def second_reader():
+        with lock.read():
+            events.append("second reader")
+
+    threads = [threading.Thread(target=first_reader)]
+    threads[0].start()
+    reader_in.wait(5)
+    threads.append(threading.Thread(target=writer))
+    threads[1].start()
+    writer_waiting.wait(5)
+    while not lock._writers_waiting:
+        pass
+    threads.append(threading.Thread(target=second_reader))
+    threads[2].start()
+    threads[2].join(0.1)
+    # The lock is only held for reading, but the second reader queues behind the writer
+    assert threads[2].is_alive()
+
+    release_reader.set()
+    for thread in threads:
+        thread.join(5)
+    assert events == ["first reader out", "writer", "second reader"]
@@ -0,0 +1,92 @@
+import numpy as np
+
+from app.services import semantic_cache as semantic_cache_module
+from app.services.semantic_cache import SemanticCache, SemanticCacheConfig
+
+
+def at_angle(degrees: float):
+    """A unit vector whose cosine similarity with [1, 0, 0] is cos(degrees)."""
+    radians = np.radians(degrees)
+    return [float(np.cos(radians)), float(np.sin(radians)), 0.0]
+
+
+AXIS = [1.0, 0.0, 0.0]
+
+
+def cache(**config) -> SemanticCache:
+    return SemanticCache(SemanticCacheConfig(threshold=0.95, near_miss_margin=0.05, **config))
+
+
+def test_hit_at_or_above_the_threshold():
+    semantic_cache = cache()
+    semantic_cache.store("q", AXIS, "answer", kb_version=1)
+
+    value, similarity = semantic_cache.lookup([2.0, 0.0, 0.0], kb_version=1)
+    assert value == "answer"
+    assert similarity == 1.0
+    # cos(18 degrees) is 0.951, just above the threshold
+    assert semantic_cache.lookup(at_angle(18), kb_version=1)[0] == "answer"
+    assert semantic_cache.metrics.hits == 2
+
+
+def test_near_misses_are_counted_apart_from_misses():
+    semantic_cache = cache()
+    semantic_cache.store("q", AXIS, "answer", kb_version=1)
+
+    # cos(20 degrees) is 0.940: below the threshold but within the margin
+    assert semantic_cache.lookup(at_angle(20), kb_version=1) is None
+    # cos(40 degrees) is 0.766
+    assert semantic_cache.lookup(at_angle(40), kb_version=1) is None
+    assert (semantic_cache.metrics.near_misses, semantic_cache.metrics.misses) == (1, 1)
+
+
+def test_expired_entries_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache_module.time, "time", lambda: now[0])
+    semantic_cache = cache(ttl=60)
+    semantic_cache.store("q", AXIS, "answer", kb_version=1)
+
+    now[0] += 59
+    assert semantic_cache.lookup(AXIS, kb_version=1)[0] == "answer"
+    now[0] += 1
+    assert semantic_cache.lookup(AXIS, kb_version=1) is None
+    assert len(semantic_cache) == 0
+
+
+def test_entries_from_another_kb_version_are_evicted():
+    semantic_cache = cache()
+    semantic_cache.store("q", AXIS, "answer", kb_version=1)
+
+    assert semantic_cache.lookup(AXIS, kb_version=2) is None
+    assert len(semantic_cache) == 0
+    assert semantic_cache.lookup(AXIS, kb_version=1) is None
+
+
+def test_least_recently_used_entry_is_evicted_at_max_entries():
+    semantic_cache = cache(max_entries=2)
+    semantic_cache.store("x", [1.0, 0.0, 0.0], "x", kb_version=1)
+    semantic_cache.store("y", [0.0, 1.0, 0.0], "y", kb_version=1)
+    # Using x makes y the least recently used
+    assert semantic_cache.lookup([1.0, 0.0, 0.0], kb_version=1)[0] == "x"
+
+    semantic_cache.store("z", [0.0, 0.0, 1.0], "z", kb_version=1)
+
+    assert len(semantic_cache) == 2
+    assert semantic_cache.lookup([0.0, 1.0, 0.0], kb_version=1) is None
+    assert semantic_cache.lookup([1.0, 0.0, 0.0], kb_version=1)[0] == "x"
+    assert semantic_cache.lookup([0.0, 0.0, 1.0], kb_version=1)[0] == "z"
+
+
+def test_a_freed_slot_is_reused():
+    semantic_cache = cache()
+    semantic_cache.store("x", [1.0, 0.0, 0.0], "x", kb_version=1)
+    semantic_cache.store("y", [0.0, 1.0, 0.0], "y", kb_version=1)
+    semantic_cache._evict(0)
+
+    semantic_cache.store("z", [0.0, 0.0, 1.0], "z", kb_version=1)
+
+    assert len(semantic_cache._entries) == 2
+    assert semantic_cache._entries[0].query == "z"
+    assert semantic_cache.lookup([1.0, 0.0, 0.0], kb_version=1) is None
+    assert semantic_cache.lookup([0.0, 0.0, 1.0], kb_version=1)[0] == "z"
+    assert semantic_cache.lookup([0.0, 1.0, 0.0], kb_version=1)[0] == "y"
@@ -0,0 +1,68 @@
+import json
+import pickle
+
+import pytest
+
+from cross_cutting.caching.serialization import (
+    CODEC_NONE,
+    CODECS,
+    MAGIC,
+    SerializationError,
+    decode_value,
+    encode_value,
+    resolve_codec,
+)
+
+VALUES = [
+    {"answer": "text " * 500, "sources": ["a", "b"], "score": 0.5},
+    ["a", 1, None, True],
+    "short",
+    42,
+    b"\x00raw bytes\xff" * 200,
+]
+
+
+@pytest.mark.parametrize("codec_name", sorted(CODECS))
+@pytest.mark.parametrize("allow_pickle", [True, False])
+@pytest.mark.parametrize("value", VALUES)
+def test_values_round_trip_through_the_envelope(value, codec_name, allow_pickle):
+    codec = resolve_codec(codec_name)
+    encoded = encode_value(value, codec, threshold=64, allow_pickle=allow_pickle)
+
+    assert encoded[0] == MAGIC
+    assert decode_value(encoded, allow_pickle) == value
+
+
+def test_large_payloads_are_compressed_and_small_ones_are_not():
+    codec = resolve_codec("zlib")
+    value = {"answer": "text " * 500}
+
+    assert len(encode_value(value, codec, threshold=64)) < len(encode_value(value, CODEC_NONE))
+    assert encode_value("short", codec, threshold=64)[3] == CODEC_NONE
+
+
+@pytest.mark.parametrize("value", [{"answer": "old"}, ["a", 1], "text", 3.5])
+def test_values_written_before_the_envelope_are_decoded(value):
+    assert decode_value(json.dumps(value).encode("utf-8")) == value
+    assert decode_value(pickle.dumps(value)) == value
+
+
+def test_pickles_are_refused_when_pickling_is_disabled():
+    with pytest.raises(SerializationError):
+        decode_value(pickle.dumps({"answer": "old"}), allow_pickle=False)
+    with pytest.raises(SerializationError):
+        decode_value(encode_value({"answer": "new"}), allow_pickle=False)
+    with pytest.raises(SerializationError):
+        encode_value(object(), allow_pickle=False)
+
+
+def test_tuples_come_back_as_lists_without_pickle():
+    assert decode_value(encode_value(("a", 1), allow_pickle=False), allow_pickle=False) == ["a", 1]
+    assert decode_value(encode_value(("a", 1))) == ("a", 1)
+
+
+def test_newer_envelope_versions_are_rejected():
+    encoded = bytearray(encode_value({"answer": "new"}))
+    encoded[1] += 1
+    with pytest.raises(SerializationError):
+        decode_value(bytes(encoded))
@@ -0,0 +1,43 @@
+import concurrent.futures
+
+import numpy as np
+
+from app.db.sharding import ProcessShardBackend, ShardedIndex
+
+
+class StubShardBackend:
+    """Answers searches at once with one hit, or hangs on them like a busy worker."""
+
+    lagging = ProcessShardBackend.lagging
+    abandon = ProcessShardBackend.abandon
+
+    def __init__(self, doc_id: str, hang: bool = False):
+        self.doc_id = doc_id
+        self.hang = hang
+        self.searches = []
+        self._overdue = None
+
+    def submit(self, fn, queries, k, kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        # Already picked up by the worker, so it can no longer be cancelled
+        future.set_running_or_notify_cancel()
+        if not self.hang:
+            future.set_result([[(0.5, self.doc_id)] for _ in queries])
+        self.searches.append(future)
+        return future
+
+
+def test_a_shard_stuck_on_an_overdue_search_is_skipped_until_it_finishes():
+    fast, slow = StubShardBackend("a"), StubShardBackend("b", hang=True)
+    index = ShardedIndex([fast, slow], deadline=0.01)
+    queries = np.zeros((1, 4), dtype=np.float32)
+
+    assert index.search_sync(queries, 2) == [[(0.5, "a")]]
+    assert index.search_sync(queries, 2) == [[(0.5, "a")]]
+    # The second search was not queued behind the first, which is still running
+    assert len(slow.searches) == 1
+
+    slow.searches[0].set_result([[(0.5, "b")]])
+    slow.hang = False
+    assert index.search_sync(queries, 2) == [[(0.5, "a"), (0.5, "b")]]
+    assert len(slow.searches) == 2
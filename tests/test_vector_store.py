@@ -0,0 +1,71 @@
+import pytest
+
+from app.db.index_spec import IndexSpec
+from app.db.vector_store import VectorStore
+from app.embeddings.providers import HashEmbeddings
+
+EMBEDDINGS = HashEmbeddings(dimension=16)
+KINDS = ["flat", "ivf", "hnsw"]
+PRECISIONS = ["float32", "float16", "int8", "pq"]
+
+
+def doc(doc_id: str, content: str = "") -> dict:
+    return {"_id": doc_id, "content": content or f"document about topic {doc_id}"}
+
+
+async def top_ids(store: VectorStore, query: str, k: int = 5):
+    return [document.id for document in await store.similarity_search(query, k=k)]
+
+
+async def new_store(kind: str, precision: str, count: int = 40) -> VectorStore:
+    # Compaction only when the test asks for it
+    store = VectorStore(
+        index_spec=IndexSpec(kind=kind, precision=precision, pq_m=4, nlist=4), compaction_threshold=1.0
+    )
+    await store.initialize([doc(str(i)) for i in range(count)], "", EMBEDDINGS)
+    return store
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("precision", PRECISIONS)
+@pytest.mark.parametrize("kind", KINDS)
+async def test_upsert_delete_and_compact(kind, precision):
+    store = await new_store(kind, precision)
+
+    await store.upsert_documents([doc("1", "a rewritten text about gardening")])
+    assert store.docstore["1"].page_content == "a rewritten text about gardening"
+    assert "1" in await top_ids(store, "a rewritten text about gardening")
+    assert len(store.docstore) == 40
+
+    deleted = [str(i) for i in range(0, 40, 3)]
+    assert await store.delete_documents(deleted + ["missing"]) == len(deleted)
+    for doc_id in deleted[:3]:
+        assert doc_id not in await top_ids(store, f"document about topic {doc_id}", k=10)
+
+    assert store.tombstone_ratio > 0
+    assert await store.compact() >= len(deleted)
+    assert store.tombstone_ratio == 0.0
+    assert "1" in await top_ids(store, "a rewritten text about gardening")
+    assert "2" in await top_ids(store, "document about topic 2")
+    assert not set(deleted) & set(await top_ids(store, "document about topic 3", k=20))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("precision", PRECISIONS)
+@pytest.mark.parametrize("kind", KINDS)
+async def test_another_workers_changes_are_replayed(kind, precision, tmp_path):
+    path = str(tmp_path / "store")
+    first = await new_store(kind, precision)
+    await first.save(path)
+    second = await VectorStore.load(path, "", embeddings=EMBEDDINGS)
+
+    await first.add_documents([doc("new", "a brand new text about sailing")])
+    await first.upsert_documents([doc("1", "a rewritten text about gardening")])
+    await first.delete_documents(["2"])
+    await second.catch_up()
+
+    assert sorted(second.docstore) == sorted(first.docstore)
+    assert second.docstore["1"].page_content == "a rewritten text about gardening"
+    assert "new" in await top_ids(second, "a brand new text about sailing")
+    assert "1" in await top_ids(second, "a rewritten text about gardening")
+    assert "2" not in await top_ids(second, "document about topic 2", k=10)